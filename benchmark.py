@@ -0,0 +1,60 @@
+# Offline pipeline benchmark (no network): fake NewsAPI + scratch Postgres.
+#
+#   python benchmark.py --db-uri postgresql://localhost/bench --startups 40 --articles 200
+#   python benchmark.py --db-uri ... --no-reset                 # incremental run on the same data
+#   python benchmark.py --db-uri ... --baseline logs/benchmarks/bench_<...>.json
+import argparse
+import json
+import os
+from src.benchmark import run_benchmark
+
+
+def parse_env(pairs):
+    env = {}
+    for pair in pairs or []:
+        key, _, value = pair.partition("=")
+        env[key] = value
+    return env
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run final_pipeline offline and record performance metrics.")
+    parser.add_argument("--db-uri", default=os.getenv("BENCH_DB_URI"), help="scratch Postgres (default: $BENCH_DB_URI)")
+    parser.add_argument("--startups", type=int, default=None, help="startups to seed (default: all in startups_id.json)")
+    parser.add_argument("--articles", type=int, default=50, help="fake articles per startup")
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=0, help="fake NewsAPI latency per request")
+    parser.add_argument("--rate-limit-ratio", type=float, default=0.0, help="share of requests answered with 429")
+    parser.add_argument("--offtopic-ratio", type=float, default=0.0, help="share of articles not mentioning the startup")
+    parser.add_argument("--model", choices=("stub", "real"), default="stub", help="real needs FinBERT in the local HF cache")
+    parser.add_argument("--keys", type=int, default=4, help="fake NewsAPI keys")
+    parser.add_argument("--workers", type=int, default=None, help="final_pipeline max_workers")
+    parser.add_argument("--no-reset", action="store_true", help="keep the database and caches from the last run")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--env", action="append", metavar="KEY=VALUE", help="extra pipeline settings, repeatable")
+    parser.add_argument("--baseline", help="earlier result JSON to compare against")
+    args = parser.parse_args()
+    if not args.db_uri:
+        parser.error("--db-uri or BENCH_DB_URI is required")
+
+    result = run_benchmark(
+        args.db_uri,
+        startups=args.startups,
+        articles_per_startup=args.articles,
+        page_size=args.page_size,
+        latency_ms=args.latency_ms,
+        rate_limit_ratio=args.rate_limit_ratio,
+        offtopic_ratio=args.offtopic_ratio,
+        model=args.model,
+        keys=args.keys,
+        max_workers=args.workers,
+        reset=not args.no_reset,
+        seed=args.seed,
+        env=parse_env(args.env),
+        baseline=args.baseline,
+    )
+    print(json.dumps({k: v for k, v in result.items() if k not in ("stages", "newsapi", "inference")}, indent=2, default=str))
+    for name, stage in result["stages"].items():
+        print(f"{name:>6}: {stage['items_per_sec']:>8} items/s  p50 {stage['latency_ms'].get('p50', 0)}ms  "
+              f"p99 {stage['latency_ms'].get('p99', 0)}ms  max queue {stage['max_queue_depth']}")
+    print(f"Saved {result['path']}")
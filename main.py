@@ -1,4 +1,9 @@
+import argparse
 from src.pipeline import final_pipeline
 
 if __name__ == "__main__":
-    final_pipeline()
+    parser = argparse.ArgumentParser(description="Fetch, score and store startup news.")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue the last interrupted run from the run journal")
+    args = parser.parse_args()
+    final_pipeline(resume=args.resume)
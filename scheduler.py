@@ -1,5 +1,6 @@
 from apscheduler.schedulers.blocking import BlockingScheduler
 from src.pipeline import final_pipeline
+from src.utils import warmup_model
 
 def run_pipeline():
     print("------------------------")
@@ -11,6 +12,9 @@ def run_pipeline():
     print("------------------------------")
 
 if __name__ == "__main__":
+    # Long-lived process: pay the model load once instead of on the first job
+    warmup_model()
+
     scheduler = BlockingScheduler()
 
     scheduler.add_job(run_pipeline, 'cron', hour='6,12,18')
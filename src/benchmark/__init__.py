@@ -0,0 +1,253 @@
+# src/benchmark/__init__.py
+# Offline end-to-end benchmark: runs final_pipeline against a local fake
+# NewsAPI (src/benchmark/fake_newsapi.py), a scratch Postgres seeded from
+# startups_id.json and the real or stub FinBERT, then records throughput,
+# per-stage latency, peak RSS and DB round-trips as JSON.
+#
+# src.constants reads the environment at import time, so nothing under
+# src.utils / src.pipeline may be imported before run_benchmark sets it up;
+# run it in a fresh process (see benchmark.py).
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime
+from src.benchmark.fake_newsapi import FakeNewsApi
+
+STARTUPS_FILE = "startups_id.json"
+WORK_DIR = os.path.join(".cache", "benchmark")
+RESULTS_DIR = os.path.join("logs", "benchmarks")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS "Startups" (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    description TEXT,
+    "findingKeywords" TEXT[],
+    sector TEXT,
+    "createdAt" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS "Articles" (
+    id TEXT PRIMARY KEY,
+    "startupId" TEXT NOT NULL REFERENCES "Startups"(id),
+    title TEXT NOT NULL,
+    content TEXT,
+    url TEXT NOT NULL,
+    "publishedAt" TIMESTAMP(3) NOT NULL,
+    sentiment TEXT,
+    "sentimentScore" DOUBLE PRECISION,
+    "sourceName" TEXT,
+    "createdAt" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+# Metrics compared against a baseline run: (path in the result JSON, higher is better)
+COMPARED_METRICS = [
+    (("wall_sec",), False),
+    (("articles_per_sec",), True),
+    (("peak_rss_mb",), False),
+    (("db_round_trips",), False),
+    (("newsapi", "requests"), False),
+]
+
+
+def load_startups(count=None, path=STARTUPS_FILE):
+    """
+    Startup rows from startups_id.json. A `count` above the file size adds
+    numbered copies ("CRED 2", ...) with stable ids to scale the catalog up.
+    """
+    with open(path) as f:
+        catalog = json.load(f)
+    count = count or len(catalog)
+    startups = []
+    for i in range(count):
+        base = catalog[i % len(catalog)]
+        copy = i // len(catalog)
+        name = base["name"] if copy == 0 else f"{base['name']} {copy + 1}"
+        startup_id = base["id"] if copy == 0 else str(uuid.uuid5(uuid.NAMESPACE_URL, f"{base['id']}/{copy}"))
+        startups.append((startup_id, base.get("description"), base.get("keywords") or [], name, base.get("sector")))
+    return startups
+
+
+def seed_database(db_uri, startups):
+    """Create the tables if needed, empty them and insert `startups`."""
+    import psycopg2
+
+    conn = psycopg2.connect(db_uri)
+    try:
+        with conn.cursor() as cur:
+            cur.execute(SCHEMA)
+            cur.execute('TRUNCATE "Articles", "Startups" CASCADE')
+            cur.executemany(
+                'INSERT INTO "Startups" (id, description, "findingKeywords", name, sector) VALUES (%s, %s, %s, %s, %s)',
+                startups,
+            )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def git_revision():
+    try:
+        sha = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+        dirty = bool(subprocess.check_output(["git", "status", "--porcelain", "--untracked-files=no"], text=True).strip())
+        return f"{sha}-dirty" if dirty else sha
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _dig(result, path):
+    for key in path:
+        if not isinstance(result, dict) or key not in result:
+            return None
+        result = result[key]
+    return result
+
+
+def compare_results(baseline, current):
+    """Relative change of the headline metrics and per-stage p50/p99 against a baseline result."""
+    paths = list(COMPARED_METRICS)
+    for stage in current.get("stages", {}):
+        paths += [(("stages", stage, "latency_ms", "p50"), False), (("stages", stage, "latency_ms", "p99"), False)]
+
+    comparison = {}
+    for path, higher_is_better in paths:
+        before, after = _dig(baseline, path), _dig(current, path)
+        if before is None or after is None:
+            continue
+        change = (after - before) / before if before else 0.0
+        regressed = change < -0.1 if higher_is_better else change > 0.1
+        comparison[".".join(path)] = {
+            "baseline": before,
+            "current": after,
+            "change": round(change, 4),
+            "regressed": regressed,
+        }
+    return comparison
+
+
+def run_benchmark(db_uri, startups=None, articles_per_startup=50, page_size=100, latency_ms=0,
+                  rate_limit_ratio=0.0, offtopic_ratio=0.0, model="stub", keys=4, max_workers=None, reset=True,
+                  seed=0, env=None, out_dir=RESULTS_DIR, baseline=None):
+    """
+    One offline pipeline run; returns the result dict and writes it to `out_dir`.
+    `reset=False` keeps the database and caches from the previous run, which
+    benchmarks the incremental (watermark) path instead of the initial load.
+    """
+    if "src.constants" in sys.modules:
+        raise RuntimeError("run_benchmark must run before src.constants is imported (use a fresh process)")
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    if db_uri == os.getenv("DB_URI"):
+        raise ValueError("Refusing to benchmark against DB_URI; point the benchmark at a scratch database")
+
+    catalog = load_startups(startups)
+    api = FakeNewsApi(
+        [row[3] for row in catalog],
+        articles_per_startup=articles_per_startup,
+        latency_ms=latency_ms,
+        rate_limit_ratio=rate_limit_ratio,
+        offtopic_ratio=offtopic_ratio,
+        seed=seed,
+    ).start()
+
+    if reset:
+        os.makedirs(WORK_DIR, exist_ok=True)
+        for name in os.listdir(WORK_DIR):
+            # ONNX exports are keyed by model revision and costly to redo; everything else starts cold
+            path = os.path.join(WORK_DIR, name)
+            if name == "onnx":
+                continue
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                os.remove(path)
+        seed_database(db_uri, catalog)
+    os.makedirs(WORK_DIR, exist_ok=True)
+
+    os.environ.update({
+        "DB_URI": db_uri,
+        "NEWS_API": ",".join(f"bench-key-{i}" for i in range(max(1, keys))),
+        "NEWS_API_BASE_URL": api.url,
+        "NEWS_API_PAGE_SIZE": str(page_size),
+        "NEWS_API_DAILY_QUOTA": "1000000",
+        "NEWS_API_MAX_RESULTS": "1000000",
+        "NEWS_API_KEY_RATE": "50",
+        "NEWS_API_KEY_BURST": "10",
+        "NEWS_API_KEY_STATE_PATH": os.path.join(WORK_DIR, "newsapi_keys.json"),
+        "SENTIMENT_CACHE_PATH": os.path.join(WORK_DIR, "sentiment_cache.sqlite3"),
+        "NEAR_DUP_INDEX_PATH": os.path.join(WORK_DIR, "near_dup_index.sqlite3"),
+        # never the production journal (a fresh run prunes it) or ONNX exports
+        "RUN_JOURNAL_PATH": os.path.join(WORK_DIR, "run_journal.sqlite3"),
+        "ONNX_CACHE_DIR": os.path.join(WORK_DIR, "onnx"),
+        "HF_HUB_OFFLINE": "1",
+        "TRANSFORMERS_OFFLINE": "1",
+    })
+    if model == "stub":
+        os.environ["SENTIMENT_BACKEND"] = "stub"
+    os.environ.update(env or {})
+
+    from src.pipeline import final_pipeline, get_last_summary
+    from src.utils.migration_utils import apply_migrations
+
+    apply_migrations(db_uri)
+
+    start = time.perf_counter()
+    try:
+        results = final_pipeline(max_workers=max_workers)
+    finally:
+        api.stop()
+    wall_sec = round(time.perf_counter() - start, 3)
+    summary = get_last_summary() or {}
+
+    inserted = summary.get("article_writer", {}).get("rows_inserted", 0)
+    result = {
+        "revision": git_revision(),
+        "run_at": datetime.now().isoformat(),
+        "config": {
+            "startups": len(catalog),
+            "articles_per_startup": articles_per_startup,
+            "page_size": page_size,
+            "latency_ms": latency_ms,
+            "rate_limit_ratio": rate_limit_ratio,
+            "offtopic_ratio": offtopic_ratio,
+            "model": model,
+            "keys": keys,
+            "max_workers": max_workers,
+            "reset": reset,
+            "seed": seed,
+            "env": env or {},
+        },
+        "wall_sec": wall_sec,
+        "articles_inserted": inserted,
+        "articles_per_sec": round(inserted / wall_sec, 2) if wall_sec else 0,
+        "peak_rss_mb": peak_rss_mb(),
+        "db_round_trips": summary.get("db_pool", {}).get("round_trips"),
+        "startups_failed": sum(1 for r in results if r["status"] != "success"),
+        "stages": summary.get("stages", {}),
+        "newsapi": summary.get("newsapi", {}),
+        "fake_newsapi": dict(api.stats),
+        "inference": summary.get("inference", {}),
+        "relevance": summary.get("relevance", {}),
+    }
+    if baseline:
+        with open(baseline) as f:
+            result["comparison"] = compare_results(json.load(f), result)
+
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{result['revision']}.json")
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2, default=str)
+    result["path"] = path
+    return result
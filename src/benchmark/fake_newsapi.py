@@ -0,0 +1,153 @@
+# src/benchmark/fake_newsapi.py
+# Local stand-in for NewsAPI's /v2/everything used by the offline benchmark.
+# Articles are generated deterministically from the seeded startups, so a
+# query for a startup's name always sees the same articles; `from`/`to`,
+# paging, latency, 429 responses and the plan's 426 result limit behave like
+# the real endpoint.
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+WORDS = (
+    "funding round investors revenue growth launch users market expansion quarter profit loss "
+    "team hiring valuation series customers platform partnership regulator payments credit "
+    "delivery city india startup product pricing subscription layoffs acquisition ipo"
+).split()
+
+
+def _parse_time(value):
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return parsed.astimezone(timezone.utc).replace(tzinfo=None) if parsed.tzinfo else parsed
+
+
+class FakeNewsApi:
+    """
+    Threaded HTTP server answering /v2/everything for the given startup names.
+    `articles_per_startup` are spread evenly over the last `history_days`;
+    `offtopic_ratio` of them never mention the startup (keyword-only hits).
+    With `max_results`, pages past it answer 426 maximumResultsReached.
+    """
+
+    def __init__(self, startup_names, articles_per_startup=50, history_days=30,
+                 latency_ms=0, rate_limit_ratio=0.0, offtopic_ratio=0.0, seed=0, port=0,
+                 max_results=None):
+        self.startup_names = list(startup_names)
+        self.articles_per_startup = articles_per_startup
+        self.history_days = history_days
+        self.latency_ms = latency_ms
+        self.rate_limit_ratio = rate_limit_ratio
+        self.offtopic_ratio = offtopic_ratio
+        self.max_results = max_results
+        self.seed = seed
+        self.now = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._corpus = {}
+        self.stats = {"requests": 0, "rate_limited": 0, "result_limited": 0, "articles_served": 0}
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/v2/everything"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-newsapi", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _articles_for(self, name):
+        """Newest-first articles mentioning `name`, generated once per name."""
+        if name not in self._corpus:
+            rnd = random.Random(f"{self.seed}:{name}")
+            step = timedelta(days=self.history_days) / max(1, self.articles_per_startup)
+            slug = re.sub(r"\W+", "-", name.lower())
+            articles = []
+            for i in range(self.articles_per_startup):
+                body = " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(30, 80)))
+                # only draws when enabled, so existing seeds keep producing the same corpus
+                subject = "Sector" if self.offtopic_ratio and rnd.random() < self.offtopic_ratio else name
+                articles.append({
+                    "source": {"id": None, "name": "Fake Wire"},
+                    "title": f"{subject} {rnd.choice(WORDS)} {rnd.choice(WORDS)} update {i}",
+                    "description": f"{subject} {body[:160]}",
+                    "content": body,
+                    "url": f"https://fake.news/{slug}/{i}",
+                    "publishedAt": (self.now - step * (i + 0.5)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                })
+            self._corpus[name] = articles
+        return self._corpus[name]
+
+    def search(self, query, from_time, to_time):
+        terms = {term.lower() for term in re.findall(r'"([^"]+)"', query)}
+        matched = []
+        for name in self.startup_names:
+            if name.lower() in terms:
+                matched.extend(self._articles_for(name))
+        matched = [a for a in matched if from_time <= _parse_time(a["publishedAt"]) <= to_time]
+        matched.sort(key=lambda a: a["publishedAt"], reverse=True)
+        return matched
+
+    def _respond(self, params):
+        """Returns (status, headers, body) for one GET."""
+        with self._lock:
+            self.stats["requests"] += 1
+            limited = self._random.random() < self.rate_limit_ratio
+            if limited:
+                self.stats["rate_limited"] += 1
+        if limited:
+            return 429, {"Retry-After": "1"}, {"status": "error", "code": "rateLimited", "message": "Too many requests"}
+
+        query = params.get("q", [""])[0]
+        from_value = params.get("from", [None])[0]
+        to_value = params.get("to", [None])[0]
+        from_time = _parse_time(from_value) if from_value else self.now - timedelta(days=self.history_days)
+        to_time = _parse_time(to_value) if to_value else self.now
+        if to_value and "T" not in to_value:
+            to_time += timedelta(days=1)  # date-only `to` covers the whole day
+        page_size = min(100, int(params.get("pageSize", ["100"])[0]))
+        page = int(params.get("page", ["1"])[0])
+
+        if self.max_results is not None and (page - 1) * page_size >= self.max_results:
+            with self._lock:
+                self.stats["result_limited"] += 1
+            return 426, {}, {"status": "error", "code": "maximumResultsReached",
+                             "message": f"Results are limited to {self.max_results}"}
+
+        articles = self.search(query, from_time, to_time)
+        page_articles = articles[(page - 1) * page_size: page * page_size]
+        with self._lock:
+            self.stats["articles_served"] += len(page_articles)
+        return 200, {}, {"status": "ok", "totalResults": len(articles), "articles": page_articles}
+
+    def _handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if api.latency_ms:
+                    time.sleep(api.latency_ms / 1000)
+                status, headers, body = api._respond(parse_qs(urlparse(self.path).query))
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
@@ -1,11 +1,153 @@
 from dotenv import load_dotenv
 import os
+import socket
 
 load_dotenv()
 
 DB_URL = os.getenv("DB_URI")
 
-BASE_URL = "https://newsapi.org/v2/everything"
+BASE_URL = os.getenv("NEWS_API_BASE_URL", "https://newsapi.org/v2/everything")
+NEWS_API_PAGE_SIZE = min(100, int(os.getenv("NEWS_API_PAGE_SIZE", "100")))  # NewsAPI caps pageSize at 100
 NEWS_API_KEY = os.getenv("NEWS_API","").split(",")
 
-hf_token = os.getenv("HF_TOKEN")
\ No newline at end of file
+hf_token = os.getenv("HF_TOKEN")
+
+# Shared FinBERT micro-batching (see src/utils/inference_utils.py)
+INFERENCE_BATCH_SIZE = int(os.getenv("INFERENCE_BATCH_SIZE", "32"))
+INFERENCE_MAX_WAIT_MS = int(os.getenv("INFERENCE_MAX_WAIT_MS", "50"))
+# intra-op threads for torch / ONNX Runtime (0 = library default); independent of stage workers
+INFERENCE_THREADS = int(os.getenv("INFERENCE_THREADS", "0"))
+
+# FinBERT tokenization: max tokens per text and padded tokens per forward pass
+SENTIMENT_MAX_LENGTH = int(os.getenv("SENTIMENT_MAX_LENGTH", "256"))
+SENTIMENT_TOKEN_BUDGET = int(os.getenv("SENTIMENT_TOKEN_BUDGET", "4096"))
+
+# Inference backend: "torch", "onnx" or "onnx-int8" (exports cached per model revision under ONNX_CACHE_DIR);
+# "stub" skips the model entirely (offline benchmarks only)
+SENTIMENT_BACKEND = os.getenv("SENTIMENT_BACKEND", "torch")
+ONNX_CACHE_DIR = os.getenv("ONNX_CACHE_DIR", os.path.join(".cache", "onnx"))
+
+# Hugging Face revision of MODEL_ID; part of the sentiment cache key
+SENTIMENT_MODEL_REVISION = os.getenv("SENTIMENT_MODEL_REVISION", "main")
+
+# Persistent content-hash sentiment cache (0 entries disables it)
+SENTIMENT_CACHE_PATH = os.getenv("SENTIMENT_CACHE_PATH", os.path.join(".cache", "sentiment_cache.sqlite3"))
+SENTIMENT_CACHE_MAX_ENTRIES = int(os.getenv("SENTIMENT_CACHE_MAX_ENTRIES", "200000"))
+# last commit SHA resolved for SENTIMENT_MODEL_REVISION, reused when the Hub is unreachable
+SENTIMENT_MODEL_VERSION_PATH = os.getenv(
+    "SENTIMENT_MODEL_VERSION_PATH",
+    os.path.join(os.path.dirname(SENTIMENT_CACHE_PATH) or ".", "sentiment_model_version.json"),
+)
+
+# Near-duplicate suppression (SimHash Hamming distance threshold, index retention)
+NEAR_DUP_ENABLED = os.getenv("NEAR_DUP_ENABLED", "true").lower() in ("1", "true", "yes")
+NEAR_DUP_MAX_DISTANCE = int(os.getenv("NEAR_DUP_MAX_DISTANCE", "6"))
+NEAR_DUP_RETENTION_DAYS = int(os.getenv("NEAR_DUP_RETENTION_DAYS", "30"))
+NEAR_DUP_INDEX_PATH = os.getenv("NEAR_DUP_INDEX_PATH", os.path.join(".cache", "near_dup_index.sqlite3"))
+
+# Shared psycopg2 pool: at most DB_POOL_SIZE connections; how many are checked out
+# at once adapts between DB_POOL_MIN_IN_FLIGHT and that (see concurrency_utils)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_POOL_HEALTHCHECK_IDLE_SEC = float(os.getenv("DB_POOL_HEALTHCHECK_IDLE_SEC", "30"))
+DB_POOL_MIN_IN_FLIGHT = int(os.getenv("DB_POOL_MIN_IN_FLIGHT", "2"))
+
+# Streaming pagination: fetched articles move through relevance, dedup, prep, scoring and the writer
+# in chunks of at most this many, so a big backfill never holds all of its pages at once
+STREAM_CHUNK_ARTICLES = int(os.getenv("STREAM_CHUNK_ARTICLES", "50"))
+
+# Relevance prefilter before FinBERT (see src/utils/relevance_utils.py): name/alias hits
+# weigh 1, keyword hits RELEVANCE_KEYWORD_WEIGHT, x2 in the title. Articles scoring below
+# RELEVANCE_DROP_SCORE are dropped; below RELEVANCE_KEEP_SCORE they are stored with
+# "relevanceWeight" RELEVANCE_DOWNWEIGHT (sentimentScore itself is left unweighted).
+RELEVANCE_ENABLED = os.getenv("RELEVANCE_ENABLED", "true").lower() in ("1", "true", "yes")
+RELEVANCE_KEEP_SCORE = float(os.getenv("RELEVANCE_KEEP_SCORE", "1.0"))
+RELEVANCE_DROP_SCORE = float(os.getenv("RELEVANCE_DROP_SCORE", "0.4"))
+RELEVANCE_DOWNWEIGHT = float(os.getenv("RELEVANCE_DOWNWEIGHT", "0.5"))
+RELEVANCE_KEYWORD_WEIGHT = float(os.getenv("RELEVANCE_KEYWORD_WEIGHT", "0.2"))
+
+# Bulk Articles writer: flush when this many rows are buffered or the oldest is this old
+# (WRITER_FLUSH_SECONDS=0 disables the time-based flush)
+WRITER_FLUSH_ROWS = int(os.getenv("WRITER_FLUSH_ROWS", "500"))
+WRITER_FLUSH_SECONDS = float(os.getenv("WRITER_FLUSH_SECONDS", "10"))
+
+# NewsAPI query packing: several incremental startups per request, up to the `q` length limit
+QUERY_PACKING = os.getenv("QUERY_PACKING", "true").lower() in ("1", "true", "yes")
+QUERY_MAX_LENGTH = int(os.getenv("QUERY_MAX_LENGTH", "500"))
+QUERY_PACK_MAX_STARTUPS = int(os.getenv("QUERY_PACK_MAX_STARTUPS", "8"))
+
+# Async NewsAPI fetch engine: per-key token buckets and in-flight cap
+# (adaptive, starting at half of FETCH_MAX_IN_FLIGHT)
+NEWS_API_KEY_RATE = float(os.getenv("NEWS_API_KEY_RATE", "1.0"))     # requests/sec per key
+NEWS_API_KEY_BURST = float(os.getenv("NEWS_API_KEY_BURST", "2"))
+FETCH_MAX_IN_FLIGHT = int(os.getenv("FETCH_MAX_IN_FLIGHT", "16"))
+FETCH_MAX_PAGES = int(os.getenv("FETCH_MAX_PAGES", "10"))
+# results NewsAPI serves per query on this plan (developer keys: 100); pages past it answer 426
+NEWS_API_MAX_RESULTS = int(os.getenv("NEWS_API_MAX_RESULTS", "100"))
+# pages requested ahead of the consumer when streaming a query's results
+FETCH_PAGE_PREFETCH = int(os.getenv("FETCH_PAGE_PREFETCH", "2"))
+FETCH_RETRIES = int(os.getenv("FETCH_RETRIES", "3"))
+
+# NewsAPI key scheduling: daily per-key quota, cooldown after 429s, persisted usage
+NEWS_API_DAILY_QUOTA = int(os.getenv("NEWS_API_DAILY_QUOTA", "100"))
+NEWS_API_KEY_COOLDOWN_SEC = float(os.getenv("NEWS_API_KEY_COOLDOWN_SEC", "900"))
+NEWS_API_KEY_MAX_COOLDOWN_SEC = float(os.getenv("NEWS_API_KEY_MAX_COOLDOWN_SEC", "43200"))
+NEWS_API_KEY_STATE_PATH = os.getenv("NEWS_API_KEY_STATE_PATH", os.path.join(".cache", "newsapi_keys.json"))
+# "postgres": requests are counted in one "NewsApiKeyUsage" ledger shared by every runner and run,
+# reserved NEWS_API_KEY_RESERVE_BLOCK at a time; "file": only in this runner's NEWS_API_KEY_STATE_PATH.
+# Defaults to "postgres" for sharded runs (PIPELINE_RUN_ID set) and "file" otherwise.
+NEWS_API_KEY_LEDGER = os.getenv("NEWS_API_KEY_LEDGER", "postgres" if os.getenv("PIPELINE_RUN_ID") else "file").lower()
+NEWS_API_KEY_RESERVE_BLOCK = int(os.getenv("NEWS_API_KEY_RESERVE_BLOCK", "5"))
+
+# Streaming stage graph (final_pipeline): workers per stage and queue bound between stages.
+# 0 means FETCH_MAX_IN_FLIGHT for fetch and final_pipeline's max_workers for score.
+STAGE_FETCH_WORKERS = int(os.getenv("STAGE_FETCH_WORKERS", "0"))
+STAGE_DEDUP_WORKERS = int(os.getenv("STAGE_DEDUP_WORKERS", "2"))
+STAGE_RELEVANCE_WORKERS = int(os.getenv("STAGE_RELEVANCE_WORKERS", "2"))
+STAGE_PREP_WORKERS = int(os.getenv("STAGE_PREP_WORKERS", "2"))
+STAGE_SCORE_WORKERS = int(os.getenv("STAGE_SCORE_WORKERS", "0"))
+STAGE_WRITE_WORKERS = int(os.getenv("STAGE_WRITE_WORKERS", "1"))
+STAGE_QUEUE_SIZE = int(os.getenv("STAGE_QUEUE_SIZE", "32"))
+
+# Adaptive I/O concurrency (AIMD, see src/utils/concurrency_utils.py): a limit drops to
+# CONCURRENCY_BACKOFF x itself when a window of calls has more than CONCURRENCY_MAX_ERROR_RATE
+# 429s/errors or a median latency above CONCURRENCY_LATENCY_TOLERANCE x the best seen,
+# and grows by one after a healthy window that used it fully. false pins limits at their maximum.
+ADAPTIVE_CONCURRENCY = os.getenv("ADAPTIVE_CONCURRENCY", "true").lower() in ("1", "true", "yes")
+CONCURRENCY_BACKOFF = float(os.getenv("CONCURRENCY_BACKOFF", "0.5"))
+CONCURRENCY_LATENCY_TOLERANCE = float(os.getenv("CONCURRENCY_LATENCY_TOLERANCE", "2.0"))
+CONCURRENCY_MAX_ERROR_RATE = float(os.getenv("CONCURRENCY_MAX_ERROR_RATE", "0.1"))
+
+# Span tracing (histograms in the run summary); optional Prometheus textfile dump,
+# e.g. /var/lib/node_exporter/textfile_collector/startup_news.prom
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() in ("1", "true", "yes")
+METRICS_TEXTFILE_PATH = os.getenv("METRICS_TEXTFILE_PATH", "")
+
+# Incremental fetching: existing startups fetch from their newest stored publishedAt
+# (minus an overlap for late-indexed articles), capped at the NewsAPI history limit
+WATERMARK_OVERLAP_MINUTES = int(os.getenv("WATERMARK_OVERLAP_MINUTES", "60"))
+WATERMARK_MAX_LOOKBACK_DAYS = int(os.getenv("WATERMARK_MAX_LOOKBACK_DAYS", "30"))
+
+# Startup catalog loader (startup_push.py): rows per COPY + upsert batch
+CATALOG_BATCH_ROWS = int(os.getenv("CATALOG_BATCH_ROWS", "1000"))
+
+# Logging: records go through a bounded queue to a background writer thread
+# (a full queue drops INFO/DEBUG instead of blocking workers; warnings and errors
+# wait up to LOG_WARNING_PUT_TIMEOUT_SEC for room). LOG_BUDGET_RECORDS caps
+# INFO/DEBUG records per pipeline run (0 = unlimited); warnings always pass.
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_WARNING_PUT_TIMEOUT_SEC = float(os.getenv("LOG_WARNING_PUT_TIMEOUT_SEC", "0.5"))
+LOG_BUDGET_RECORDS = int(os.getenv("LOG_BUDGET_RECORDS", "20000"))
+
+# Run journal (SQLite): per-startup step checkpoints so `main.py --resume` can
+# continue an interrupted run without refetching or rescoring finished work
+RUN_JOURNAL_ENABLED = os.getenv("RUN_JOURNAL_ENABLED", "true").lower() in ("1", "true", "yes")
+RUN_JOURNAL_PATH = os.getenv("RUN_JOURNAL_PATH", os.path.join(".cache", "run_journal.sqlite3"))
+
+# Sharded runs: runners sharing a PIPELINE_RUN_ID (e.g. one CI run's matrix jobs)
+# claim startups through leases in Postgres; empty means a single local run.
+# A lease not renewed for LEASE_SECONDS is taken over by another runner.
+PIPELINE_RUN_ID = os.getenv("PIPELINE_RUN_ID", "")
+RUNNER_ID = os.getenv("RUNNER_ID", f"{socket.gethostname()}-{os.getpid()}")
+LEASE_SECONDS = int(os.getenv("LEASE_SECONDS", "300"))
+LEASE_BATCH = int(os.getenv("LEASE_BATCH", "8"))
+LEASE_MAX_ATTEMPTS = int(os.getenv("LEASE_MAX_ATTEMPTS", "3"))
@@ -1,8 +1,12 @@
+import atexit
 import logging
 import os
-from logging.handlers import RotatingFileHandler
+import queue
+import threading
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 from from_root import from_root
 from datetime import datetime
+from src.constants import LOG_QUEUE_SIZE, LOG_BUDGET_RECORDS, LOG_WARNING_PUT_TIMEOUT_SEC
 
 try:
     from colorama import Fore, Style, init as colorama_init
@@ -24,19 +28,109 @@ log_dir_path = os.path.join(from_root(), LOG_DIR)
 os.makedirs(log_dir_path, exist_ok=True)
 log_file_path = os.path.join(log_dir_path, LOG_FILE)
 
+_LOG_STATS = {"queued": 0, "dropped_queue_full": 0, "dropped_budget": 0, "warnings_waited": 0}
+_LOG_STATS_LOCK = threading.Lock()
+_listener = None
+
 
 # === Custom Formatter ===
 class ContextFormatter(logging.Formatter):
     def format(self, record):
-        # Add context if available (like startup name)
+        # Add context if available (like startup name); the record is shared by
+        # every handler, so prefix a copy instead of mutating record.msg
         context = getattr(record, "context", "")
         if context:
-            record.msg = f"[{context}] {record.msg}"
+            record = logging.makeLogRecord(record.__dict__)
+            record.msg, record.args = f"[{context}] {record.getMessage()}", None
         return super().format(record)
 
 
+# === Per-run volume budget ===
+class LogBudgetFilter(logging.Filter):
+    """Drops INFO/DEBUG records once `budget` have been logged this run; warnings always pass."""
+
+    def __init__(self, budget):
+        super().__init__()
+        self.budget = budget
+        self.used = 0
+
+    def filter(self, record):
+        if not self.budget or record.levelno >= logging.WARNING:
+            return True
+        with _LOG_STATS_LOCK:
+            self.used += 1
+            if self.used <= self.budget:
+                return True
+            _LOG_STATS["dropped_budget"] += 1
+            first_drop = self.used == self.budget + 1
+        if first_drop:
+            logging.warning("Log budget of %s records reached; dropping INFO/DEBUG for the rest of this run",
+                            self.budget)
+        return False
+
+
+# === Non-blocking queue handler ===
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Hands records to the listener thread. With the queue full, INFO/DEBUG
+    records are dropped (and counted) at once; warnings and errors wait up
+    to LOG_WARNING_PUT_TIMEOUT_SEC for room before they are dropped.
+    QueueHandler.prepare merges the message and traceback into the record
+    on the caller's thread; the formatters run on the listener thread.
+    """
+
+    def enqueue(self, record):
+        try:
+            if record.levelno >= logging.WARNING:
+                try:
+                    self.queue.put_nowait(record)
+                except queue.Full:
+                    with _LOG_STATS_LOCK:
+                        _LOG_STATS["warnings_waited"] += 1
+                    self.queue.put(record, timeout=LOG_WARNING_PUT_TIMEOUT_SEC)
+            else:
+                self.queue.put_nowait(record)
+        except queue.Full:
+            with _LOG_STATS_LOCK:
+                _LOG_STATS["dropped_queue_full"] += 1
+            return
+        with _LOG_STATS_LOCK:
+            _LOG_STATS["queued"] += 1
+
+
+_budget_filter = LogBudgetFilter(LOG_BUDGET_RECORDS)
+
+
+def reset_log_budget(budget=None):
+    """Start a new run's budget (and counters); `budget` overrides LOG_BUDGET_RECORDS."""
+    with _LOG_STATS_LOCK:
+        if budget is not None:
+            _budget_filter.budget = budget
+        _budget_filter.used = 0
+        for key in _LOG_STATS:
+            _LOG_STATS[key] = 0
+
+
+def get_log_stats():
+    with _LOG_STATS_LOCK:
+        return {
+            **_LOG_STATS,
+            "budget": _budget_filter.budget,
+            "queue_depth": _listener.queue.qsize() if _listener else 0,
+        }
+
+
+def stop_logger():
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    if _listener:
+        _listener.stop()
+        _listener = None
+
+
 # === Logger Configuration ===
 def configure_logger():
+    global _listener
     logger = logging.getLogger()
     logger.setLevel(logging.DEBUG)
 
@@ -68,13 +162,19 @@ def configure_logger():
     console_handler.setLevel(logging.INFO)
 
     # Reset previous handlers (avoid duplicate logs)
+    stop_logger()
     if logger.hasHandlers():
         logger.handlers.clear()
 
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    # File and console I/O happen on the listener thread; callers only enqueue
+    queue_handler = NonBlockingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+    queue_handler.addFilter(_budget_filter)
+    logger.addHandler(queue_handler)
+    _listener = QueueListener(queue_handler.queue, file_handler, console_handler, respect_handler_level=True)
+    _listener.start()
 
 
 # === Initialize Logger ===
 configure_logger()
+atexit.register(stop_logger)
 logging.info("Structured logger initialized successfully.")
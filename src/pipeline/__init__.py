@@ -1,12 +1,73 @@
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from src.utils import (
-    fetch_missing_startups,
-    fetch_startups,
-    process_and_store_initial_articles,
-    process_and_store_daily_articles,
-    reset_url_cache
+    plan_startups,
+    new_job,
+    run_step,
+    step_name,
+    PIPELINE_STEPS,
+    fetch_step,
+    dedup_step,
+    relevance_step,
+    prep_step,
+    score_step,
+    write_step,
+    release_job,
+    Stage,
+    StageGraph,
+    reset_url_cache,
+    shutdown_inference_scheduler,
+    get_batching_stats,
+    get_sentiment_cache_stats,
+    get_near_dup_stats,
+    claim_near_duplicates,
+    get_relevance_stats,
+    init_pool,
+    close_pool,
+    get_pool_stats,
+    close_article_writer,
+    get_article_writer,
+    plan_query_packs,
+    fetch_pack_pages,
+    fetch_article_pages,
+    fetch_cutoff,
+    drop_older,
+    ArticleChunker,
+    get_query_pack_stats,
+    close_fetch_engine,
+    span,
+    reset_traces,
+    get_trace_stats,
+    write_metrics_textfile,
+    start_journal_run,
+    checkpoint_job,
+    finish_journal_startup,
+    finish_journal_run,
+    start_leases,
+    complete_lease,
+    close_leases,
+    save_shard_summary,
+    LEASE_POLL_SECONDS,
+    get_concurrency_stats,
 )
-from src.logger import logging
+from src.constants import (
+    QUERY_PACKING,
+    PIPELINE_RUN_ID,
+    RUNNER_ID,
+    LEASE_BATCH,
+    METRICS_TEXTFILE_PATH,
+    FETCH_MAX_IN_FLIGHT,
+    INFERENCE_BATCH_SIZE,
+    INFERENCE_THREADS,
+    STAGE_FETCH_WORKERS,
+    STAGE_DEDUP_WORKERS,
+    STAGE_RELEVANCE_WORKERS,
+    STAGE_PREP_WORKERS,
+    STAGE_SCORE_WORKERS,
+    STAGE_WRITE_WORKERS,
+    STAGE_QUEUE_SIZE,
+)
+from src.logger import logging, reset_log_budget, get_log_stats
+import itertools
+import threading
 import time
 import psycopg2
 import os
@@ -25,62 +86,457 @@ def run_with_retries(func, retries=2, delay=5, *args):
             attempt += 1
             if attempt > retries:
                 raise
-            logging.warning(f"Retrying ({attempt}/{retries}) after error: {e}")
+            logging.warning("Retrying (%s/%s) after error: %s", attempt, retries, e)
             time.sleep(delay)
         except Exception:
             raise
 
 
-# --- Startup Processing Functions ---
+# --- Per-startup result tracking across the stage graph ---
+class RunTracker:
+    """
+    Collects one result per startup as its job leaves the graph (finished,
+    dropped or failed). `writer` is the run's ArticleWriter, which streamed
+    startups queue their batches on.
+    """
+
+    def __init__(self, writer=None):
+        self.writer = writer
+        self._lock = threading.Lock()
+        self._drained = threading.Condition(self._lock)
+        self._started = {}
+        self.streams = {}  # startup_id -> ChunkStream, for startups fetched in several chunks
+        self.results = []
+        self._results_by_id = {}
+        self._write_failures = set()  # failed flushes of startups still in the graph
+
+    def wait_in_flight_below(self, limit):
+        """Block until fewer than `limit` startups are still in the graph."""
+        with self._drained:
+            self._drained.wait_for(lambda: len(self._started) < limit)
+
+    def start(self, startup, phase):
+        with self._lock:
+            self._started[startup[0]] = (startup[1], phase, time.time())
+
+    def finish(self, startup_id, status="success", timings=None):
+        with self._lock:
+            if startup_id not in self._started:
+                return
+            name, phase, start = self._started.pop(startup_id)
+            self._drained.notify_all()
+            if status == "success" and startup_id in self._write_failures:
+                status = "write_failed"
+            duration = round(time.time() - start, 2)
+            result = {"name": name, "phase": phase, "status": status, "time": duration}
+            if timings:
+                # where this startup's time went, per span
+                result["timings"] = {span_name: round(sec, 3) for span_name, sec in timings.items()}
+            self.results.append(result)
+            self._results_by_id[startup_id] = result
+        tag = PHASE_TAGS[phase]
+        if status == "success":
+            logging.info("[%s] Completed for %s in %ss", tag, name, duration)
+        else:
+            logging.error("[%s] %s for %s after %ss", tag, status, name, duration)
+
+    def write_failed(self, startup_id):
+        """The writer dropped rows of a startup: its result becomes "write_failed"."""
+        with self._lock:
+            if startup_id in self._started:
+                # the flush beat finish(): it reports the failure instead
+                self._write_failures.add(startup_id)
+                return
+            result = self._results_by_id.get(startup_id)
+            if result is None or result["status"] != "success":
+                return
+            result["status"] = "write_failed"
+        logging.error("[%s] write_failed for %s", PHASE_TAGS[result["phase"]], result["name"])
+
+    def fail(self, stage_name, item, error):
+        status = "db_error" if isinstance(error, psycopg2.OperationalError) else "failed"
+        logging.error("Stage '%s' failed: %s", stage_name, error)
+        # the fetch stage works on whole packs, later stages on single-startup jobs;
+        # the journal keeps their last checkpoint so a resumed run retries them
+        if "startups" in item:
+            for sid, _, _ in item["startups"]:
+                if sid in self.streams:
+                    # already closed by the fetch stage; its chunks finish the startup
+                    continue
+                self.finish(sid, status)
+                finish_startup(sid, item["phase"], "failed")
+        elif "stream" in item:
+            release_job(item)
+            item["stream"].settle(item["chunk"], item.get("timings"), failed=True)
+        else:
+            release_job(item)
+            self.finish(item["startup_id"], status, item.get("timings"))
+            finish_startup(item["startup_id"], item["phase"], "failed")
+
+
+PHASE_TAGS = {"missing": "MISSING", "daily": "DAILY"}
+PHASE_DAYS = {"missing": 30, "daily": 1}
+STEP_ORDER = [step_name(step) for step in PIPELINE_STEPS]
+
+
+def finish_startup(startup_id, phase, status="done"):
+    """A startup's work is over (dropped, stored or failed): record it in the journal and its lease."""
+    finish_journal_startup(startup_id, phase, status)
+    complete_lease(startup_id, status)
+
+
+def journaled(job, phase, resume_after=None):
+    """Tag a job for the run journal: its phase, the checkpoint it resumes after, and the flush hook."""
+    job["phase"] = phase
+    job["resume_after"] = resume_after
+    job["on_stored"] = lambda: finish_startup(job["startup_id"], phase)
+    return job
+
+
+def resumed_past(job, name):
+    """True when a resumed job's checkpoint already covers step `name`."""
+    return bool(job.get("resume_after")) and STEP_ORDER.index(name) <= STEP_ORDER.index(job["resume_after"])
+
+
+class ChunkStream:
+    """
+    A startup whose articles span several chunks (see ArticleChunker). Chunks
+    cross the graph independently, but their rows reach the writer in chunk
+    order, oldest first, one batch at a time: the next batch is only queued
+    once the previous one committed, and nothing after a failed chunk or a
+    failed flush is written. An interrupted run thus only leaves a startup's
+    oldest articles stored, so the next run's watermark never skips a gap.
+    The startup finishes once every chunk has left the graph and all of its
+    rows are committed. Streamed startups are not snapshotted in the run
+    journal; a resume refetches them from their watermark.
+
+    Batches go to `writer`, the run's writer: the next one is queued from the
+    previous one's flush callback, which at the end of a run fires while that
+    writer is draining, so it must not be looked up again.
+    """
+
+    def __init__(self, startup_id, phase, tracker, writer):
+        self.startup_id = startup_id
+        self.phase = phase
+        self.tracker = tracker
+        self.writer = writer
+        self._lock = threading.Lock()
+        self._rows = {}  # chunk -> rows handed to the sink, until their turn
+        self._settled = set()
+        self._next = 0
+        self._chunks = None  # known once the fetch is done
+        self._failed = False
+        self._ready = []  # (rows, on_flush, on_failed) whose turn has come, waiting for the batch in flight
+        self._writing = None  # the batch in flight
+        self._left_graph = self._journaled = False
+        self.timings = {}
+
+    def job(self, chunk, sname, helping_words, days, articles, since):
+        job = new_job(self.startup_id, sname, helping_words, days, articles, since)
+        job.update({"phase": self.phase, "stream": self, "chunk": chunk})
+        job["sink"] = lambda rows, on_flush=None, on_failed=None: self._hold(chunk, rows, on_flush, on_failed)
+        return job
+
+    def _hold(self, chunk, rows, on_flush=None, on_failed=None):
+        with self._lock:
+            self._rows[chunk] = (rows, on_flush, on_failed)
+
+    def settle(self, chunk, timings=None, failed=False):
+        """Chunk `chunk` left the graph (its rows, if any, were handed to the sink)."""
+        with self._lock:
+            self._settled.add(chunk)
+            self._failed = self._failed or failed
+            for name, sec in (timings or {}).items():
+                self.timings[name] = self.timings.get(name, 0.0) + sec
+            while self._next in self._settled:
+                entry = self._rows.pop(self._next, None)
+                if entry:
+                    self._ready.append(entry)
+                self._next += 1
+            discarded = self._discard() if self._failed else []
+            batch = self._take_batch()
+        self._failed_entries(discarded, None)
+        self._write(batch)
+        self._check_done()
+
+    def fetch_done(self, chunks, failed=False, timings=None):
+        """The fetch produced `chunks` chunks in all (`failed`: it broke off after them)."""
+        with self._lock:
+            self._chunks = chunks
+            self._failed = self._failed or failed
+            for name, sec in (timings or {}).items():
+                self.timings[name] = self.timings.get(name, 0.0) + sec
+            discarded = self._discard() if self._failed else []
+        self._failed_entries(discarded, None)
+        self._check_done()
+
+    def _discard(self):
+        # caller holds the lock; rows that will never be written
+        discarded, self._ready = self._ready, []
+        return discarded
+
+    def _take_batch(self):
+        # caller holds the lock
+        if self._writing or self._failed or not self._ready:
+            return None
+        self._writing, self._ready = self._ready, []
+        return self._writing
+
+    def _write(self, batch):
+        if batch:
+            rows = [row for entry_rows, _, _ in batch for row in entry_rows]
+            self.writer.add(rows, on_flush=self._stored, on_failed=self._write_failed)
+
+    def _stored(self):
+        with self._lock:
+            stored, self._writing = self._writing, None
+            batch = self._take_batch()
+        for _, on_flush, _ in stored or ():
+            if on_flush:
+                on_flush()
+        self._write(batch)
+        self._check_done()
+
+    def _write_failed(self, error):
+        with self._lock:
+            lost, self._writing = self._writing or [], None
+            self._failed = True
+            lost += self._discard()
+        self._failed_entries(lost, error)
+        self.tracker.write_failed(self.startup_id)
+        self._check_done()
+
+    @staticmethod
+    def _failed_entries(entries, error):
+        for _, _, on_failed in entries:
+            if on_failed:
+                on_failed(error)
+
+    def _check_done(self):
+        with self._lock:
+            everything_settled = self._chunks is not None and len(self._settled) >= self._chunks
+            leave = everything_settled and not self._left_graph
+            self._left_graph = self._left_graph or leave
+            journal = (everything_settled and not self._journaled
+                       and (self._failed or not (self._writing or self._ready)))
+            self._journaled = self._journaled or journal
+            status = "failed" if self._failed else "success"
+        if leave:
+            self.tracker.finish(self.startup_id, status, self.timings)
+        if journal:
+            finish_startup(self.startup_id, self.phase, "failed" if status == "failed" else "done")
 
-def process_missing(startup_id, startup_name, helping_words):
-    """Handles initial article fetching for new startups with retry logic."""
-    start = time.time()
-    try:
-        def task():
-            process_and_store_initial_articles(startup_id, startup_name, helping_words)
-        run_with_retries(task, retries=2, delay=5)
 
-        duration = round(time.time() - start, 2)
-        logging.info(f"[MISSING] Completed for {startup_name} in {duration}s")
-        return {"name": startup_name, "phase": "missing", "status": "success", "time": duration}
+def plan_fetches(startups, phase, watermarks=None, packed=QUERY_PACKING):
+    """
+    Fetch-stage items for one phase: packed queries, or one item per startup.
+    Startups are packed in watermark order so each pack's window (from its
+    oldest watermark) stays close to every member's own.
+    """
+    watermarks = watermarks or {}
+    startups = sorted(startups, key=lambda s: watermarks[s[0]]) if watermarks else startups
+    if packed:
+        packs = plan_query_packs(startups)
+    else:
+        packs = [{"query": None, "startups": [startup]} for startup in startups]
+    for pack in packs:
+        pack["phase"] = phase
+        pack["watermarks"] = {sid: watermarks[sid] for sid, _, _ in pack["startups"] if sid in watermarks}
+        pack["since"] = min(pack["watermarks"].values(), default=None)
+    return packs
 
-    except psycopg2.OperationalError as e:
-        duration = round(time.time() - start, 2)
-        logging.error(f"[MISSING] DB connection lost for {startup_name}: {e}")
-        return {"name": startup_name, "phase": "missing", "status": "db_error", "time": duration}
 
-    except Exception as e:
-        duration = round(time.time() - start, 2)
-        logging.error(f"[MISSING] Failed for {startup_name}: {e}")
-        return {"name": startup_name, "phase": "missing", "status": "failed", "time": duration}
+def plan_items(startups, tracker, counts):
+    """Fetch-stage items for plan_startups() entries; starts tracking them and counts them by mode."""
+    missing = [(s["id"], s["name"], s["helping_words"]) for s in startups if s["mode"] == "backfill"]
+    existing = [(s["id"], s["name"], s["helping_words"]) for s in startups if s["mode"] == "incremental"]
+    watermarks = {s["id"]: s["last_published_at"] for s in startups if s["mode"] == "incremental"}
+    for startup in missing:
+        tracker.start(startup, "missing")
+    for startup in existing:
+        tracker.start(startup, "daily")
+    counts["backfill"] += len(missing)
+    counts["incremental"] += len(existing)
+    # only incremental windows are small enough to share NEWS_API_MAX_RESULTS;
+    # a 30-day backfill would mostly overrun it and be split again anyway
+    return plan_fetches(missing, "missing", packed=False) + plan_fetches(existing, "daily", watermarks)
 
 
-def process_existing(startup_id, startup_name, helping_words):
-    """Handles daily article fetching for existing startups with retry logic."""
-    start = time.time()
-    try:
-        def task():
-            process_and_store_daily_articles(startup_id, startup_name, helping_words)
-        run_with_retries(task, retries=2, delay=5)
+def leased_items(startups, tracker, counts, leases, max_in_flight):
+    """
+    Sharded runs: claim startups LEASE_BATCH at a time whenever fewer than
+    `max_in_flight` are still in this runner's graph, so faster runners take
+    more and none hoards a queue's worth. Once nothing is claimable the
+    runner waits while other runners still hold leases, to take over any
+    that expire (a dead runner), then stops.
+    """
+    by_id = {s["id"]: s for s in startups}
+    while True:
+        tracker.wait_in_flight_below(max_in_flight)
+        ids = leases.claim(LEASE_BATCH)
+        if not ids:
+            # publish our own finished startups first, so runners waiting on each other can stop
+            tracker.writer.flush()
+            leases.flush()
+            held, expires_in = leases.outstanding()
+            if not held:
+                return
+            time.sleep(min(max(expires_in, 1), LEASE_POLL_SECONDS))
+            continue
+        for sid in ids:
+            if sid not in by_id:
+                # added to the catalog after this runner planned
+                leases.complete(sid, "skipped")
+        yield from plan_items([by_id[sid] for sid in ids if sid in by_id], tracker, counts)
 
-        duration = round(time.time() - start, 2)
-        logging.info(f"[DAILY] Completed for {startup_name} in {duration}s")
-        return {"name": startup_name, "phase": "daily", "status": "success", "time": duration}
 
-    except psycopg2.OperationalError as e:
-        duration = round(time.time() - start, 2)
-        logging.error(f"[DAILY] DB connection lost for {startup_name}: {e}")
-        return {"name": startup_name, "phase": "daily", "status": "db_error", "time": duration}
+def write_failed(tracker, job):
+    tracker.write_failed(job["startup_id"])
+    finish_startup(job["startup_id"], job["phase"], "failed")
 
-    except Exception as e:
-        duration = round(time.time() - start, 2)
-        logging.error(f"[DAILY] Failed for {startup_name}: {e}")
-        return {"name": startup_name, "phase": "daily", "status": "failed", "time": duration}
+
+def step_stage(step, tracker):
+    """Wrap a pipeline step as a stage: jobs it drops are finished here, the rest move on."""
+    name = step_name(step)
+
+    def run(job):
+        if resumed_past(job, name):
+            return (job,)
+        stream = job.get("stream")
+        if step is write_step and stream is None:
+            # a failed flush turns the startup's result and journal entry into a failure
+            job["on_failed"] = lambda error: write_failed(tracker, job)
+        result = run_with_retries(run_step, 2, 5, step, job)
+        if result is None:
+            release_job(job)
+        if result is None or step is write_step:
+            # the job leaves the graph: dropped, or its rows queued for the writer,
+            # which journals it as done once its flush commits (`on_stored`)
+            if stream is not None:
+                stream.settle(job["chunk"], job.get("timings"))
+                return ()
+            tracker.finish(job["startup_id"], timings=job.get("timings"))
+            if result is None:
+                finish_startup(job["startup_id"], job["phase"])
+            return ()
+        if stream is None:
+            checkpoint_job(job, name, job["phase"])
+        return (result,)
+    return run
+
+
+def fetch_stage(tracker):
+    """
+    Streams each pack's pages into chunk jobs as they arrive. A startup whose
+    articles fit one chunk becomes a single, journaled job once its fetch is
+    done; a bigger one gets a ChunkStream and its chunks move on right away.
+    """
+    def run(pack):
+        if "startup_id" in pack:
+            # a job resumed from the run journal: already fetched
+            yield pack
+            return
+        days = PHASE_DAYS[pack["phase"]]
+        startups = {sid: (sname, helping_words) for sid, sname, helping_words in pack["startups"]}
+        if pack["query"]:
+            pages = fetch_pack_pages(pack, days, pack["since"])
+        else:
+            # unpacked: a single startup with its own query
+            (sid, (sname, helping_words)), = startups.items()
+            logging.info("📰 Starting %s article processing for %s",
+                         f"since {pack['since']}" if pack["since"] else f"{days}-day", sname)
+            pages = ({sid: page} for page in fetch_article_pages(sname, helping_words, days, pack["since"]))
+        cutoffs = {sid: fetch_cutoff(since) for sid, since in pack["watermarks"].items()}
+        chunkers = {sid: ArticleChunker() for sid in startups}
+        # page waits only (not time blocked on the next stage); per startup when unpacked
+        fetch_timings = {}
+        span_name = "fetch.pack" if pack["query"] else "step.fetch"
+
+        def timed(pages):
+            pages = iter(pages)
+            while True:
+                with span(span_name, None if pack["query"] else fetch_timings):
+                    page = next(pages, None)
+                if page is None:
+                    return
+                yield page
+
+        def chunk_job(sid, chunk, articles):
+            stream = tracker.streams.get(sid)
+            if stream is None:
+                stream = tracker.streams[sid] = ChunkStream(sid, pack["phase"], tracker, tracker.writer)
+            sname, helping_words = startups[sid]
+            return stream.job(chunk, sname, helping_words, days, articles, pack["watermarks"].get(sid))
+
+        try:
+            for page in timed(pages):
+                for sid, articles in page.items():
+                    # packed pages start at the pack's oldest watermark
+                    chunker = chunkers[sid]
+                    first = chunker.released
+                    for offset, chunk in enumerate(chunker.add(drop_older(articles, cutoffs.get(sid)))):
+                        yield chunk_job(sid, first + offset, chunk)
+        except Exception:
+            for sid, chunker in chunkers.items():
+                if sid in tracker.streams:
+                    tracker.streams[sid].fetch_done(chunker.released, failed=True, timings=fetch_timings)
+            raise
+
+        for sid, chunker in chunkers.items():
+            rest = chunker.close()
+            if chunker.released:
+                stream = tracker.streams[sid]
+                if rest:
+                    yield chunk_job(sid, chunker.released, rest)
+                stream.fetch_done(chunker.released + bool(rest), timings=fetch_timings)
+                continue
+            sname, helping_words = startups[sid]
+            job = journaled(new_job(sid, sname, helping_words, days, rest, pack["watermarks"].get(sid)), pack["phase"])
+            job["timings"] = dict(fetch_timings)
+            try:
+                result = run_with_retries(run_step, 2, 5, fetch_step, job)
+            except Exception as e:
+                tracker.fail("fetch", job, e)
+                continue
+            if result is None:
+                tracker.finish(sid, timings=job.get("timings"))
+                finish_startup(sid, pack["phase"])
+            else:
+                checkpoint_job(result, "fetch", pack["phase"])
+                yield result
+    return run
+
+
+def fetch_workers():
+    # fetch threads only wait on the NewsAPI engine, whose adaptive limit decides what is in flight
+    return STAGE_FETCH_WORKERS or FETCH_MAX_IN_FLIGHT
+
+
+def build_stage_graph(tracker, max_workers):
+    def workers(configured):
+        return configured or max_workers
+
+    return StageGraph([
+        Stage("fetch", fetch_stage(tracker), fetch_workers(), STAGE_QUEUE_SIZE),
+        Stage("relevance", step_stage(relevance_step, tracker), workers(STAGE_RELEVANCE_WORKERS), STAGE_QUEUE_SIZE),
+        Stage("dedup", step_stage(dedup_step, tracker), workers(STAGE_DEDUP_WORKERS), STAGE_QUEUE_SIZE),
+        Stage("prep", step_stage(prep_step, tracker), workers(STAGE_PREP_WORKERS), STAGE_QUEUE_SIZE),
+        Stage("score", step_stage(score_step, tracker), workers(STAGE_SCORE_WORKERS), STAGE_QUEUE_SIZE),
+        Stage("write", step_stage(write_step, tracker), workers(STAGE_WRITE_WORKERS), STAGE_QUEUE_SIZE),
+    ], on_error=tracker.fail)
 
 
 # --- Save summary JSON file ---
-def save_summary(results, total_time):
+_LAST_SUMMARY = None
+
+
+def get_last_summary():
+    """The summary dict written by the most recent final_pipeline run in this process."""
+    return _LAST_SUMMARY
+
+
+def save_summary(results, total_time, stats=None):
+    global _LAST_SUMMARY
     os.makedirs("logs", exist_ok=True)
     summary_path = os.path.join("logs", f"pipeline_summary_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
     summary = {
@@ -89,60 +545,133 @@ def save_summary(results, total_time):
         "total_startups": len(results),
         "results": results,
     }
+    summary.update(stats or {})
     with open(summary_path, "w") as f:
-        json.dump(summary, f, indent=2)
-    logging.info(f"Pipeline summary saved to {summary_path}")
+        json.dump(summary, f, indent=2, default=str)
+    logging.info("Pipeline summary saved to %s", summary_path)
+    _LAST_SUMMARY = summary
+    return summary
 
 
 # --- Main Pipeline ---
-def final_pipeline(max_workers=None):
+def final_pipeline(max_workers=None, resume=False):
+    """
+    One full run. `resume=True` continues the last interrupted run from the
+    run journal: finished startups are skipped and the rest re-enter the
+    stage graph after their last checkpoint. With PIPELINE_RUN_ID set, this
+    process is one runner of a sharded run and only works on startups it
+    leases (see src/utils/lease_utils.py). `max_workers` sizes the CPU-side
+    stages; NewsAPI and DB concurrency adapt at runtime (concurrency_utils).
+    """
     start_time = time.time()
-    results = []
 
+    reset_log_budget()
     logging.info("=== PIPELINE STARTED ===")
+    reset_traces()
     reset_url_cache()
 
     if not max_workers:
         cpu_count = os.cpu_count() or 4
         max_workers = max(2, min(10, cpu_count // 2))
-        logging.info(f"Auto-set max_workers = {max_workers}")
-
-    # Phase 1: Missing startups
-    missing_startups = fetch_missing_startups()  # should return id, name, helping_words
-    logging.info(f"Found {len(missing_startups)} missing startups")
-
-    if missing_startups:
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = {
-                executor.submit(process_missing, sid, sname, helping_words): sname
-                for sid, sname, helping_words in missing_startups
-            }
-            for future in as_completed(futures):
-                result = future.result()
-                results.append(result)
-
-    # Phase 2: Existing startups
-    all_startups = fetch_startups()  # should return id, name, helping_words
-    missing_ids = {sid for sid, _, _ in missing_startups}
-    existing_startups = [(sid, sname, helping_words) for sid, sname, helping_words in all_startups if sid not in missing_ids]
-    logging.info(f"Found {len(existing_startups)} existing startups")
-
-    if existing_startups:
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = {
-                executor.submit(process_existing, sid, sname, helping_words): sname
-                for sid, sname, helping_words in existing_startups
-            }
-            for future in as_completed(futures):
-                result = future.result()
-                results.append(result)
+        logging.info("Auto-set max_workers = %s", max_workers)
+
+    init_pool()
+
+    leases = start_leases()
+    if leases and resume:
+        logging.warning("--resume does not apply to sharded runs; expired leases are taken over instead")
+        resume = False
+
+    # Missing startups (30 days) and existing ones (from their watermark) share one stage graph
+    plan = plan_startups()  # one round trip: mode, newest publishedAt, article count
+
+    # a resumed run skips finished startups and re-enters checkpointed ones after their last step
+    journal = start_journal_run(resume)
+    finished, checkpoints = journal["finished"], journal["checkpoints"]
+    tracker = RunTracker(get_article_writer())
+    resumed_jobs = []
+    for s in plan:
+        if s["id"] in checkpoints:
+            phase, step, job = checkpoints[s["id"]]
+            tracker.start((s["id"], s["name"], s["helping_words"]), phase)
+            if job.get("contents"):
+                # past prep: its articles are claimed again until the writer stores them
+                job["near_dup_claim"] = claim_near_duplicates(job["articles"], job["contents"])
+            resumed_jobs.append(journaled(job, phase, step))
+    pending = [s for s in plan if s["id"] not in finished and s["id"] not in checkpoints]
+    if journal["resumed"]:
+        logging.info("Resuming %s checkpointed startups; skipping %s finished", len(resumed_jobs), len(finished))
+
+    counts = {"backfill": 0, "incremental": 0}
+    if leases:
+        # claimed lazily while the graph runs
+        fetches = leased_items(pending, tracker, counts, leases, max(LEASE_BATCH, fetch_workers()))
+    else:
+        fetches = plan_items(pending, tracker, counts)
+        logging.info("Found %s missing startups", counts["backfill"])
+        logging.info("Found %s existing startups", counts["incremental"])
+
+    # resumed jobs pass straight through the fetch stage
+    stage_report = build_stage_graph(tracker, max_workers).run(itertools.chain(resumed_jobs, fetches))
+    results = tracker.results
+    if leases:
+        logging.info("Runner %s processed %s missing and %s existing startups",
+                     RUNNER_ID, counts["backfill"], counts["incremental"])
+
+    # flush buffered inserts before the pool goes away
+    stats = {
+        "plan": {
+            "backfill": counts["backfill"],
+            "incremental": counts["incremental"],
+            "articles_stored": sum(s["article_count"] for s in plan),
+            "resumed": len(resumed_jobs),
+            "skipped_finished": len(finished),
+        },
+        "stages": stage_report,
+        "article_writer": close_article_writer(),
+        # after the final flush, and the streamed batches its callbacks queued, marked their startups done
+        "journal": finish_journal_run(),
+        "leases": close_leases(),
+    }
+    stats.update({
+        "inference": shutdown_inference_scheduler(),
+        "sentiment_batching": get_batching_stats(),
+        "sentiment_cache": get_sentiment_cache_stats(),
+        "relevance": get_relevance_stats(),
+        "near_duplicates": get_near_dup_stats(),
+        "newsapi_queries": get_query_pack_stats(),
+        # hands unused key quota back to the ledger, so before the pool closes
+        "newsapi": close_fetch_engine(),
+        "db_pool": get_pool_stats(),
+        # limits over time for the adaptive pools; inference is sized on its own
+        "concurrency": {
+            **get_concurrency_stats(),
+            "inference": {
+                "score_workers": STAGE_SCORE_WORKERS or max_workers,
+                "threads": INFERENCE_THREADS or "default",
+                "batch_size": INFERENCE_BATCH_SIZE,
+            },
+        },
+        "traces": get_trace_stats(),
+        "logging": get_log_stats(),
+    })
 
     total_time = round(time.time() - start_time, 2)
-    logging.info(f"=== PIPELINE COMPLETED in {total_time}s ===")
-    save_summary(results, total_time)
+    logging.info("=== PIPELINE COMPLETED in %ss ===", total_time)
+    summary = save_summary(results, total_time, stats)
+    if leases:
+        save_shard_summary(PIPELINE_RUN_ID, RUNNER_ID, summary)
+        logging.info("Shard summary stored; merge with `python -m src.utils.lease_utils merge %s`", PIPELINE_RUN_ID)
+    # the last DB user is done
+    close_pool()
+    if METRICS_TEXTFILE_PATH:
+        try:
+            write_metrics_textfile(METRICS_TEXTFILE_PATH, summary)
+        except OSError as e:
+            logging.warning("Could not write metrics textfile %s: %s", METRICS_TEXTFILE_PATH, e)
 
     success_count = sum(1 for r in results if r["status"] == "success")
     failed_count = sum(1 for r in results if r["status"] != "success")
-    logging.info(f"Summary: {success_count} succeeded | {failed_count} failed")
+    logging.info("Summary: %s succeeded | %s failed", success_count, failed_count)
 
     return results
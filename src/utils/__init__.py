@@ -1,6 +1,21 @@
+from .trace_utils import *
+from .concurrency_utils import *
 from .db_utils import *
 from .cache_utils import *
+from .key_utils import *
 from .newsapi_utils import *
+from .query_utils import *
 from .sentiment_utils import *
+from .inference_utils import *
+from .sentiment_cache_utils import *
 from .text_utils import *
-from .pipeline_utils import *
\ No newline at end of file
+from .neardup_utils import *
+from .relevance_utils import *
+from .rollup_utils import *
+from .writer_utils import *
+from .migration_utils import *
+from .catalog_utils import *
+from .journal_utils import *
+from .lease_utils import *
+from .pipeline_utils import *
+from .stage_utils import *
\ No newline at end of file
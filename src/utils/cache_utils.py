@@ -1,38 +1,42 @@
 # src/utils/cache_utils.py
-from datetime import datetime
-from src.utils.db_utils import fetch_existing_urls
+# Incremental URL dedup: each batch's candidate URLs are probed against
+# the Articles table, and URLs claimed during this run are remembered in
+# a lock-protected set, so memory scales with the run, not the history.
+import threading
+from src.utils.db_utils import fetch_existing_urls_among
 from src.logger import logging
 
-_EXISTING_URLS_CACHE = set()
-_EXISTING_URLS_CACHE_TS = 0
+_RUN_URLS = set()
+_RUN_URLS_LOCK = threading.Lock()
 
 
 def reset_url_cache():
-    """Clears in-memory cache to avoid false duplicates."""
-    global _EXISTING_URLS_CACHE, _EXISTING_URLS_CACHE_TS
-    _EXISTING_URLS_CACHE = set()
-    _EXISTING_URLS_CACHE_TS = 0
+    """Forget URLs claimed by the previous run."""
+    global _RUN_URLS
+    with _RUN_URLS_LOCK:
+        _RUN_URLS = set()
     logging.info("URL duplicate cache reset.")
 
 
-def fetch_existing_urls_cache():
-    """Fetch URLs and cache them."""
-    global _EXISTING_URLS_CACHE, _EXISTING_URLS_CACHE_TS
-    if _EXISTING_URLS_CACHE:
-        return _EXISTING_URLS_CACHE
-    urls = fetch_existing_urls()
-    _EXISTING_URLS_CACHE = urls
-    _EXISTING_URLS_CACHE_TS = datetime.now().timestamp()
-    logging.info(f"Cached {len(urls)} URLs from DB")
-    return _EXISTING_URLS_CACHE
+def check_duplicacy(articles):
+    """Filter out articles whose URL is already stored or already claimed this run."""
+    with _RUN_URLS_LOCK:
+        candidates = list(dict.fromkeys(
+            a['url'] for a in articles if a.get('url') and a['url'] not in _RUN_URLS
+        ))
 
+    stored = fetch_existing_urls_among(candidates)
 
-def check_duplicacy(articles):
-    """Filter out duplicate articles using cache."""
-    global _EXISTING_URLS_CACHE
-    existing_urls = fetch_existing_urls_cache()
-    new_articles = [a for a in articles if a.get('url') and a['url'] not in existing_urls]
-    new_urls = {a['url'] for a in new_articles if a.get('url')}
-    _EXISTING_URLS_CACHE.update(new_urls)
-    logging.info(f"Removed duplicates; {len(new_articles)} new articles remain.")
-    return new_articles
\ No newline at end of file
+    new_articles, claimed = [], set()
+    with _RUN_URLS_LOCK:
+        for article in articles:
+            url = article.get('url')
+            if not url or url in stored or url in claimed or url in _RUN_URLS:
+                continue
+            claimed.add(url)
+            new_articles.append(article)
+        # claim atomically so two workers never both keep the same URL
+        _RUN_URLS.update(claimed)
+
+    logging.info("Removed duplicates; %s new articles remain.", len(new_articles))
+    return new_articles
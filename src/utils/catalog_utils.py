@@ -0,0 +1,151 @@
+# src/utils/catalog_utils.py
+# Streaming loader for the startup catalog (startups_id.json or JSONL).
+# Records are parsed incrementally and upserted in batches: COPY into a temp
+# staging table, then one INSERT ... ON CONFLICT (id) DO UPDATE that only
+# rewrites rows whose content hash changed, so re-running is cheap and safe.
+#
+#   python startup_push.py [catalog.json|catalog.jsonl]
+import hashlib
+import json
+from src.constants import CATALOG_BATCH_ROWS
+from src.logger import logging
+from src.utils.db_utils import run_with_connection
+from src.utils.writer_utils import copy_buffer
+
+CATALOG_COLUMNS = ("id", "name", "description", "findingKeywords", "sector", "contentHash")
+_COLUMN_LIST = ", ".join(f'"{c}"' for c in CATALOG_COLUMNS)
+_READ_CHUNK = 64 * 1024
+
+
+def _iter_json_array(f):
+    """Yield the elements of a top-level JSON array without loading the whole file."""
+    decoder = json.JSONDecoder()
+    buf, pos, eof = "", 0, False
+    started = False
+    while True:
+        # skip whitespace, the opening bracket and separators
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if not started and pos < len(buf):
+                if buf[pos] != "[":
+                    raise ValueError("Catalog JSON must be an array of startups")
+                started, pos = True, pos + 1
+                continue
+            if pos < len(buf) or eof:
+                break
+            chunk = f.read(_READ_CHUNK)
+            eof = not chunk
+            buf, pos = buf[pos:] + chunk, 0
+        if pos >= len(buf) or buf[pos] == "]":
+            return
+        try:
+            item, end = decoder.raw_decode(buf, pos)
+        except ValueError:
+            if eof:
+                raise
+            # element spans the chunk boundary: read more and retry
+            chunk = f.read(_READ_CHUNK)
+            eof = not chunk
+            buf, pos = buf[pos:] + chunk, 0
+            continue
+        yield item
+        pos = end
+
+
+def iter_catalog(path):
+    """Yield startup records from a JSON array or JSONL file, one at a time."""
+    with open(path, encoding="utf-8") as f:
+        first = ""
+        while not first:
+            ch = f.read(1)
+            if not ch:
+                return
+            first = ch.strip()
+        f.seek(0)
+        if first == "[":
+            yield from _iter_json_array(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def content_hash(name, description, keywords, sector):
+    payload = json.dumps([name, description, keywords, sector], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _array_literal(values):
+    """Postgres TEXT[] literal; COPY escaping is applied on top by copy_buffer."""
+    quoted = ('"' + v.replace("\\", "\\\\").replace('"', '\\"') + '"' for v in values)
+    return "{" + ",".join(quoted) + "}"
+
+
+def catalog_row(record):
+    """Staging row in CATALOG_COLUMNS order, or None if the record has no id/name."""
+    startup_id, name = record.get("id"), (record.get("name") or "").strip()
+    if not startup_id or not name:
+        return None
+    keywords = [str(k).strip() for k in record.get("keywords") or [] if str(k).strip()]
+    description, sector = record.get("description"), record.get("sector")
+    return (str(startup_id), name, description, _array_literal(keywords), sector,
+            content_hash(name, description, keywords, sector))
+
+
+def _upsert(conn, rows):
+    """COPY one batch into staging and upsert it; returns (inserted, updated)."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS startups_staging
+            (LIKE "Startups" INCLUDING DEFAULTS) ON COMMIT DELETE ROWS
+        """)
+        cur.copy_expert(f"COPY startups_staging ({_COLUMN_LIST}) FROM STDIN", copy_buffer(rows))
+        cur.execute(f"""
+            INSERT INTO "Startups" ({_COLUMN_LIST})
+            SELECT {_COLUMN_LIST} FROM startups_staging
+            ON CONFLICT (id) DO UPDATE SET
+                name = EXCLUDED.name,
+                description = EXCLUDED.description,
+                "findingKeywords" = EXCLUDED."findingKeywords",
+                sector = EXCLUDED.sector,
+                "contentHash" = EXCLUDED."contentHash"
+            WHERE "Startups"."contentHash" IS DISTINCT FROM EXCLUDED."contentHash"
+            RETURNING (xmax = 0)
+        """)
+        flags = [row[0] for row in cur.fetchall()]
+    conn.commit()
+    inserted = sum(flags)
+    return inserted, len(flags) - inserted
+
+
+def load_catalog(path, batch_rows=CATALOG_BATCH_ROWS):
+    """Upsert every startup in `path`; returns counts of read/inserted/updated/unchanged/skipped rows."""
+    stats = {"read": 0, "inserted": 0, "updated": 0, "unchanged": 0, "skipped": 0, "batches": 0}
+    batch = {}
+
+    def flush():
+        # a later duplicate id in the same batch wins, as it would across batches
+        rows = list(batch.values())
+        batch.clear()
+        inserted, updated = run_with_connection(lambda conn: _upsert(conn, rows))
+        stats["batches"] += 1
+        stats["inserted"] += inserted
+        stats["updated"] += updated
+        stats["unchanged"] += len(rows) - inserted - updated
+
+    for record in iter_catalog(path):
+        stats["read"] += 1
+        row = catalog_row(record) if isinstance(record, dict) else None
+        if row is None:
+            stats["skipped"] += 1
+            logging.warning("Skipping catalog record #%s without id/name", stats['read'])
+            continue
+        batch[row[0]] = row
+        if len(batch) >= batch_rows:
+            flush()
+    if batch:
+        flush()
+
+    logging.info("Catalog %s loaded: %s", path, stats)
+    return stats
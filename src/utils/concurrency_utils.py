@@ -0,0 +1,209 @@
+# src/utils/concurrency_utils.py
+# AIMD (additive increase, multiplicative decrease) limits on in-flight I/O:
+# NewsAPI requests and pooled DB connections. Each limit is judged once per
+# window of completed calls (about one call per slot): too many 429s or
+# errors, or (with every slot in use) a median latency well above the best
+# window seen, cuts it by CONCURRENCY_BACKOFF; a healthy window that used
+# every slot raises it by one. Changes are kept as a history for the run summary.
+import asyncio
+import threading
+import time
+from src.constants import (
+    ADAPTIVE_CONCURRENCY,
+    CONCURRENCY_BACKOFF,
+    CONCURRENCY_LATENCY_TOLERANCE,
+    CONCURRENCY_MAX_ERROR_RATE,
+)
+from src.logger import logging
+
+_MIN_WINDOW = 8
+# the latency baseline may creep up this much per window, so a lasting shift is eventually accepted
+_BASELINE_DRIFT = 0.02
+_HISTORY_MAX = 200
+
+
+class AimdLimit:
+    """Adaptive cap on concurrent calls, usable from threads (`acquire`) and asyncio (`acquire_async`)."""
+
+    def __init__(self, name, ceiling, floor=1, initial=None, adaptive=ADAPTIVE_CONCURRENCY):
+        self.name = name
+        self.maximum = max(1, ceiling)
+        self.minimum = min(max(1, floor), self.maximum) if adaptive else self.maximum
+        start = initial if initial is not None else self.maximum // 2
+        self.limit = min(max(start, self.minimum), self.maximum) if adaptive else self.maximum
+        self.adaptive = adaptive
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self._async_waiters = []
+        self._started = time.monotonic()
+        self._window = {"calls": 0, "throttled": 0, "errors": 0, "latencies": [], "saturated": False}
+        self._baseline = None
+        self.history = [[0.0, self.limit, "start"]]
+        self.stats = {"calls": 0, "throttled": 0, "errors": 0, "increases": 0, "decreases": 0,
+                      "waits": 0, "wait_sec": 0.0, "peak_in_flight": 0}
+
+    # --- acquiring ---
+    def _take(self):
+        # caller holds the lock
+        if self.in_flight >= self.limit:
+            return False
+        self.in_flight += 1
+        self.stats["peak_in_flight"] = max(self.stats["peak_in_flight"], self.in_flight)
+        if self.in_flight >= self.limit:
+            self._window["saturated"] = True
+        return True
+
+    def try_acquire(self):
+        with self._lock:
+            return self._take()
+
+    def acquire(self):
+        """Block until a slot is free."""
+        with self._available:
+            if self._take():
+                return
+            start = time.monotonic()
+            self._available.wait_for(self._take)
+            self.stats["waits"] += 1
+            self.stats["wait_sec"] += time.monotonic() - start
+
+    async def acquire_async(self):
+        """Wait for a slot without blocking the event loop."""
+        loop = asyncio.get_running_loop()
+        start = None
+        while True:
+            with self._lock:
+                if self._take():
+                    if start is not None:
+                        self.stats["waits"] += 1
+                        self.stats["wait_sec"] += time.monotonic() - start
+                    return
+                waiter = loop.create_future()
+                self._async_waiters.append(waiter)
+            start = start or time.monotonic()
+            await waiter
+
+    def _wake(self):
+        # caller holds the lock
+        self._available.notify_all()
+        waiters, self._async_waiters = self._async_waiters, []
+        for waiter in waiters:
+            waiter.get_loop().call_soon_threadsafe(_resolve, waiter)
+
+    def slot(self):
+        """`with limit.slot() as s:` / `async with ...`; set `s.outcome` to "throttled" or "error" if needed."""
+        return _Slot(self)
+
+    # --- feedback ---
+    def release(self, latency=None, outcome="ok"):
+        """Free a slot and record how the call went: "ok", "throttled" (429) or "error"."""
+        with self._lock:
+            self.in_flight -= 1
+            window = self._window
+            window["calls"] += 1
+            self.stats["calls"] += 1
+            if outcome == "throttled":
+                window["throttled"] += 1
+                self.stats["throttled"] += 1
+            elif outcome == "error":
+                window["errors"] += 1
+                self.stats["errors"] += 1
+            elif latency is not None:
+                window["latencies"].append(latency)
+            if self.adaptive and window["calls"] >= max(_MIN_WINDOW, self.limit):
+                self._adjust()
+            self._wake()
+
+    def _adjust(self):
+        # caller holds the lock; one decision per window
+        window = self._window
+        self._window = {"calls": 0, "throttled": 0, "errors": 0, "latencies": [], "saturated": False}
+        latencies = sorted(window["latencies"])
+        median = latencies[len(latencies) // 2] if latencies else None
+        slow = median is not None and self._baseline is not None and median > self._baseline * CONCURRENCY_LATENCY_TOLERANCE
+        if median is not None:
+            self._baseline = median if self._baseline is None else min(median, self._baseline * (1 + _BASELINE_DRIFT))
+
+        if (window["throttled"] + window["errors"]) / window["calls"] > CONCURRENCY_MAX_ERROR_RATE:
+            reason = "429s" if window["throttled"] >= window["errors"] else "errors"
+            self._set_limit(max(self.minimum, int(self.limit * CONCURRENCY_BACKOFF)), reason)
+        elif slow and window["saturated"]:
+            # only blame latency on our own concurrency when the limit was actually reached
+            self._set_limit(max(self.minimum, int(self.limit * CONCURRENCY_BACKOFF)), "latency")
+        elif window["saturated"]:
+            self._set_limit(min(self.maximum, self.limit + 1), "increase")
+
+    def _set_limit(self, limit, reason):
+        if limit == self.limit:
+            return
+        self.stats["increases" if limit > self.limit else "decreases"] += 1
+        self.limit = limit
+        self.history.append([round(time.monotonic() - self._started, 2), limit, reason])
+        if len(self.history) > _HISTORY_MAX:
+            # keep the starting point, drop the oldest changes after it
+            del self.history[1]
+        logging.debug("Concurrency limit %s -> %s (%s)", self.name, limit, reason)
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats.update({
+                "limit": self.limit,
+                "min": self.minimum,
+                "max": self.maximum,
+                "adaptive": self.adaptive,
+                "latency_baseline_ms": round(self._baseline * 1000, 1) if self._baseline is not None else None,
+                "history": [list(change) for change in self.history],
+            })
+        stats["wait_sec"] = round(stats["wait_sec"], 3)
+        return stats
+
+
+def _resolve(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class _Slot:
+    def __init__(self, limit):
+        self.limit = limit
+        self.outcome = None
+
+    def __enter__(self):
+        self.limit.acquire()
+        self._start = time.monotonic()
+        return self
+
+    async def __aenter__(self):
+        await self.limit.acquire_async()
+        self._start = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        outcome = self.outcome or ("error" if exc_type is not None else "ok")
+        self.limit.release(time.monotonic() - self._start, outcome)
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.__exit__(exc_type, exc, tb)
+
+
+_LIMITS = {}
+_LIMITS_LOCK = threading.Lock()
+
+
+def adaptive_limit(name, ceiling, floor=1):
+    """Create the run's limit for `name` (replacing an older one) and register it for the summary."""
+    limit = AimdLimit(name, ceiling, floor)
+    with _LIMITS_LOCK:
+        _LIMITS[name] = limit
+    logging.info("Concurrency limit '%s' starts at %s (range %s-%s%s)", name, limit.limit, limit.minimum,
+                 limit.maximum, "" if limit.adaptive else ", fixed")
+    return limit
+
+
+def get_concurrency_stats():
+    """Current limit, counters and limit history per registered limit."""
+    with _LIMITS_LOCK:
+        limits = dict(_LIMITS)
+    return {name: limit.snapshot() for name, limit in limits.items()}
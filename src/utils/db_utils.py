@@ -1,9 +1,16 @@
 # src/utils/db_utils.py
 import json
+import threading
+import time
 import psycopg2
-from src.constants import DB_URL
+from contextlib import contextmanager
+from psycopg2 import extensions
+from psycopg2.pool import ThreadedConnectionPool
+from src.constants import DB_URL, DB_POOL_SIZE, DB_POOL_MIN_IN_FLIGHT, DB_POOL_HEALTHCHECK_IDLE_SEC
 from datetime import datetime
 from src.logger import logging
+from src.utils.concurrency_utils import adaptive_limit
+from src.utils.trace_utils import span
 
 
 def get_connection():
@@ -18,71 +25,309 @@ def get_connection():
         logging.info('db connected')
         return conn
     except Exception as e:
-        logging.error(f"Failed to create DB connection: {e}")
+        logging.error("Failed to create DB connection: %s", e)
         raise
 
 
-def fetch_existing_urls():
-    """Fetch URLs from Articles table."""
-    conn = get_connection()
+# =========================================================
+# CONNECTION POOL
+# =========================================================
+_POOL = None
+_POOL_SLOTS = None
+_POOL_LOCK = threading.RLock()
+_POOL_STATS = {
+    "size": 0,
+    "checkouts": 0,
+    "waits": 0,
+    "wait_sec": 0.0,
+    "creations": 0,
+    "health_checks": 0,
+    "reconnects": 0,
+    "round_trips": 0,
+}
+_LAST_USED = {}
+
+
+def _count_round_trips(n=1):
+    with _POOL_LOCK:
+        _POOL_STATS["round_trips"] += n
+
+
+class _CountingCursor(extensions.cursor):
+    """Counts statements sent to the server (executemany costs one per parameter set)."""
+
+    def execute(self, query, vars=None):
+        _count_round_trips()
+        return super().execute(query, vars)
+
+    def executemany(self, query, vars_list):
+        vars_list = list(vars_list)
+        _count_round_trips(len(vars_list))
+        return super().executemany(query, vars_list)
+
+    def copy_expert(self, sql, file, size=8192):
+        _count_round_trips()
+        return super().copy_expert(sql, file, size)
+
+
+class _CountingConnection(extensions.connection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cursor_factory = _CountingCursor
+
+    def commit(self):
+        _count_round_trips()
+        return super().commit()
+
+    def rollback(self):
+        _count_round_trips()
+        return super().rollback()
+
+
+class _CountingPool(ThreadedConnectionPool):
+    def _connect(self, key=None):
+        conn = super()._connect(key)
+        with _POOL_LOCK:
+            _POOL_STATS["creations"] += 1
+        logging.info('db connected (pool)')
+        return conn
+
+
+def init_pool(size=None):
+    """Create the shared pool (no-op if it already exists). `size` caps connections; use adapts below it."""
+    global _POOL, _POOL_SLOTS
+    with _POOL_LOCK:
+        if _POOL is not None:
+            return _POOL
+        if not DB_URL:
+            raise ValueError("Database URL not found. Please set DB_URL in environment or constants.")
+        size = max(1, size or DB_POOL_SIZE)
+        _POOL = _CountingPool(1, size, DB_URL, connection_factory=_CountingConnection)
+        # ThreadedConnectionPool raises when exhausted; the adaptive limit makes callers wait instead
+        _POOL_SLOTS = adaptive_limit("db", size, DB_POOL_MIN_IN_FLIGHT)
+        _POOL_STATS["size"] = size
+    logging.info("DB connection pool ready (size=%s)", size)
+    return _POOL
+
+
+def close_pool():
+    """Close every pooled connection and return the pool stats."""
+    global _POOL, _POOL_SLOTS
+    with _POOL_LOCK:
+        pool, _POOL, _POOL_SLOTS = _POOL, None, None
+        _LAST_USED.clear()
+    if pool is not None:
+        pool.closeall()
+        logging.info("DB connection pool closed")
+    return get_pool_stats()
+
+
+def get_pool_stats():
+    with _POOL_LOCK:
+        stats = dict(_POOL_STATS)
+    stats["wait_sec"] = round(stats["wait_sec"], 3)
+    return stats
+
+
+def _is_healthy(conn):
+    if conn.closed:
+        return False
+    last_used = _LAST_USED.get(id(conn))
+    if last_used is None or time.monotonic() - last_used < DB_POOL_HEALTHCHECK_IDLE_SEC:
+        return True
+    with _POOL_LOCK:
+        _POOL_STATS["health_checks"] += 1
     try:
         with conn.cursor() as cur:
-            cur.execute('SELECT url FROM "Articles"')
-            urls = {row[0] for row in cur.fetchall() if row[0]}
-        logging.info(f"Fetched {len(urls)} existing URLs from DB")
-        return urls
+            cur.execute("SELECT 1")
+        conn.rollback()
+        return True
+    except psycopg2.Error:
+        return False
+
+
+def _checkout():
+    pool = init_pool()
+    slots = _POOL_SLOTS
+    if not slots.try_acquire():
+        start = time.monotonic()
+        slots.acquire()
+        with _POOL_LOCK:
+            _POOL_STATS["waits"] += 1
+            _POOL_STATS["wait_sec"] += time.monotonic() - start
+    try:
+        conn = pool.getconn()
+        if not _is_healthy(conn):
+            logging.warning("Discarding stale pooled DB connection")
+            _LAST_USED.pop(id(conn), None)
+            pool.putconn(conn, close=True)
+            with _POOL_LOCK:
+                _POOL_STATS["reconnects"] += 1
+            conn = pool.getconn()
+    except Exception:
+        # e.g. "too many connections": tells the limit to back off
+        slots.release(outcome="error")
+        raise
+    with _POOL_LOCK:
+        _POOL_STATS["checkouts"] += 1
+    return pool, slots, conn
+
+
+def _checkin(pool, slots, conn, held_sec, broken=False):
+    try:
+        if not broken and not conn.closed and conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+            conn.rollback()
+        close = broken or bool(conn.closed)
+        if close:
+            _LAST_USED.pop(id(conn), None)
+        else:
+            _LAST_USED[id(conn)] = time.monotonic()
+        pool.putconn(conn, close=close)
+    except Exception as e:
+        logging.warning("Failed to return DB connection to pool: %s", e)
+        _LAST_USED.pop(id(conn), None)
+        pool.putconn(conn, close=True)
+    finally:
+        # how long the connection was held is the latency signal for the limit
+        slots.release(held_sec, "error" if broken else "ok")
+
+
+@contextmanager
+def pooled_connection():
+    """Check a connection out of the shared pool for the duration of a `with` block."""
+    with span("db.checkout"):
+        pool, slots, conn = _checkout()
+    checked_out = time.monotonic()
+    broken = False
+    try:
+        yield conn
+    except psycopg2.OperationalError:
+        broken = True
+        raise
     finally:
-        conn.close()
+        _checkin(pool, slots, conn, time.monotonic() - checked_out, broken)
+
+
+def run_with_connection(func, retries=1):
+    """Run func(conn) on a pooled connection, reconnecting if the connection drops."""
+    attempt = 0
+    while True:
+        try:
+            with pooled_connection() as conn, span("db.query"):
+                return func(conn)
+        except psycopg2.OperationalError as e:
+            if attempt >= retries:
+                raise
+            attempt += 1
+            with _POOL_LOCK:
+                _POOL_STATS["reconnects"] += 1
+            logging.warning("DB connection lost, reconnecting (%s/%s): %s", attempt, retries, e)
+
+
+# =========================================================
+# QUERIES
+# =========================================================
+def fetch_existing_urls_among(urls):
+    """Return the subset of `urls` already stored in Articles (one indexed probe)."""
+    urls = list(urls)
+    if not urls:
+        return set()
+
+    def query(conn):
+        with conn.cursor() as cur:
+            cur.execute('SELECT url FROM "Articles" WHERE url = ANY(%s)', (urls,))
+            return {row[0] for row in cur.fetchall()}
+
+    existing = run_with_connection(query)
+    logging.info("Probed %s candidate URLs; %s already stored", len(urls), len(existing))
+    return existing
 
 
 def fetch_startups():
     """Fetch startup id, name, and keywords."""
-    conn = get_connection()
-    try:
+    def query(conn):
         with conn.cursor() as cur:
             cur.execute('SELECT id, name, COALESCE("findingKeywords",\'{}\') FROM "Startups"')
-            startups = cur.fetchall()
-        return startups
-    finally:
-        conn.close()
+            return cur.fetchall()
+
+    return run_with_connection(query)
+
+
+def plan_startups():
+    """
+    Run plan in one round trip: every startup with its mode ("backfill" when
+    it has no articles yet, else "incremental"), newest stored publishedAt
+    and article count. The newest-article lookup is an index scan on
+    ("startupId", "publishedAt") (see migration_utils) and the count comes
+    from the StartupSentimentDaily rollup, so planning cost tracks the number
+    of startups rather than the size of Articles.
+    """
+    def query(conn):
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT s.id, s.name, COALESCE(s."findingKeywords", '{}'), latest."publishedAt", COALESCE(counts.n, 0)
+                FROM "Startups" s
+                LEFT JOIN LATERAL (
+                    SELECT a."publishedAt" FROM "Articles" a
+                    WHERE a."startupId" = s.id
+                    ORDER BY a."publishedAt" DESC
+                    LIMIT 1
+                ) latest ON TRUE
+                LEFT JOIN (
+                    SELECT "startupId", SUM("articleCount") AS n
+                    FROM "StartupSentimentDaily"
+                    GROUP BY "startupId"
+                ) counts ON counts."startupId" = s.id
+            """)
+            return cur.fetchall()
+
+    plan = [
+        {
+            "id": sid,
+            "name": name,
+            "helping_words": helping_words,
+            "mode": "backfill" if last_published is None else "incremental",
+            "last_published_at": last_published,
+            "article_count": int(count),
+        }
+        for sid, name, helping_words, last_published, count in run_with_connection(query)
+    ]
+    backfill = sum(1 for startup in plan if startup["mode"] == "backfill")
+    logging.info("Planned run: %s backfill, %s incremental startups", backfill, len(plan) - backfill)
+    return plan
 
 
 def fetch_startup_id_from_articles():
     """Fetch distinct startup IDs from Articles."""
-    conn = get_connection()
-    try:
+    def query(conn):
         with conn.cursor() as cur:
             cur.execute('SELECT DISTINCT "startupId" FROM "Articles"')
-            startup_saved = cur.fetchall()
-        return startup_saved
-    finally:
-        conn.close()
+            return cur.fetchall()
+
+    return run_with_connection(query)
 
 
 def fetch_startup_id_from_startupss():
     """Fetch all startup IDs from Startups."""
-    conn = get_connection()
-    try:
+    def query(conn):
         with conn.cursor() as cur:
             cur.execute('SELECT "id" FROM "Startups"')
-            startup_saved = cur.fetchall()
-        return startup_saved
-    finally:
-        conn.close()
+            return cur.fetchall()
+
+    return run_with_connection(query)
 
 
 def fetch_missing_startups():
     """Fetch startups that are not yet present in Articles."""
-    conn = get_connection()
-    try:
+    def query(conn):
         with conn.cursor() as cur:
             cur.execute("""
                 SELECT s.id, s.name, COALESCE(s."findingKeywords", '{}')
-                FROM "Startups" s 
-                WHERE s.id NOT IN (SELECT "startupId" FROM "Articles")
+                FROM "Startups" s
+                WHERE NOT EXISTS (SELECT 1 FROM "Articles" a WHERE a."startupId" = s.id)
             """)
-            missing = cur.fetchall()
-        logging.info('Fetched missing startups')
-        return missing
-    finally:
-        conn.close()
+            return cur.fetchall()
+
+    missing = run_with_connection(query)
+    logging.info('Fetched missing startups')
+    return missing
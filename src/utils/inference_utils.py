@@ -0,0 +1,161 @@
+# src/utils/inference_utils.py
+# Central FinBERT inference scheduler shared by all pipeline workers.
+# Workers submit texts; a single background thread packs them into
+# fixed-size micro-batches (or whatever arrived before the deadline)
+# and runs them serially on the model.
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from src.constants import INFERENCE_BATCH_SIZE, INFERENCE_MAX_WAIT_MS
+from src.logger import logging
+from src.utils.sentiment_utils import sentiment_score_batch
+
+
+class InferenceScheduler:
+    """Cross-startup micro-batching front-end for `sentiment_score_batch`."""
+
+    def __init__(self, batch_size=INFERENCE_BATCH_SIZE, max_wait_ms=INFERENCE_MAX_WAIT_MS):
+        self.batch_size = max(1, batch_size)
+        self.max_wait = max(0, max_wait_ms) / 1000
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopped = False
+        self.stats = {
+            "requests": 0,
+            "texts": 0,
+            "batches": 0,
+            "full_batches": 0,
+            "busy_sec": 0.0,
+        }
+
+    def start(self):
+        with self._lock:
+            self._stopped = False
+            self._ensure_thread()
+
+    def _ensure_thread(self):
+        # caller holds the lock
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="finbert-scheduler", daemon=True)
+        self._thread.start()
+        logging.info("Inference scheduler started (batch_size=%s, max_wait=%ss)", self.batch_size, self.max_wait)
+
+    def submit(self, texts):
+        """Queue texts for scoring and return one Future per text."""
+        futures = [Future() for _ in texts]
+        # checked and enqueued under the lock shutdown takes, so texts always land ahead of its stop marker
+        with self._lock:
+            if self._stopped:
+                raise RuntimeError("Inference scheduler has been shut down")
+            self._ensure_thread()
+            for text, future in zip(texts, futures):
+                self._queue.put((text, future))
+            self.stats["requests"] += 1
+            self.stats["texts"] += len(futures)
+        return futures
+
+    def score(self, texts):
+        """Blocking helper: returns [(label, score), ...] in input order."""
+        if not texts:
+            return []
+        return [f.result() for f in self.submit(texts)]
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            thread, self._thread = self._thread, None
+            self._stopped = True
+            if thread:
+                self._queue.put(None)
+        if thread and wait:
+            thread.join()
+        logging.info("Inference scheduler stopped: %s", self.get_stats())
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+        stats["busy_sec"] = round(stats["busy_sec"], 3)
+        stats["avg_batch_size"] = round(stats["texts"] / stats["batches"], 2) if stats["batches"] else 0
+        return stats
+
+    def _collect_batch(self, first):
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # keep the shutdown marker for the outer loop
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                # drain anything submitted before shutdown; decided under the lock so
+                # a concurrent submit either lands first or starts a fresh thread
+                with self._lock:
+                    if self._queue.empty():
+                        if self._thread is threading.current_thread():
+                            self._thread = None
+                        return
+                    self._queue.put(None)
+                continue
+
+            batch = self._collect_batch(first)
+            texts = [text for text, _ in batch]
+            start = time.perf_counter()
+            try:
+                results = sentiment_score_batch(texts)
+                if len(results) != len(batch):
+                    raise RuntimeError(f"Expected {len(batch)} results, model returned {len(results)}")
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as e:
+                logging.error("Inference batch of %s failed: %s", len(batch), e)
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            finally:
+                with self._lock:
+                    self.stats["batches"] += 1
+                    self.stats["busy_sec"] += time.perf_counter() - start
+                    if len(batch) == self.batch_size:
+                        self.stats["full_batches"] += 1
+
+
+_SCHEDULER = None
+_SCHEDULER_LOCK = threading.Lock()
+
+
+def get_inference_scheduler():
+    """Return the process-wide scheduler, creating it on first use."""
+    global _SCHEDULER
+    with _SCHEDULER_LOCK:
+        if _SCHEDULER is None:
+            _SCHEDULER = InferenceScheduler()
+        return _SCHEDULER
+
+
+def score_texts(texts):
+    """Score texts through the shared micro-batching scheduler."""
+    return get_inference_scheduler().score(texts)
+
+
+def shutdown_inference_scheduler():
+    """Stop the shared scheduler and return its stats for the run summary."""
+    global _SCHEDULER
+    with _SCHEDULER_LOCK:
+        scheduler, _SCHEDULER = _SCHEDULER, None
+    if scheduler is None:
+        return {}
+    scheduler.shutdown()
+    return scheduler.get_stats()
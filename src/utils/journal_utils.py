@@ -0,0 +1,165 @@
+# src/utils/journal_utils.py
+# Crash-safe run journal (SQLite). Each startup's job is checkpointed after
+# the steps that cost something to redo: fetch (NewsAPI quota), prep
+# (near-duplicate filtering; its claims are taken again on resume) and
+# score (FinBERT time). A startup is only marked done once the writer has committed its
+# rows, so `final_pipeline(resume=True)` can skip finished startups and
+# re-enter the rest after their last checkpoint.
+import json
+import os
+import sqlite3
+import threading
+import time
+from src.constants import RUN_JOURNAL_ENABLED, RUN_JOURNAL_PATH
+from src.logger import logging
+
+# steps whose output is saved with the checkpoint; other steps only record progress
+SNAPSHOT_STEPS = ("fetch", "prep", "score")
+JOB_FIELDS = ("startup_id", "startup_name", "helping_words", "days", "since", "articles", "contents", "results")
+# interrupted runs a fresh run leaves in place (newest first), so one that shares the journal can still resume
+KEEP_INTERRUPTED_RUNS = 3
+
+_CONN = None
+_RUN_ID = None
+_LOCK = threading.Lock()
+_STATS = {"checkpoints": 0, "snapshot_bytes": 0, "finished": 0, "failed": 0}
+
+
+def _open_journal():
+    global _CONN
+    if _CONN is not None:
+        return _CONN
+    os.makedirs(os.path.dirname(RUN_JOURNAL_PATH) or ".", exist_ok=True)
+    conn = sqlite3.connect(RUN_JOURNAL_PATH, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    # WAL + NORMAL survives a killed process, which is the failure we care about
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS runs (
+            id INTEGER PRIMARY KEY,
+            started REAL NOT NULL,
+            finished REAL,
+            resumes INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS startups (
+            run_id INTEGER NOT NULL,
+            startup_id TEXT NOT NULL,
+            phase TEXT NOT NULL,
+            step TEXT,
+            snapshot_step TEXT,
+            status TEXT NOT NULL,
+            job TEXT,
+            updated REAL NOT NULL,
+            PRIMARY KEY (run_id, startup_id)
+        );
+    """)
+    conn.commit()
+    _CONN = conn
+    return conn
+
+
+def start_journal_run(resume=False):
+    """
+    Open a journal run and return what to resume:
+    {"run_id", "resumed", "finished": {startup_id, ...}, "checkpoints": {startup_id: (phase, step, job)}},
+    where `step` is the last SNAPSHOT_STEPS step whose output `job` holds.
+    Without `resume` (or with no interrupted run to resume) a new run starts; completed
+    runs are pruned, the newest KEEP_INTERRUPTED_RUNS interrupted ones are kept.
+    """
+    global _RUN_ID
+    state = {"run_id": None, "resumed": False, "finished": set(), "checkpoints": {}}
+    if not RUN_JOURNAL_ENABLED:
+        return state
+
+    with _LOCK:
+        for key in _STATS:
+            _STATS[key] = 0
+        conn = _open_journal()
+        row = None
+        if resume:
+            row = conn.execute("SELECT id FROM runs WHERE finished IS NULL ORDER BY id DESC LIMIT 1").fetchone()
+            if row is None:
+                logging.warning("No interrupted run in the journal; starting a fresh run")
+        if row is not None:
+            _RUN_ID = row[0]
+            conn.execute("UPDATE runs SET resumes = resumes + 1 WHERE id = ?", (_RUN_ID,))
+            for startup_id, phase, step, status, job in conn.execute(
+                "SELECT startup_id, phase, snapshot_step, status, job FROM startups WHERE run_id = ?", (_RUN_ID,)
+            ):
+                if status == "done":
+                    state["finished"].add(startup_id)
+                elif step and job:
+                    state["checkpoints"][startup_id] = (phase, step, json.loads(job))
+            state["resumed"] = True
+        else:
+            conn.execute("""
+                DELETE FROM runs WHERE finished IS NOT NULL OR id NOT IN (
+                    SELECT id FROM runs WHERE finished IS NULL ORDER BY id DESC LIMIT ?
+                )
+            """, (KEEP_INTERRUPTED_RUNS,))
+            conn.execute("DELETE FROM startups WHERE run_id NOT IN (SELECT id FROM runs)")
+            _RUN_ID = conn.execute("INSERT INTO runs (started) VALUES (?)", (time.time(),)).lastrowid
+        conn.commit()
+        state["run_id"] = _RUN_ID
+
+    if state["resumed"]:
+        logging.info("Resuming run %s: %s startups finished, %s with checkpoints",
+                     _RUN_ID, len(state["finished"]), len(state["checkpoints"]))
+    return state
+
+
+def checkpoint_job(job, step, phase):
+    """Record that `step` completed for the job's startup (with a snapshot for SNAPSHOT_STEPS)."""
+    if _RUN_ID is None:
+        return
+    payload = None
+    if step in SNAPSHOT_STEPS:
+        payload = json.dumps({field: job.get(field) for field in JOB_FIELDS}, default=str)
+    with _LOCK:
+        conn = _open_journal()
+        conn.execute("""
+            INSERT INTO startups (run_id, startup_id, phase, step, snapshot_step, status, job, updated)
+            VALUES (?, ?, ?, ?, ?, 'running', ?, ?)
+            ON CONFLICT (run_id, startup_id) DO UPDATE SET
+                step = excluded.step,
+                snapshot_step = COALESCE(excluded.snapshot_step, startups.snapshot_step),
+                status = 'running',
+                job = COALESCE(excluded.job, startups.job),
+                updated = excluded.updated
+        """, (_RUN_ID, job["startup_id"], phase, step, payload and step, payload, time.time()))
+        conn.commit()
+        _STATS["checkpoints"] += 1
+        _STATS["snapshot_bytes"] += len(payload or "")
+
+
+def finish_journal_startup(startup_id, phase, status="done"):
+    """Mark a startup done (its snapshot is dropped) or failed (kept, so a resume retries it)."""
+    if _RUN_ID is None:
+        return
+    with _LOCK:
+        conn = _open_journal()
+        conn.execute("""
+            INSERT INTO startups (run_id, startup_id, phase, status, updated)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (run_id, startup_id) DO UPDATE SET
+                status = excluded.status,
+                job = CASE WHEN excluded.status = 'done' THEN NULL ELSE startups.job END,
+                updated = excluded.updated
+        """, (_RUN_ID, startup_id, phase, status, time.time()))
+        conn.commit()
+        _STATS["finished" if status == "done" else "failed"] += 1
+
+
+def finish_journal_run():
+    """Mark the run complete (`--resume` only picks up runs that never got here); returns journal stats."""
+    global _RUN_ID
+    with _LOCK:
+        stats = {**_STATS, "run_id": _RUN_ID}
+        if _RUN_ID is None:
+            return stats
+        conn = _open_journal()
+        conn.execute("UPDATE runs SET finished = ? WHERE id = ?", (time.time(), _RUN_ID))
+        conn.execute("UPDATE startups SET job = NULL WHERE run_id = ?", (_RUN_ID,))
+        conn.commit()
+        _RUN_ID = None
+    return stats
@@ -0,0 +1,257 @@
+# src/utils/key_utils.py
+# Quota- and health-aware NewsAPI key scheduler. Tracks per-key usage,
+# 401/429 responses and rate-limit headers, puts bad keys into cooldown,
+# and persists daily counters in a small JSON state file across runs.
+# With a KeyUsageLedger, request counts live in Postgres instead, so
+# sharded runners (each with its own state file) share one daily quota.
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from src.constants import (
+    NEWS_API_DAILY_QUOTA,
+    NEWS_API_KEY_COOLDOWN_SEC,
+    NEWS_API_KEY_MAX_COOLDOWN_SEC,
+    NEWS_API_KEY_STATE_PATH,
+    NEWS_API_KEY_LEDGER,
+    NEWS_API_KEY_RESERVE_BLOCK,
+)
+from src.logger import logging
+from src.utils.db_utils import run_with_connection
+
+# NewsAPI error codes that mean the key itself is unusable
+_DEAD_KEY_CODES = {"apiKeyDisabled", "apiKeyInvalid", "apiKeyMissing"}
+LEDGER_RETENTION_DAYS = 7
+
+
+def key_id(key):
+    """Stable, non-secret identifier for a key (used in logs and the state file)."""
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:12]
+
+
+def _today():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+class KeyUsageLedger:
+    """
+    Per-key daily request counts in "NewsApiKeyUsage". Runners reserve
+    quota in small blocks under a row lock, so together they never go past
+    the daily quota; what a runner reserved but did not use is handed back
+    on close.
+    """
+
+    def reserve(self, kid, day, amount, quota):
+        """Reserve up to `amount` of the key's quota for `day`; returns (granted, requests counted for the day)."""
+        def reserve(conn):
+            with conn.cursor() as cur:
+                # creates or row-locks the key's day and reads its count in one statement
+                cur.execute("""
+                    INSERT INTO "NewsApiKeyUsage" ("keyId", day) VALUES (%s, %s)
+                    ON CONFLICT ("keyId", day) DO UPDATE SET "updatedAt" = now()
+                    RETURNING requests
+                """, (kid, day))
+                used = cur.fetchone()[0]
+                granted = max(0, min(amount, quota - used))
+                if granted:
+                    cur.execute("""
+                        UPDATE "NewsApiKeyUsage" SET requests = requests + %s, "updatedAt" = now()
+                        WHERE "keyId" = %s AND day = %s
+                    """, (granted, kid, day))
+            conn.commit()
+            return granted, used + granted
+
+        return run_with_connection(reserve)
+
+    def release(self, day, unused):
+        """Hand back reserved but unused requests ({kid: count}) and drop old days."""
+        def release(conn):
+            with conn.cursor() as cur:
+                if unused:
+                    cur.execute("""
+                        UPDATE "NewsApiKeyUsage" u SET requests = GREATEST(u.requests - c.n, 0), "updatedAt" = now()
+                        FROM unnest(%s::text[], %s::int[]) AS c(id, n)
+                        WHERE u."keyId" = c.id AND u.day = %s
+                    """, (list(unused), list(unused.values()), day))
+                cur.execute('DELETE FROM "NewsApiKeyUsage" WHERE day < CURRENT_DATE - %s', (LEDGER_RETENTION_DAYS,))
+            conn.commit()
+
+        run_with_connection(release)
+
+
+def key_usage_ledger():
+    """The shared ledger NEWS_API_KEY_LEDGER asks for, or None to count in the state file only."""
+    return KeyUsageLedger() if NEWS_API_KEY_LEDGER == "postgres" else None
+
+
+class ApiKeyManager:
+    """Routes each request to the healthy key with the most remaining budget."""
+
+    def __init__(self, keys, state_path=NEWS_API_KEY_STATE_PATH, daily_quota=NEWS_API_DAILY_QUOTA,
+                 ledger=None, reserve_block=NEWS_API_KEY_RESERVE_BLOCK):
+        self.keys = [k for k in dict.fromkeys(keys) if k]
+        self.state_path = state_path
+        self.daily_quota = daily_quota
+        self.ledger = ledger
+        self.reserve_block = max(1, reserve_block)
+        self._lock = threading.Lock()
+        self._reserve_lock = threading.Lock()
+        self._state = {key_id(k): self._fresh_state() for k in self.keys}
+        # requests reserved in the ledger and not yet spent, per key
+        self._allowance = {kid: 0 for kid in self._state}
+        self._load()
+
+    @staticmethod
+    def _fresh_state():
+        return {
+            "day": _today(),
+            "requests": 0,
+            "rate_limited": 0,
+            "unauthorized": 0,
+            "cooldown_until": 0.0,
+            "cooldown_sec": 0.0,
+            "disabled": False,
+            "remaining": None,
+        }
+
+    def _load(self):
+        if not self.state_path or not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path) as f:
+                saved = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.warning("Ignoring unreadable NewsAPI key state %s: %s", self.state_path, e)
+            return
+        for kid, state in saved.items():
+            if kid in self._state:
+                self._state[kid].update(state)
+        self._roll_day()
+
+    def _roll_day(self):
+        today = _today()
+        for kid, state in self._state.items():
+            if state["day"] != today:
+                # new quota day: usage resets and rejected keys get one more chance
+                state.update(day=today, requests=0, rate_limited=0, remaining=None, cooldown_sec=0.0, disabled=False)
+                self._allowance[kid] = 0
+
+    def save(self):
+        if not self.state_path:
+            return
+        with self._lock:
+            payload = json.dumps(self._state, indent=2)
+        os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(payload)
+        os.replace(tmp_path, self.state_path)
+
+    def _budget(self, state):
+        quota_left = self.daily_quota - state["requests"]
+        if state["remaining"] is not None:
+            return min(quota_left, state["remaining"])
+        return quota_left
+
+    def choose(self):
+        """Return the usable key with the most remaining budget, or None if all are spent."""
+        while True:
+            now = time.time()
+            with self._lock:
+                self._roll_day()
+                best, best_budget = None, 0
+                for key in self.keys:
+                    state = self._state[key_id(key)]
+                    if state["disabled"] or state["cooldown_until"] > now:
+                        continue
+                    budget = self._budget(state)
+                    if budget > best_budget:
+                        best, best_budget = key, budget
+                if best is None:
+                    return None
+                kid = key_id(best)
+                if self.ledger is None or self._allowance[kid] > 0:
+                    if self.ledger is not None:
+                        self._allowance[kid] -= 1
+                    self._state[kid]["requests"] += 1
+                    return best
+            # outside the lock: responses keep being recorded while the ledger answers
+            self._reserve(kid)
+
+    def _reserve(self, kid):
+        with self._reserve_lock:
+            with self._lock:
+                ledger, day = self.ledger, self._state[kid]["day"]
+                if ledger is None or self._allowance[kid] > 0:
+                    return
+            try:
+                granted, used = ledger.reserve(kid, day, self.reserve_block, self.daily_quota)
+            except Exception as e:
+                logging.warning("NewsAPI key ledger unavailable (%s); counting quota in %s only", e, self.state_path)
+                with self._lock:
+                    self.ledger = None
+                return
+            with self._lock:
+                state = self._state[kid]
+                if state["day"] == day:
+                    self._allowance[kid] += granted
+                    # other runners' usage included; a key the ledger has no quota left for drops out
+                    state["requests"] = used - self._allowance[kid]
+
+    def record(self, key, status, headers=None, code=None):
+        """Update a key's health from one response."""
+        headers = headers or {}
+        kid = key_id(key)
+        with self._lock:
+            state = self._state[kid]
+            remaining = headers.get("X-RateLimit-Remaining") or headers.get("X-Ratelimit-Remaining")
+            if remaining is not None and str(remaining).isdigit():
+                state["remaining"] = int(remaining)
+
+            if status == 401 or code in _DEAD_KEY_CODES:
+                state["unauthorized"] += 1
+                state["disabled"] = True
+                logging.error("NewsAPI key %s rejected (%s); disabled", kid, code or status)
+            elif status == 429 or code in ("rateLimited", "apiKeyExhausted"):
+                state["rate_limited"] += 1
+                retry_after = headers.get("Retry-After")
+                if retry_after and str(retry_after).isdigit():
+                    cooldown = float(retry_after)
+                else:
+                    # back off harder each time the same key is throttled again
+                    cooldown = min(max(state["cooldown_sec"] * 2, NEWS_API_KEY_COOLDOWN_SEC), NEWS_API_KEY_MAX_COOLDOWN_SEC)
+                state["cooldown_sec"] = cooldown
+                state["cooldown_until"] = time.time() + cooldown
+                logging.warning("NewsAPI key %s rate limited; cooling down for %ss", kid, int(cooldown))
+            elif 200 <= status < 300:
+                state["cooldown_sec"] = 0.0
+
+    def close(self):
+        """Hand unused reservations back to the ledger and save the state file."""
+        with self._lock:
+            ledger, day = self.ledger, _today()
+            unused = {kid: n for kid, n in self._allowance.items() if n > 0 and self._state[kid]["day"] == day}
+            self._allowance = dict.fromkeys(self._allowance, 0)
+        if ledger is not None:
+            try:
+                ledger.release(day, unused)
+            except Exception as e:
+                logging.warning("Could not return unused NewsAPI quota to the ledger: %s", e)
+        self.save()
+
+    def get_stats(self):
+        now = time.time()
+        with self._lock:
+            return {
+                kid: {
+                    "requests": state["requests"],
+                    "budget_left": self._budget(state),
+                    "rate_limited": state["rate_limited"],
+                    "unauthorized": state["unauthorized"],
+                    "disabled": state["disabled"],
+                    "cooling_down": state["cooldown_until"] > now,
+                }
+                for kid, state in self._state.items()
+            }
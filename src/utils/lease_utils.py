@@ -0,0 +1,267 @@
+# src/utils/lease_utils.py
+# Work leases for sharded runs. Every runner started with the same
+# PIPELINE_RUN_ID seeds one "PipelineLeases" row per startup, then claims
+# small batches with FOR UPDATE SKIP LOCKED, so each startup goes to exactly
+# one live runner. A heartbeat thread renews held leases; a runner that dies
+# stops renewing and its unfinished startups are taken over once the lease
+# expires. Each runner stores its summary in "PipelineRunShards", and
+# `merge_shard_summaries` combines them.
+#
+#   python -m src.utils.lease_utils merge <run_id>
+import json
+import os
+import sys
+import threading
+from datetime import datetime
+from src.constants import PIPELINE_RUN_ID, RUNNER_ID, LEASE_SECONDS, LEASE_MAX_ATTEMPTS
+from src.logger import logging
+from src.utils.db_utils import run_with_connection
+
+LEASE_RETENTION_DAYS = 7
+# how often a runner with nothing left to claim re-checks the other runners' leases
+LEASE_POLL_SECONDS = 2
+
+# summary values that are levels or percentiles rather than counts: merged with max()
+_MAX_KEYS = {"total_time_sec", "p50", "p90", "p99", "max", "max_queue_depth", "avg_queue_depth",
+             "utilization", "budget", "queue_depth", "articles_stored",
+             "limit", "min", "peak_in_flight", "latency_baseline_ms", "score_workers", "threads", "batch_size"}
+
+
+class LeaseManager:
+    """Claims, renews and completes this runner's startup leases for one sharded run."""
+
+    def __init__(self, run_id, owner, lease_seconds=LEASE_SECONDS, max_attempts=LEASE_MAX_ATTEMPTS):
+        self.run_id = run_id
+        self.owner = owner
+        self.lease_seconds = max(10, lease_seconds)
+        self.max_attempts = max(1, max_attempts)
+        self._lock = threading.Lock()
+        self._completed = {}  # startup_id -> status, written by the next heartbeat
+        self._stop = threading.Event()
+        self._heartbeat = threading.Thread(target=self._renew_loop, name="lease-heartbeat", daemon=True)
+        self.stats = {"claimed": 0, "taken_over": 0, "completed": 0, "failed": 0, "renewals": 0, "claims": 0}
+
+    def start(self):
+        """Seed this run's leases (idempotent across runners) and start the heartbeat."""
+        def seed(conn):
+            with conn.cursor() as cur:
+                cur.execute("""
+                    INSERT INTO "PipelineLeases" ("runId", "startupId")
+                    SELECT %s, id FROM "Startups"
+                    ON CONFLICT DO NOTHING
+                """, (self.run_id,))
+                seeded = cur.rowcount
+                cur.execute(
+                    'DELETE FROM "PipelineLeases" WHERE "runId" <> %s AND "createdAt" < now() - make_interval(days => %s)',
+                    (self.run_id, LEASE_RETENTION_DAYS),
+                )
+            conn.commit()
+            return seeded
+
+        seeded = run_with_connection(seed)
+        logging.info("Sharded run %s: runner %s joined (%s leases seeded)", self.run_id, self.owner, seeded)
+        self._heartbeat.start()
+        return self
+
+    def claim(self, limit):
+        """Lease up to `limit` unclaimed or expired startups; returns their ids."""
+        def claim(conn):
+            with conn.cursor() as cur:
+                cur.execute("""
+                    UPDATE "PipelineLeases" l
+                    SET owner = %s, "leasedUntil" = now() + make_interval(secs => %s), attempts = l.attempts + 1
+                    FROM (
+                        SELECT "startupId" FROM "PipelineLeases"
+                        WHERE "runId" = %s AND "completedAt" IS NULL AND attempts < %s
+                          AND ("leasedUntil" IS NULL OR "leasedUntil" < now())
+                        ORDER BY attempts, "startupId"
+                        LIMIT %s
+                        FOR UPDATE SKIP LOCKED
+                    ) free
+                    WHERE l."runId" = %s AND l."startupId" = free."startupId"
+                    RETURNING l."startupId", l.attempts
+                """, (self.owner, self.lease_seconds, self.run_id, self.max_attempts, limit, self.run_id))
+                rows = cur.fetchall()
+            conn.commit()
+            return rows
+
+        rows = run_with_connection(claim)
+        with self._lock:
+            self.stats["claims"] += 1
+            self.stats["claimed"] += len(rows)
+            self.stats["taken_over"] += sum(1 for _, attempts in rows if attempts > 1)
+        return [startup_id for startup_id, _ in rows]
+
+    def outstanding(self):
+        """Unfinished startups leased by other runners (they may still expire and need taking over)."""
+        def count(conn):
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT COUNT(*), EXTRACT(EPOCH FROM MIN("leasedUntil") - now())
+                    FROM "PipelineLeases"
+                    WHERE "runId" = %s AND "completedAt" IS NULL AND attempts < %s AND owner <> %s
+                """, (self.run_id, self.max_attempts, self.owner))
+                row = cur.fetchone()
+            conn.commit()
+            return row[0], float(row[1] or 0)
+
+        return run_with_connection(count)
+
+    def complete(self, startup_id, status="done"):
+        """Record a finished startup; written with the next heartbeat (or on close)."""
+        with self._lock:
+            self._completed[startup_id] = status
+
+    def flush(self):
+        """Write pending completions and renew this runner's unfinished leases."""
+        with self._lock:
+            completed, self._completed = self._completed, {}
+
+        def write(conn):
+            with conn.cursor() as cur:
+                if completed:
+                    cur.execute("""
+                        UPDATE "PipelineLeases" l SET "completedAt" = now(), status = c.status
+                        FROM unnest(%s::text[], %s::text[]) AS c(id, status)
+                        WHERE l."runId" = %s AND l."startupId"::text = c.id
+                    """, (list(completed), list(completed.values()), self.run_id))
+                cur.execute("""
+                    UPDATE "PipelineLeases" SET "leasedUntil" = now() + make_interval(secs => %s)
+                    WHERE "runId" = %s AND owner = %s AND "completedAt" IS NULL
+                """, (self.lease_seconds, self.run_id, self.owner))
+            conn.commit()
+
+        try:
+            run_with_connection(write)
+        except Exception as e:
+            # keep the completions for the next heartbeat; the lease itself has slack until it expires
+            logging.warning("Lease heartbeat failed: %s", e)
+            with self._lock:
+                self._completed = {**completed, **self._completed}
+            return
+        with self._lock:
+            self.stats["renewals"] += 1
+            self.stats["completed"] += sum(1 for status in completed.values() if status == "done")
+            self.stats["failed"] += sum(1 for status in completed.values() if status == "failed")
+
+    def _renew_loop(self):
+        while not self._stop.wait(self.lease_seconds / 3):
+            self.flush()
+
+    def close(self):
+        self._stop.set()
+        if self._heartbeat.is_alive():
+            self._heartbeat.join()
+        self.flush()
+        with self._lock:
+            return {**self.stats, "run_id": self.run_id, "runner": self.owner}
+
+
+_LEASES = None
+
+
+def start_leases(run_id=PIPELINE_RUN_ID, owner=RUNNER_ID):
+    """Join sharded run `run_id`; returns the LeaseManager (None when not sharded)."""
+    global _LEASES
+    if not run_id:
+        return None
+    _LEASES = LeaseManager(run_id, owner).start()
+    return _LEASES
+
+
+def complete_lease(startup_id, status="done"):
+    if _LEASES is not None:
+        _LEASES.complete(startup_id, status)
+
+
+def close_leases():
+    """Write outstanding completions and stop the heartbeat; returns lease stats."""
+    global _LEASES
+    leases, _LEASES = _LEASES, None
+    return leases.close() if leases else {}
+
+
+def save_shard_summary(run_id, owner, summary):
+    def save(conn):
+        with conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO "PipelineRunShards" ("runId", owner, summary) VALUES (%s, %s, %s)
+                ON CONFLICT ("runId", owner) DO UPDATE SET summary = EXCLUDED.summary, "finishedAt" = now()
+            """, (run_id, owner, json.dumps(summary, default=str)))
+        conn.commit()
+
+    run_with_connection(save)
+
+
+def _ratio(numerator, denominator, digits):
+    return round(numerator / denominator, digits) if denominator else 0
+
+
+# ratios recomputed from the merged counters they are derived from (neither max() nor a sum of ratios is right)
+_DERIVED = {
+    "hit_rate": (("hits", "misses"), lambda s: _ratio(s["hits"], s["hits"] + s["misses"], 4)),
+    "avg_batch_size": (("texts", "batches"), lambda s: _ratio(s["texts"], s["batches"], 2)),
+    "padding_waste": (("real_tokens", "padded_tokens"),
+                      lambda s: round(1 - s["real_tokens"] / s["padded_tokens"], 4) if s["padded_tokens"] else 0),
+    "mean_ms": (("total_sec", "count"), lambda s: _ratio(s["total_sec"] * 1000, s["count"], 2)),
+}
+
+
+def _merge(a, b, key=None):
+    if isinstance(a, dict) and isinstance(b, dict):
+        merged = {k: _merge(a[k], b[k], k) if k in a and k in b else a.get(k, b.get(k)) for k in {**a, **b}}
+        for name, (counters, derive) in _DERIVED.items():
+            if name in merged and all(isinstance(merged.get(c), (int, float)) for c in counters):
+                merged[name] = derive(merged)
+        return merged
+    if isinstance(a, list) and isinstance(b, list):
+        return a + b
+    numbers = (int, float)
+    if isinstance(a, numbers) and isinstance(b, numbers) and not isinstance(a, bool) and not isinstance(b, bool):
+        if key in _MAX_KEYS or str(key).endswith(("_ms", "_rate")):
+            return max(a, b)
+        return round(a + b, 4) if isinstance(a, float) or isinstance(b, float) else a + b
+    return a
+
+
+def merge_summaries(summaries):
+    """Combine per-runner summaries: counters add up, latencies/levels take the max, results concatenate."""
+    merged = {}
+    for summary in summaries:
+        merged = _merge(merged, summary)
+    return merged
+
+
+def merge_shard_summaries(run_id):
+    """Merged summary of every runner that finished `run_id`, plus lease completion counts."""
+    def load(conn):
+        with conn.cursor() as cur:
+            cur.execute('SELECT owner, summary FROM "PipelineRunShards" WHERE "runId" = %s ORDER BY "finishedAt"',
+                        (run_id,))
+            shards = cur.fetchall()
+            cur.execute("""
+                SELECT COUNT(*), COUNT("completedAt"), COUNT(*) FILTER (WHERE attempts > 1)
+                FROM "PipelineLeases" WHERE "runId" = %s
+            """, (run_id,))
+            leases = cur.fetchone()
+        conn.commit()
+        return shards, leases
+
+    shards, (total, completed, retried) = run_with_connection(load)
+    merged = merge_summaries([summary for _, summary in shards])
+    # per-runner claim counters add up; completion counts come from the lease table itself
+    lease_stats = {k: v for k, v in merged.get("leases", {}).items() if k not in ("run_id", "runner")}
+    lease_stats.update({"startups": total, "completed": completed, "unfinished": total - completed, "retried": retried})
+    merged.update({"run_id": run_id, "runners": [owner for owner, _ in shards], "leases": lease_stats})
+    return merged
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3 or sys.argv[1] != "merge":
+        sys.exit("usage: python -m src.utils.lease_utils merge <run_id>")
+    summary = merge_shard_summaries(sys.argv[2])
+    os.makedirs("logs", exist_ok=True)
+    path = os.path.join("logs", f"pipeline_summary_{sys.argv[2]}_merged_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(path, "w") as f:
+        json.dump(summary, f, indent=2, default=str)
+    logging.info("Merged %s runner summaries into %s", len(summary["runners"]), path)
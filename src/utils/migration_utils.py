@@ -0,0 +1,192 @@
+# src/utils/migration_utils.py
+# Idempotent schema migrations for the pipeline's own indexes and columns.
+# Applied names are recorded in "_PipelineMigrations"; indexes are built
+# CONCURRENTLY so they never block the writer, and an invalid leftover from
+# a failed concurrent build is dropped and rebuilt on the next run.
+#
+#   python -m src.utils.migration_utils
+import psycopg2
+from src.constants import DB_URL
+from src.logger import logging
+from src.utils.rollup_utils import ROLLUP_BACKFILL_SQL
+
+MIGRATIONS_TABLE = "_PipelineMigrations"
+# stands for the type of "Startups".id (TEXT or UUID, whichever the app schema uses) in statements below
+STARTUP_ID_TYPE = "{startup_id_type}"
+
+
+def _dedup_article_urls(cur):
+    """
+    Keep the earliest row per url so the unique index can be built. This
+    DELETES the later copies (see README, "Migrations"); the count is logged
+    either way so a deploy log shows what the migration removed.
+    """
+    cur.execute("""
+        DELETE FROM "Articles" a
+        USING "Articles" b
+        WHERE a.url = b.url
+          AND (a."createdAt", a.id) > (b."createdAt", b.id)
+    """)
+    if cur.rowcount:
+        logging.warning("Removed %s duplicate Articles rows (earliest row per url kept) "
+                        "before adding the unique url index", cur.rowcount)
+    else:
+        logging.info("No duplicate Articles rows to remove before adding the unique url index")
+
+
+# (name, optional pre-step, index name to rebuild if invalid, statement)
+MIGRATIONS = [
+    (
+        "001_articles_startup_published_idx",
+        None,
+        "Articles_startupId_publishedAt_idx",
+        'CREATE INDEX CONCURRENTLY IF NOT EXISTS "Articles_startupId_publishedAt_idx" '
+        'ON "Articles" ("startupId", "publishedAt")',
+    ),
+    (
+        "002_articles_url_key",
+        _dedup_article_urls,
+        "Articles_url_key",
+        'CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS "Articles_url_key" ON "Articles" (url)',
+    ),
+    (
+        # catalog_utils skips upserts whose content hash is unchanged
+        "003_startups_content_hash",
+        None,
+        None,
+        'ALTER TABLE "Startups" ADD COLUMN IF NOT EXISTS "contentHash" TEXT',
+    ),
+    (
+        # maintained by the Articles writer from here on; filled from Articles in the same transaction,
+        # with writers held off, so no row is missed or counted twice
+        "004_startup_sentiment_daily",
+        None,
+        None,
+        """
+        CREATE TABLE IF NOT EXISTS "StartupSentimentDaily" (
+            "startupId" {startup_id_type} NOT NULL REFERENCES "Startups"(id) ON DELETE CASCADE,
+            day DATE NOT NULL,
+            "articleCount" INTEGER NOT NULL DEFAULT 0,
+            "positiveCount" INTEGER NOT NULL DEFAULT 0,
+            "neutralCount" INTEGER NOT NULL DEFAULT 0,
+            "negativeCount" INTEGER NOT NULL DEFAULT 0,
+            "scoreSum" DOUBLE PRECISION NOT NULL DEFAULT 0,
+            "scoreMean" DOUBLE PRECISION GENERATED ALWAYS AS ("scoreSum" / NULLIF("articleCount", 0)) STORED,
+            "updatedAt" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY ("startupId", day)
+        );
+        LOCK TABLE "Articles" IN SHARE MODE;
+        """ + ROLLUP_BACKFILL_SQL,
+    ),
+    (
+        # work leases and per-runner summaries for sharded runs (lease_utils)
+        "005_pipeline_leases",
+        None,
+        None,
+        """
+        CREATE TABLE IF NOT EXISTS "PipelineLeases" (
+            "runId" TEXT NOT NULL,
+            "startupId" {startup_id_type} NOT NULL REFERENCES "Startups"(id) ON DELETE CASCADE,
+            owner TEXT,
+            "leasedUntil" TIMESTAMPTZ,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            status TEXT,
+            "completedAt" TIMESTAMPTZ,
+            "createdAt" TIMESTAMPTZ NOT NULL DEFAULT now(),
+            PRIMARY KEY ("runId", "startupId")
+        );
+        CREATE TABLE IF NOT EXISTS "PipelineRunShards" (
+            "runId" TEXT NOT NULL,
+            owner TEXT NOT NULL,
+            summary JSONB NOT NULL,
+            "finishedAt" TIMESTAMPTZ NOT NULL DEFAULT now(),
+            PRIMARY KEY ("runId", owner)
+        )
+        """,
+    ),
+    (
+        # NewsAPI quota ledger shared by every runner (key_utils.KeyUsageLedger)
+        "006_newsapi_key_usage",
+        None,
+        None,
+        """
+        CREATE TABLE IF NOT EXISTS "NewsApiKeyUsage" (
+            "keyId" TEXT NOT NULL,
+            day DATE NOT NULL,
+            requests INTEGER NOT NULL DEFAULT 0,
+            "updatedAt" TIMESTAMPTZ NOT NULL DEFAULT now(),
+            PRIMARY KEY ("keyId", day)
+        )
+        """,
+    ),
+    (
+        # relevance_utils' down-weighting, kept apart from FinBERT's sentimentScore;
+        # a constant default makes this a catalog-only change
+        "007_articles_relevance_weight",
+        None,
+        None,
+        'ALTER TABLE "Articles" ADD COLUMN IF NOT EXISTS "relevanceWeight" DOUBLE PRECISION NOT NULL DEFAULT 1',
+    ),
+]
+
+
+def _drop_if_invalid(cur, index_name):
+    cur.execute("""
+        SELECT NOT i.indisvalid
+        FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE c.relname = %s
+    """, (index_name,))
+    row = cur.fetchone()
+    if row and row[0]:
+        logging.warning("Dropping invalid index %s left by an earlier failed build", index_name)
+        cur.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{index_name}"')
+
+
+def _startup_id_type(cur):
+    cur.execute("""
+        SELECT format_type(atttypid, atttypmod) FROM pg_attribute
+        WHERE attrelid = to_regclass('"Startups"') AND attname = 'id' AND NOT attisdropped
+    """)
+    row = cur.fetchone()
+    return row[0] if row else "TEXT"
+
+
+def pending_migrations(conn):
+    with conn.cursor() as cur:
+        cur.execute(f'CREATE TABLE IF NOT EXISTS "{MIGRATIONS_TABLE}" '
+                    '(name TEXT PRIMARY KEY, "appliedAt" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP)')
+        cur.execute(f'SELECT name FROM "{MIGRATIONS_TABLE}"')
+        applied = {row[0] for row in cur.fetchall()}
+    return [m for m in MIGRATIONS if m[0] not in applied]
+
+
+def apply_migrations(db_url=DB_URL):
+    """Apply every pending migration; returns the names applied."""
+    conn = psycopg2.connect(db_url)
+    # CREATE/DROP INDEX CONCURRENTLY cannot run inside a transaction block
+    conn.autocommit = True
+    applied = []
+    try:
+        # sharded runners may all migrate at startup; one applies, the others then find nothing pending
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_lock(hashtext(%s))", (MIGRATIONS_TABLE,))
+        for name, pre_step, index_name, statement in pending_migrations(conn):
+            logging.info("Applying migration %s", name)
+            with conn.cursor() as cur:
+                if index_name:
+                    _drop_if_invalid(cur, index_name)
+                if pre_step:
+                    pre_step(cur)
+                if STARTUP_ID_TYPE in statement:
+                    statement = statement.replace(STARTUP_ID_TYPE, _startup_id_type(cur))
+                cur.execute(statement)
+                cur.execute(f'INSERT INTO "{MIGRATIONS_TABLE}" (name) VALUES (%s) ON CONFLICT DO NOTHING', (name,))
+            applied.append(name)
+    finally:
+        conn.close()
+    logging.info("Migrations up to date (%s applied)", len(applied))
+    return applied
+
+
+if __name__ == "__main__":
+    apply_migrations()
@@ -0,0 +1,325 @@
+# src/utils/neardup_utils.py
+# Near-duplicate suppression for syndicated stories: URL canonicalization
+# plus 64-bit SimHash over the merged text, with a persisted band index
+# (SQLite) so copies are caught across runs and across startups. Articles
+# kept by the filter are only claimed in memory until the writer has stored
+# them; a story whose write never happens is not indexed.
+import hashlib
+import itertools
+import os
+import re
+import sqlite3
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from src.constants import (
+    NEAR_DUP_ENABLED,
+    NEAR_DUP_INDEX_PATH,
+    NEAR_DUP_MAX_DISTANCE,
+    NEAR_DUP_RETENTION_DAYS,
+)
+from src.logger import logging
+
+SIMHASH_BITS = 64
+MIN_SHINGLES = 8
+
+_TRACKING_PARAMS = {"fbclid", "gclid", "mc_cid", "mc_eid", "ref", "ref_src", "cmpid", "ocid", "outputtype", "amp"}
+_TRUNCATION_MARKER = re.compile(r"\[\+\d+ chars\]")
+_WORD = re.compile(r"\w+")
+
+_CONN = None
+_LOCK = threading.Lock()
+# claims of kept articles not stored yet: claim id -> [(canonical_url, signature, url)]
+_PENDING = {}
+_PENDING_URLS = {}
+_PENDING_BANDS = {}  # (band, value) -> {(claim id, signature)}
+_CLAIM_IDS = itertools.count(1)
+_STATS = {"checked": 0, "url_duplicates": 0, "text_duplicates": 0, "reclaimed": 0}
+
+
+def canonicalize_url(url):
+    """Normalize a URL so utm/AMP/mirror variants of one story compare equal."""
+    if not url:
+        return ""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    for prefix in ("www.", "amp.", "m."):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+    path = re.sub(r"/amp/?$", "", parts.path)
+    path = re.sub(r"\.amp(\.html?)?$", r"\1", path)
+    path = path.rstrip("/") or "/"
+    query = urlencode(sorted(
+        (k, v) for k, v in parse_qsl(parts.query)
+        if not k.lower().startswith("utm_") and k.lower() not in _TRACKING_PARAMS
+    ))
+    return urlunsplit(("https", host, path, query, ""))
+
+
+def _shingles(text, size=3):
+    words = _WORD.findall(_TRUNCATION_MARKER.sub(" ", text or "").lower())
+    if len(words) < size:
+        return words
+    return [" ".join(words[i:i + size]) for i in range(len(words) - size + 1)]
+
+
+def simhash(text):
+    """64-bit SimHash over word 3-shingles; None when the text is too short to trust."""
+    shingles = _shingles(text)
+    if len(shingles) < MIN_SHINGLES:
+        return None
+    counts = [0] * SIMHASH_BITS
+    for shingle in shingles:
+        h = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(SIMHASH_BITS):
+            counts[bit] += 1 if h >> bit & 1 else -1
+    return sum(1 << bit for bit in range(SIMHASH_BITS) if counts[bit] > 0)
+
+
+def _bands(signature):
+    # Pigeonhole: if two hashes differ in <= k bits, at least one of k+1
+    # bands is identical, so candidates are found by exact band lookups.
+    n_bands = NEAR_DUP_MAX_DISTANCE + 1
+    width = SIMHASH_BITS // n_bands
+    mask = (1 << width) - 1
+    return [(band, signature >> (band * width) & mask) for band in range(n_bands)]
+
+
+def _to_signed(value):
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _to_unsigned(value):
+    return value + (1 << 64) if value < 0 else value
+
+
+def _open_index():
+    global _CONN
+    if _CONN is not None:
+        return _CONN
+    os.makedirs(os.path.dirname(NEAR_DUP_INDEX_PATH) or ".", exist_ok=True)
+    conn = sqlite3.connect(NEAR_DUP_INDEX_PATH, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS signatures (
+            id INTEGER PRIMARY KEY,
+            simhash INTEGER,
+            canonical_url TEXT,
+            url TEXT,
+            cluster_id INTEGER,
+            created REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS signatures_url ON signatures (canonical_url);
+        CREATE TABLE IF NOT EXISTS bands (
+            band INTEGER NOT NULL,
+            value INTEGER NOT NULL,
+            sig_id INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS bands_lookup ON bands (band, value);
+        CREATE TABLE IF NOT EXISTS suppressed (
+            url TEXT,
+            canonical_url TEXT,
+            cluster_id INTEGER,
+            distance INTEGER,
+            startup_id TEXT,
+            seen REAL NOT NULL
+        );
+    """)
+    if "url" not in {column[1] for column in conn.execute("PRAGMA table_info(signatures)")}:
+        conn.execute("ALTER TABLE signatures ADD COLUMN url TEXT")
+    # Band layout depends on the threshold; rebuild the bands if it changed.
+    conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+    row = conn.execute("SELECT value FROM meta WHERE key = 'max_distance'").fetchone()
+    if row is None or int(row[0]) != NEAR_DUP_MAX_DISTANCE:
+        conn.execute("DELETE FROM bands")
+        rows = conn.execute("SELECT id, simhash FROM signatures WHERE simhash IS NOT NULL").fetchall()
+        conn.executemany(
+            "INSERT INTO bands (band, value, sig_id) VALUES (?, ?, ?)",
+            [(band, value, sig_id) for sig_id, h in rows for band, value in _bands(_to_unsigned(h))],
+        )
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('max_distance', ?)", (str(NEAR_DUP_MAX_DISTANCE),))
+
+    cutoff = time.time() - NEAR_DUP_RETENTION_DAYS * 86400
+    conn.execute("DELETE FROM bands WHERE sig_id IN (SELECT id FROM signatures WHERE created < ?)", (cutoff,))
+    conn.execute("DELETE FROM signatures WHERE created < ?", (cutoff,))
+    conn.execute("DELETE FROM suppressed WHERE seen < ?", (cutoff,))
+    conn.commit()
+    _CONN = conn
+    return conn
+
+
+def _find_cluster(conn, canonical_url, signature, url=None):
+    """
+    Return (cluster_id, distance, kind) of the closest indexed story, or None.
+    kind "same" is this very URL: indexed before but never stored, since
+    dedup lets no stored URL through (e.g. a run interrupted before its write).
+    """
+    row = conn.execute(
+        "SELECT cluster_id, url FROM signatures WHERE canonical_url = ? LIMIT 1", (canonical_url,)
+    ).fetchone()
+    if row:
+        return row[0], 0, "same" if url and row[1] == url else "url"
+    if signature is None:
+        return None
+
+    best = None
+    seen = set()
+    for band, value in _bands(signature):
+        for sig_id, cluster_id, h in conn.execute("""
+            SELECT s.id, s.cluster_id, s.simhash FROM bands b
+            JOIN signatures s ON s.id = b.sig_id
+            WHERE b.band = ? AND b.value = ?
+        """, (band, value)):
+            if sig_id in seen:
+                continue
+            seen.add(sig_id)
+            distance = bin(_to_unsigned(h) ^ signature).count("1")
+            if distance <= NEAR_DUP_MAX_DISTANCE and (best is None or distance < best[1]):
+                best = (cluster_id, distance, "text")
+    return best
+
+
+def _add_signature(conn, canonical_url, signature, url=None):
+    sig_id = conn.execute(
+        "INSERT INTO signatures (simhash, canonical_url, url, created) VALUES (?, ?, ?, ?)",
+        (_to_signed(signature) if signature is not None else None, canonical_url, url, time.time()),
+    ).lastrowid
+    conn.execute("UPDATE signatures SET cluster_id = ? WHERE id = ?", (sig_id, sig_id))
+    if signature is not None:
+        conn.executemany(
+            "INSERT INTO bands (band, value, sig_id) VALUES (?, ?, ?)",
+            [(band, value, sig_id) for band, value in _bands(signature)],
+        )
+
+
+def _find_pending(canonical_url, signature):
+    """Like `_find_cluster`, against stories claimed this run but not stored yet (no cluster ID)."""
+    if canonical_url in _PENDING_URLS:
+        return None, 0, "url"
+    if signature is None:
+        return None
+    best = None
+    for band, value in _bands(signature):
+        for _, other in _PENDING_BANDS.get((band, value), ()):
+            distance = bin(other ^ signature).count("1")
+            if distance <= NEAR_DUP_MAX_DISTANCE and (best is None or distance < best[1]):
+                best = (None, distance, "text")
+    return best
+
+
+def _add_pending(claim, canonical_url, signature, url):
+    # caller holds _LOCK
+    _PENDING.setdefault(claim, []).append((canonical_url, signature, url))
+    _PENDING_URLS[canonical_url] = url
+    if signature is not None:
+        for band, value in _bands(signature):
+            _PENDING_BANDS.setdefault((band, value), set()).add((claim, signature))
+
+
+def _unclaim(claim):
+    # caller holds _LOCK
+    entries = _PENDING.pop(claim, [])
+    for canonical_url, signature, _ in entries:
+        _PENDING_URLS.pop(canonical_url, None)
+        if signature is not None:
+            for band, value in _bands(signature):
+                members = _PENDING_BANDS.get((band, value))
+                if members is not None:
+                    members.discard((claim, signature))
+                    if not members:
+                        del _PENDING_BANDS[(band, value)]
+    return entries
+
+
+def claim_near_duplicates(articles, contents):
+    """Claim articles that already passed the filter (a job resumed after prep); returns the claim."""
+    if not NEAR_DUP_ENABLED or not articles:
+        return None
+    with _LOCK:
+        claim = next(_CLAIM_IDS)
+        for article, content in zip(articles, contents):
+            _add_pending(claim, canonicalize_url(article.get("url")), simhash(content), article.get("url"))
+    return claim
+
+
+def commit_near_dup_claim(claim):
+    """The claimed articles are stored: index their signatures for later runs and startups."""
+    if not claim:
+        return
+    with _LOCK:
+        entries = _unclaim(claim)
+        if not entries:
+            return
+        conn = _open_index()
+        for canonical_url, signature, url in entries:
+            _add_signature(conn, canonical_url, signature, url)
+        conn.commit()
+
+
+def release_near_dup_claim(claim):
+    """The claimed articles were never stored (dropped or failed write): forget them."""
+    if not claim:
+        return
+    with _LOCK:
+        _unclaim(claim)
+
+
+def filter_near_duplicates(articles, contents, startup_id=None):
+    """
+    Drop articles whose canonical URL or merged text matches a story already
+    indexed (a previous run or startup) or claimed by an article still on
+    its way to the writer. Kept articles are claimed, and indexed as the
+    first member of a new cluster by `commit_near_dup_claim` once stored;
+    suppressed ones are recorded with the cluster ID they matched. An
+    article matching its own earlier entry is kept (see `_find_cluster`).
+    Returns (articles, contents, claim) for the survivors.
+    """
+    if not NEAR_DUP_ENABLED or not articles:
+        return articles, contents, None
+
+    kept_articles, kept_contents = [], []
+    url_dups = text_dups = reclaimed = 0
+    with _LOCK:
+        conn = _open_index()
+        claim = next(_CLAIM_IDS)
+        for article, content in zip(articles, contents):
+            canonical_url = canonicalize_url(article.get("url"))
+            signature = simhash(content)
+            match = _find_cluster(conn, canonical_url, signature, article.get("url"))
+            if match is None:
+                match = _find_pending(canonical_url, signature)
+            if match is None or match[2] == "same":
+                if match is None:
+                    _add_pending(claim, canonical_url, signature, article.get("url"))
+                else:
+                    reclaimed += 1
+                kept_articles.append(article)
+                kept_contents.append(content)
+                continue
+
+            cluster_id, distance, kind = match
+            conn.execute(
+                "INSERT INTO suppressed (url, canonical_url, cluster_id, distance, startup_id, seen) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (article.get("url"), canonical_url, cluster_id, distance, startup_id, time.time()),
+            )
+            if kind == "url":
+                url_dups += 1
+            else:
+                text_dups += 1
+        conn.commit()
+        _STATS["checked"] += len(articles)
+        _STATS["url_duplicates"] += url_dups
+        _STATS["text_duplicates"] += text_dups
+        _STATS["reclaimed"] += reclaimed
+        if claim not in _PENDING:
+            claim = None
+
+    if url_dups or text_dups:
+        logging.info("Suppressed %s URL-variant and %s near-duplicate articles", url_dups, text_dups)
+    return kept_articles, kept_contents, claim
+
+
+def get_near_dup_stats():
+    with _LOCK:
+        return dict(_STATS)
@@ -1,27 +1,128 @@
 # src/utils/newsapi_utils.py
+# NewsAPI client. Requests run on one background asyncio loop with a pooled
+# aiohttp session, per-key token buckets and an adaptive cap on in-flight
+# requests; worker threads call the synchronous wrappers and block on the result.
+import asyncio
+import atexit
+import collections
 import json
+import math
+import threading
 import time
-import requests
-from itertools import cycle
-from requests.adapters import HTTPAdapter, Retry
-from datetime import datetime, timedelta
-from src.constants import NEWS_API_KEY
+import aiohttp
+from datetime import datetime, timedelta, timezone
+from src.constants import (
+    NEWS_API_KEY,
+    BASE_URL,
+    NEWS_API_PAGE_SIZE,
+    FETCH_MAX_IN_FLIGHT,
+    FETCH_MAX_PAGES,
+    NEWS_API_MAX_RESULTS,
+    FETCH_PAGE_PREFETCH,
+    FETCH_RETRIES,
+    NEWS_API_KEY_RATE,
+    NEWS_API_KEY_BURST,
+    WATERMARK_OVERLAP_MINUTES,
+    WATERMARK_MAX_LOOKBACK_DAYS,
+)
 from src.logger import logging
+from src.utils.concurrency_utils import adaptive_limit
+from src.utils.key_utils import ApiKeyManager, key_usage_ledger
+from src.utils.trace_utils import span
 
 NEWS_API_KEYS = NEWS_API_KEY
 if not NEWS_API_KEYS or NEWS_API_KEYS == '':
     raise ValueError("No NEWS_API_KEYS found in env")
 
-key_cycle = cycle(NEWS_API_KEYS)
+PAGE_SIZE = NEWS_API_PAGE_SIZE
+RETRY_STATUSES = {500, 502, 503, 504}
+KEY_ERROR_STATUSES = {401, 429}
+# page beyond the plan's result limit (code maximumResultsReached): no later page will do better
+RESULT_LIMIT_STATUS = 426
 
-def get_news_api_key():
-    return next(key_cycle)
+_REQUEST_STATS = {
+    "requests": 0,
+    "retries": 0,
+    "key_switches": 0,
+    "failed_pages": 0,
+    "no_key_available": 0,
+    "throttle_wait_sec": 0.0,
+    "incremental_queries": 0,
+    "early_stops": 0,
+    "result_limit_stops": 0,
+    "truncated_queries": 0,
+    "over_limit_queries": 0,
+    "stale_articles": 0,
+}
+_REQUEST_STATS_LOCK = threading.Lock()
 
-session = requests.Session()
-retries = Retry(total=3, backoff_factor=1, status_forcelist=[429, 500, 502, 503, 504], allowed_methods=['GET'])
-adapter = HTTPAdapter(max_retries=retries)
-session.mount("http://", adapter)
-session.mount("https://", adapter)
+
+def _count(key, amount=1):
+    with _REQUEST_STATS_LOCK:
+        _REQUEST_STATS[key] += amount
+
+
+def get_newsapi_stats():
+    with _REQUEST_STATS_LOCK:
+        stats = dict(_REQUEST_STATS)
+    stats["throttle_wait_sec"] = round(stats["throttle_wait_sec"], 3)
+    return stats
+
+
+class ResultLimitReached(Exception):
+    """NewsAPI refused a page past the plan's maximum results for a query."""
+
+
+class TooManyResults(Exception):
+    """A query matched more results than NEWS_API_MAX_RESULTS lets it page through."""
+
+    def __init__(self, total):
+        super().__init__(f"{total} results, over NEWS_API_MAX_RESULTS={NEWS_API_MAX_RESULTS}")
+        self.total = total
+
+
+def parse_keywords(helping_words):
+    """Normalize findingKeywords (list, JSON string or comma list) to stripped strings."""
+    if not helping_words:
+        return []
+    if isinstance(helping_words, str):
+        helping_words = json.loads(helping_words) if helping_words.strip().startswith('[') else helping_words.split(',')
+    return [word.strip() for word in helping_words if word and word.strip()]
+
+
+def published_at(article):
+    """An article's publishedAt as a naive UTC datetime (how Articles stores it), or None."""
+    value = article.get("publishedAt")
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def fetch_cutoff(since):
+    """
+    Oldest publishedAt worth fetching for a startup whose newest stored article
+    is `since`: a small overlap for late-indexed articles, never further back
+    than NewsAPI's history limit (so missed runs catch up by themselves).
+    """
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    cutoff = min(since, now) - timedelta(minutes=WATERMARK_OVERLAP_MINUTES)
+    return max(cutoff, now - timedelta(days=WATERMARK_MAX_LOOKBACK_DAYS))
+
+
+def drop_older(articles, cutoff):
+    """Drop articles published before `cutoff`; undated ones are kept for dedup to judge."""
+    if cutoff is None:
+        return articles
+    fresh = [a for a in articles if (published_at(a) or cutoff) >= cutoff]
+    if len(fresh) < len(articles):
+        _count("stale_articles", len(articles) - len(fresh))
+    return fresh
 
 
 def build_query(startup_name, helping_words):
@@ -31,51 +132,286 @@ def build_query(startup_name, helping_words):
         f'"{startup_name}" company',
         f'"{startup_name}" India'
     ]
-    if helping_words:
-        if isinstance(helping_words, str):
-            helping_words = json.loads(helping_words) if helping_words.strip().startswith('[') else helping_words.split(',')
-        base_terms.extend([f'"{word.strip()}"' for word in helping_words])
+    base_terms.extend([f'"{word}"' for word in parse_keywords(helping_words)])
     return " OR ".join(base_terms)
 
 
-def fetch_articles(startup_name, helping_words, days):
-    from_date = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
-    to_date = datetime.now().strftime("%Y-%m-%d")
-    url = "https://newsapi.org/v2/everything"
-    all_articles = []
-    page = 1
+# =========================================================
+# ASYNC FETCH ENGINE
+# =========================================================
+class TokenBucket:
+    """Per-key request budget: `rate` tokens/sec, bursting up to `capacity`."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self):
+        self._refill()
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    async def acquire(self):
+        while True:
+            delay = self.wait_time()
+            if delay <= 0:
+                self.tokens -= 1
+                return
+            _count("throttle_wait_sec", delay)
+            await asyncio.sleep(delay)
+
+
+class NewsFetchEngine:
+    """Owns the event loop thread, the aiohttp session, the key manager and per-key buckets."""
+
+    def __init__(self, keys=NEWS_API_KEYS, max_in_flight=FETCH_MAX_IN_FLIGHT):
+        self.key_manager = ApiKeyManager(keys, ledger=key_usage_ledger())
+        self.buckets = {key: TokenBucket(NEWS_API_KEY_RATE, NEWS_API_KEY_BURST) for key in self.key_manager.keys}
+        self.max_in_flight = max(1, max_in_flight)
+        # backs off on 429s, 5xx/network errors and rising latency (see concurrency_utils)
+        self.in_flight = adaptive_limit("newsapi", self.max_in_flight)
+        self._session = None
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="newsapi-fetch", daemon=True)
+        self._thread.start()
 
-    while True:
-        api_key = get_news_api_key()
+    def run(self, coro):
+        """Run a coroutine on the engine loop from any thread and wait for it."""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    async def _get_session(self):
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=15),
+                connector=aiohttp.TCPConnector(limit=self.max_in_flight, ttl_dns_cache=300),
+            )
+        return self._session
+
+    async def _get_page(self, params, label):
+        """
+        GET one page; returns the decoded JSON or None. A 401/429 moves the
+        request to another key straight away; 5xx/network errors are retried
+        with backoff. Gives up only when no key has budget left. A 426 raises
+        ResultLimitReached: the query has no more pages to give on this plan.
+        """
+        session = await self._get_session()
+        attempt = 0
+        while True:
+            if self.key_manager.ledger is not None:
+                # may reserve quota in Postgres: keep that round trip off the event loop
+                key = await self._loop.run_in_executor(None, self.key_manager.choose)
+            else:
+                key = self.key_manager.choose()
+            if key is None:
+                logging.error("No NewsAPI key has budget left; stopping at page %s for %s", params['page'], label)
+                _count("no_key_available")
+                return None
+            await self.buckets[key].acquire()
+            try:
+                async with self.in_flight.slot() as slot:
+                    _count("requests")
+                    with span("http.newsapi"):
+                        async with session.get(BASE_URL, params={**params, "apiKey": key}) as response:
+                            try:
+                                body = await response.json(content_type=None)
+                            except ValueError:
+                                body = {}
+                        # other 4xx are request problems, not load
+                        slot.outcome = ("throttled" if response.status == 429
+                                        else "error" if response.status in RETRY_STATUSES else "ok")
+                        code = body.get("code") if isinstance(body, dict) else None
+                        self.key_manager.record(key, response.status, response.headers, code)
+                        if response.status in KEY_ERROR_STATUSES:
+                            _count("key_switches")
+                            continue
+                        if response.status == RESULT_LIMIT_STATUS or code == "maximumResultsReached":
+                            raise ResultLimitReached(params["page"])
+                        response.raise_for_status()
+                        return body
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                status = getattr(e, "status", None)
+                if attempt >= FETCH_RETRIES or (status and status not in RETRY_STATUSES):
+                    logging.warning("Request failed for %s (page %s): %s", label, params['page'], e)
+                    _count("failed_pages")
+                    return None
+                _count("retries")
+                await asyncio.sleep(2 ** attempt)
+                attempt += 1
+
+    async def query_pages_async(self, query, from_date, to_date, label, cutoff=None, require_complete=False):
+        """
+        Async generator over a query's pages, oldest page first (articles
+        oldest first within each page), with FETCH_PAGE_PREFETCH requests
+        running ahead of the consumer. Results are newest first, so with a
+        `cutoff` a page 1 that already reaches past it is the only page.
+        Page 1 is needed first for totalResults and is yielded last.
+        With `require_complete`, a query whose results run past
+        NEWS_API_MAX_RESULTS raises TooManyResults before yielding anything.
+        """
         params = {
-            "q": build_query(startup_name, helping_words),
+            "q": query,
             "from": from_date,
             "to": to_date,
             "sortBy": "publishedAt",
-            "apiKey": api_key,
             "language": "en",
-            "pageSize": 100,
-            "page": page
+            "pageSize": str(PAGE_SIZE),
+            "page": "1",
         }
-
         try:
-            response = session.get(url, params=params, timeout=15)
-            response.raise_for_status()
-        except requests.RequestException as e:
-            logging.warning(f"Request failed for {startup_name} (page {page}): {e}")
-            break
+            first = await self._get_page(params, label)
+        except ResultLimitReached:
+            logging.warning("NewsAPI refused page 1 for %s as past the result limit", label)
+            _count("result_limit_stops")
+            return
+        if not first or not first.get("articles"):
+            return
+        first_articles = first["articles"]
+        logging.info("Fetched %s from page 1", len(first_articles))
+
+        total = first.get("totalResults", 0)
+        pages = math.ceil(min(total, NEWS_API_MAX_RESULTS) / PAGE_SIZE)
+        if pages > FETCH_MAX_PAGES:
+            logging.info("FETCH_MAX_PAGES=%s truncates %s results for %s to %s pages",
+                         FETCH_MAX_PAGES, total, label, FETCH_MAX_PAGES)
+            _count("truncated_queries")
+            pages = FETCH_MAX_PAGES
+        oldest = published_at(first_articles[-1])
+        reaches_cutoff = cutoff is not None and oldest is not None and oldest < cutoff
+        if pages > 1 and reaches_cutoff:
+            logging.info("Page 1 already reaches the watermark for %s; skipping %s pages", label, pages - 1)
+            _count("early_stops")
+            pages = 1
+        elif require_complete and total > NEWS_API_MAX_RESULTS and not reaches_cutoff:
+            _count("over_limit_queries")
+            raise TooManyResults(total)
+        if pages > 1 and len(first_articles) >= PAGE_SIZE:
+            # oldest first: an interrupted run leaves the oldest articles stored, which keeps watermarks safe
+            numbers = iter(range(pages, 1, -1))
+            pending = collections.deque()
+
+            def request_next():
+                page = next(numbers, None)
+                if page is not None:
+                    pending.append((page, asyncio.ensure_future(self._get_page({**params, "page": str(page)}, label))))
+
+            try:
+                for _ in range(max(1, FETCH_PAGE_PREFETCH)):
+                    request_next()
+                while pending:
+                    page, request = pending.popleft()
+                    try:
+                        data = await request
+                    except ResultLimitReached:
+                        # every further request would be refused too (and still cost quota)
+                        logging.warning("NewsAPI result limit reached at page %s for %s; stopping the query "
+                                        "(set NEWS_API_MAX_RESULTS to the plan's limit)", page, label)
+                        _count("result_limit_stops")
+                        break
+                    request_next()
+                    if data and data.get("articles"):
+                        logging.info("Fetched %s from page %s", len(data['articles']), page)
+                        yield drop_older(data["articles"][::-1], cutoff)
+            finally:
+                for _, request in pending:
+                    if not request.cancel() and not request.cancelled():
+                        request.exception()  # retrieved, so a refused prefetch is not logged as lost
+        yield drop_older(first_articles[::-1], cutoff)
+
+    def close(self):
+        async def _close():
+            if self._session is not None:
+                await self._session.close()
+        self.key_manager.close()
+        if self._loop.is_running():
+            self.run(_close())
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+
+
+_ENGINE = None
+_ENGINE_LOCK = threading.Lock()
+
+
+def get_fetch_engine():
+    global _ENGINE
+    with _ENGINE_LOCK:
+        if _ENGINE is None:
+            _ENGINE = NewsFetchEngine()
+        return _ENGINE
+
+
+def close_fetch_engine():
+    """Close the shared session/loop; returns request and key stats for the run summary."""
+    global _ENGINE
+    with _ENGINE_LOCK:
+        engine, _ENGINE = _ENGINE, None
+    stats = get_newsapi_stats()
+    if engine is not None:
+        engine.close()
+        stats["keys"] = engine.key_manager.get_stats()
+    return stats
+
+
+atexit.register(close_fetch_engine)
+
+
+# =========================================================
+# SYNC ENTRY POINTS
+# =========================================================
+def fetch_article_pages(startup_name, helping_words, days, since=None):
+    return fetch_query_pages(build_query(startup_name, helping_words), days, startup_name, since)
+
+
+def fetch_articles(startup_name, helping_words, days, since=None):
+    return fetch_query(build_query(startup_name, helping_words), days, startup_name, since)
+
+
+def _query_window(days, since):
+    """(from, to, cutoff) for a query: from `since` (newest stored publishedAt) or a whole `days` range."""
+    if since is not None:
+        cutoff = fetch_cutoff(since)
+        _count("incremental_queries")
+        return cutoff.strftime("%Y-%m-%dT%H:%M:%S"), datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S"), cutoff
+    return (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d"), datetime.now().strftime("%Y-%m-%d"), None
+
 
-        data = response.json()
-        if not data.get("articles"):
-            break
+async def _next_page(pages):
+    try:
+        return await pages.__anext__()
+    except StopAsyncIteration:
+        return None
 
-        all_articles.extend(data["articles"])
-        logging.info(f"Fetched {len(data['articles'])} from page {page}")
 
-        if len(data["articles"]) < 100:
-            break
+def fetch_query_pages(query, days, label, since=None, require_complete=False):
+    """
+    Pages of articles for a raw `q` string as they arrive, oldest first
+    (see `query_pages_async`); `label` is only used in logs. With `since`
+    (newest stored publishedAt) the window starts at that exact timestamp
+    instead of a whole `days` range. Only FETCH_PAGE_PREFETCH pages are
+    held ahead of the caller. `require_complete`: raise TooManyResults
+    rather than serve a result set cut off at NEWS_API_MAX_RESULTS.
+    """
+    from_date, to_date, cutoff = _query_window(days, since)
+    engine = get_fetch_engine()
+    pages = engine.query_pages_async(query, from_date, to_date, label, cutoff, require_complete)
+    try:
+        while True:
+            page = engine.run(_next_page(pages))
+            if page is None:
+                return
+            yield page
+    finally:
+        # stops prefetching when the caller gives up early
+        if engine._loop.is_running():
+            engine.run(pages.aclose())
 
-        page += 1
-        time.sleep(1.2)
 
-    return all_articles
\ No newline at end of file
+def fetch_query(query, days, label, since=None):
+    """Every article for a raw `q` string as one list (oldest first)."""
+    return [article for page in fetch_query_pages(query, days, label, since) for article in page]
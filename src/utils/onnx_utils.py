@@ -0,0 +1,205 @@
+# src/utils/onnx_utils.py
+# ONNX Runtime backend for FinBERT: one-time export (optionally int8
+# dynamic quantization), cached on disk per model revision and reused across
+# runs. The fast tokenizer is saved next to the export, so scoring from a
+# cached export needs neither torch nor transformers.
+import os
+import threading
+from src.constants import ONNX_CACHE_DIR, INFERENCE_THREADS
+from src.logger import logging
+
+ONNX_BACKENDS = ("onnx", "onnx-int8")
+
+_SESSIONS = {}
+_SESSIONS_LOCK = threading.Lock()
+
+
+def onnx_model_path(model_id, revision, quantize=False):
+    """Location of the cached export for a model ID at a resolved revision (commit SHA)."""
+    name = "model.int8.onnx" if quantize else "model.onnx"
+    return os.path.join(ONNX_CACHE_DIR, model_id.replace("/", "__"), revision.replace("/", "__"), name)
+
+
+def onnx_tokenizer_path(model_id, revision):
+    return os.path.join(os.path.dirname(onnx_model_path(model_id, revision)), "tokenizer.json")
+
+
+class OnnxTokenizer:
+    """
+    The exported fast tokenizer (`tokenizers` library) behind the two calls
+    sentiment_score_batch makes on a transformers tokenizer: encode a list
+    of texts (truncated to `max_length`) and pad a bucket to numpy arrays.
+    """
+
+    def __init__(self, path, max_length):
+        from tokenizers import Tokenizer
+
+        self._tokenizer = Tokenizer.from_file(path)
+        self.pad_id = (self._tokenizer.padding or {}).get("pad_id", 0)
+        self._tokenizer.no_padding()
+        self._tokenizer.enable_truncation(max_length)
+
+    def __call__(self, texts, **_):
+        encodings = self._tokenizer.encode_batch(texts)
+        return {
+            "input_ids": [e.ids for e in encodings],
+            "token_type_ids": [e.type_ids for e in encodings],
+            "attention_mask": [e.attention_mask for e in encodings],
+        }
+
+    def pad(self, features, return_tensors="np"):
+        import numpy as np
+
+        width = max(len(f["input_ids"]) for f in features)
+        padded = {}
+        for key in features[0]:
+            fill = self.pad_id if key == "input_ids" else 0
+            padded[key] = np.array([f[key] + [fill] * (width - len(f[key])) for f in features], dtype="int64")
+        return padded
+
+
+def _save_tokenizer(tokenizer, path):
+    # only fast (Rust-backed) tokenizers serialize to tokenizer.json
+    backend = getattr(tokenizer, "backend_tokenizer", None)
+    if backend is None:
+        return
+    from tokenizers import Tokenizer
+
+    saved = Tokenizer.from_str(backend.to_str())
+    saved.no_truncation()
+    saved.enable_padding(pad_id=tokenizer.pad_token_id or 0, pad_token=tokenizer.pad_token or "[PAD]")
+    saved.save(path)
+
+
+def export_onnx(model, tokenizer, path):
+    """Export the torch model (and its fast tokenizer) to ONNX with dynamic batch and sequence axes."""
+    import torch
+
+    class LogitsOnly(torch.nn.Module):
+        # forward() takes tensors positionally; map them back to keyword
+        # arguments so tokenizer key order never has to match the model signature
+        def __init__(self, wrapped, names):
+            super().__init__()
+            self.wrapped = wrapped
+            self.names = names
+
+        def forward(self, *tensors):
+            return self.wrapped(**dict(zip(self.names, tensors))).logits
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    sample = tokenizer(["FinBERT export sample"], return_tensors="pt")
+    input_names = list(sample.keys())
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["logits"] = {0: "batch"}
+
+    original_device = next(model.parameters()).device
+    wrapper = LogitsOnly(model.to("cpu"), input_names).eval()
+    tmp_path = path + ".tmp"
+    try:
+        torch.onnx.export(
+            wrapper,
+            tuple(sample[name] for name in input_names),
+            tmp_path,
+            input_names=input_names,
+            output_names=["logits"],
+            dynamic_axes=dynamic_axes,
+            opset_version=17,
+            dynamo=False,
+        )
+    finally:
+        model.to(original_device)
+    _save_tokenizer(tokenizer, os.path.join(os.path.dirname(path), "tokenizer.json"))
+    os.replace(tmp_path, path)
+    logging.info("Exported FinBERT to ONNX at %s", path)
+    return path
+
+
+def quantize_onnx(src_path, dst_path):
+    """Apply dynamic int8 weight quantization to an exported model."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    tmp_path = dst_path + ".tmp"
+    quantize_dynamic(src_path, tmp_path, weight_type=QuantType.QInt8)
+    os.replace(tmp_path, dst_path)
+    logging.info("Wrote int8-quantized ONNX model to %s", dst_path)
+    return dst_path
+
+
+def _ensure_export(model_id, revision, load_model):
+    # caller holds _SESSIONS_LOCK
+    path = onnx_model_path(model_id, revision)
+    if not os.path.exists(path):
+        tokenizer, model, _ = load_model()
+        export_onnx(model, tokenizer, path)
+    return path
+
+
+def get_onnx_tokenizer(model_id, revision, load_model, max_length):
+    """
+    The tokenizer saved with the export for `revision` (exporting first if
+    needed), or None when the model only has a slow tokenizer.
+    """
+    key = (model_id, revision, "tokenizer")
+    with _SESSIONS_LOCK:
+        if key not in _SESSIONS:
+            _ensure_export(model_id, revision, load_model)
+            path = onnx_tokenizer_path(model_id, revision)
+            _SESSIONS[key] = OnnxTokenizer(path, max_length) if os.path.exists(path) else None
+        return _SESSIONS[key]
+
+
+def get_onnx_session(model_id, revision, load_model, quantize=False):
+    """
+    Return a cached ONNX Runtime session, exporting/quantizing on first use.
+    `load_model()` -> (tokenizer, model, device) is only called when there is
+    no export for `revision` yet, so a warm cache never loads torch.
+    """
+    import onnxruntime as ort
+
+    key = (model_id, revision, quantize)
+    with _SESSIONS_LOCK:
+        if key in _SESSIONS:
+            return _SESSIONS[key]
+
+        fp32_path = onnx_model_path(model_id, revision)
+        path = onnx_model_path(model_id, revision, quantize=True) if quantize else fp32_path
+        if not os.path.exists(path):
+            _ensure_export(model_id, revision, load_model)
+            if quantize:
+                quantize_onnx(fp32_path, path)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if INFERENCE_THREADS > 0:
+            options.intra_op_num_threads = INFERENCE_THREADS
+        session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        _SESSIONS[key] = session
+        logging.info("ONNX Runtime session ready (%s)", os.path.basename(path))
+        return session
+
+
+def onnx_logits(session, inputs):
+    """Run a padded numpy batch through the session and return logits."""
+    wanted = {i.name for i in session.get_inputs()}
+    feed = {name: value.astype("int64") for name, value in inputs.items() if name in wanted}
+    return session.run(["logits"], feed)[0]
+
+
+if __name__ == "__main__":
+    # python -m src.utils.onnx_utils [texts.txt]
+    # Builds the cached exports and prints a parity report against torch.
+    import json
+    import sys
+    from src.utils.sentiment_utils import compare_backends
+
+    if len(sys.argv) > 1:
+        with open(sys.argv[1]) as f:
+            texts = [line.strip() for line in f if line.strip()]
+    else:
+        texts = [
+            "The startup raised $50 million in a Series C round led by global investors.",
+            "The company announced layoffs of 20% of its workforce amid mounting losses.",
+            "The firm will hold its annual general meeting in Bengaluru next month.",
+        ]
+    for backend in ONNX_BACKENDS:
+        print(json.dumps(compare_backends(texts, backend=backend), indent=2))
@@ -6,41 +6,79 @@
 # =========================================================
 
 import uuid
+from src.constants import STREAM_CHUNK_ARTICLES
 from src.logger import logging
-from src.utils.db_utils import get_connection
-from src.utils.newsapi_utils import fetch_articles
+from src.utils.writer_utils import get_article_writer
+from src.utils.newsapi_utils import fetch_articles, fetch_article_pages, fetch_cutoff, drop_older
 from src.utils.cache_utils import check_duplicacy
-from src.utils.sentiment_utils import sentiment_score_batch
+from src.utils.neardup_utils import filter_near_duplicates, commit_near_dup_claim, release_near_dup_claim
+from src.utils.relevance_utils import filter_relevant
+from src.utils.sentiment_cache_utils import cached_score_texts
 from src.utils.text_utils import merge_text, truncate_content
+from src.utils.trace_utils import span
 
 
 # =========================================================
-# CORE PIPELINE FUNCTION
+# PIPELINE STEPS
 # =========================================================
-def process_and_store_articles(startup_id, startup_name, helping_words, days):
-    """
-    Fetches articles for a startup (1-day or 30-day range),
-    removes duplicates, scores sentiments, truncates content,
-    and inserts data into the Articles table.
-    """
+# Each step takes a job dict (see `new_job`) and returns it for the next
+# step, or None when there is nothing left to do for that startup. The
+# same steps back both `process_and_store_articles` and the streaming
+# stage graph in src/pipeline.
+
+def new_job(startup_id, startup_name, helping_words, days, articles=None, since=None):
+    # `since` is the startup's newest stored publishedAt; it replaces the `days` window
+    return {
+        "startup_id": startup_id,
+        "startup_name": startup_name,
+        "helping_words": helping_words,
+        "days": days,
+        "since": since,
+        "articles": articles,
+    }
 
-    logging.info(f"📰 Starting {days}-day article processing for {startup_name}")
 
-    # 1️⃣ Fetch articles from NewsAPI
-    articles = fetch_articles(startup_name, helping_words, days)
-    if not articles:
-        logging.info(f"No articles found for {startup_name}")
-        return
+def fetch_step(job):
+    """1️⃣ Fetch articles from NewsAPI (skipped when a packed query already did)."""
+    if job["articles"] is None:
+        window = f"since {job['since']}" if job["since"] else f"{job['days']}-day"
+        logging.info("📰 Starting %s article processing for %s", window, job['startup_name'])
+        job["articles"] = fetch_articles(job["startup_name"], job["helping_words"], job["days"], job["since"])
+    elif job["since"] is not None:
+        # packed queries start at the pack's oldest watermark
+        job["articles"] = drop_older(job["articles"], fetch_cutoff(job["since"]))
+    if not job["articles"]:
+        logging.info("No articles found for %s", job['startup_name'])
+        return None
+    return job
+
+
+def relevance_step(job):
+    """2️⃣ Drop articles that never mention the startup (name/alias/keyword matcher)"""
+    job["articles"] = filter_relevant(job["articles"], job["startup_name"], job["helping_words"])
+    if not job["articles"]:
+        logging.info("No relevant articles for %s", job['startup_name'])
+        return None
+    return job
+
+
+def dedup_step(job):
+    """
+    3️⃣ Deduplicate using cache. Runs after relevance: claiming a URL here
+    keeps it from every other startup this run, so only a startup the
+    article is about may claim it (a packed query returns it for all).
+    """
+    job["articles"] = check_duplicacy(job["articles"])
+    if not job["articles"]:
+        logging.info("No new articles after deduplication for %s", job['startup_name'])
+        return None
+    return job
 
-    # 2️⃣ Deduplicate using cache
-    new_articles = check_duplicacy(articles)
-    if not new_articles:
-        logging.info(f"No new articles after deduplication for {startup_name}")
-        return
 
-    # 3️⃣ Merge and clean article text
+def prep_step(job):
+    """4️⃣ Merge and clean article text, then suppress near-duplicates"""
     contents, valid_articles = [], []
-    for article in new_articles:
+    for article in job["articles"]:
         content = merge_text(article.get("description"), article.get("content"))
         if not content or len(content) < 30:
             continue
@@ -48,71 +86,179 @@ def process_and_store_articles(startup_id, startup_name, helping_words, days):
         valid_articles.append(article)
 
     if not contents:
-        logging.info(f"No valid article content for {startup_name}")
-        return
+        logging.info("No valid article content for %s", job['startup_name'])
+        return None
 
-    # 4️⃣ Sentiment analysis using FinBERT
-    results = sentiment_score_batch(contents)
-    if not results:
-        logging.warning(f"Sentiment scoring failed for {startup_name}")
-        return
+    # syndicated copies, AMP/utm variants
+    with span("neardup.filter", job.get("timings")):
+        valid_articles, contents, job["near_dup_claim"] = filter_near_duplicates(
+            valid_articles, contents, job["startup_id"]
+        )
+    if not contents:
+        logging.info("Only near-duplicate articles left for %s", job['startup_name'])
+        return None
+    job["articles"], job["contents"] = valid_articles, contents
+    return job
+
+
+def score_step(job):
+    """5️⃣ Sentiment analysis using FinBERT (content-hash cache, then shared scheduler)"""
+    job["results"] = cached_score_texts(job["contents"])
+    if not job["results"]:
+        logging.warning("Sentiment scoring failed for %s", job['startup_name'])
+        return None
+    return job
 
-    # 5️⃣ Prepare records for insertion
+
+def write_step(job):
+    """6️⃣ Prepare records and 7️⃣ queue them for bulk insert (or hand them to the job's `sink`)"""
     batch = []
-    for article, (sentiment, score), content in zip(valid_articles, results, contents):
+    for article, (sentiment, score), content in zip(job["articles"], job["results"], job["contents"]):
         truncated = truncate_content(content)
         batch.append((
             str(uuid.uuid4()),                # id
             truncated,                        # content (≤ 300 chars)
             article.get("publishedAt"),       # publishedAt
             sentiment,                        # sentiment label
-            score,                            # sentiment score
-            startup_id,                       # startupId (FK)
+            score,                            # sentiment score (FinBERT's, unweighted)
+            job["startup_id"],                # startupId (FK)
             article.get("title") or "untitled",  # title
-            article.get("url")                # url
+            article.get("url"),               # url
+            article.get("relevance_weight", 1.0),  # relevanceWeight (< 1 if barely relevant)
         ))
 
     if not batch:
-        logging.info(f"No valid batch to insert for {startup_name}")
-        return
+        logging.info("No valid batch to insert for %s", job['startup_name'])
+        return None
 
-    # 6️⃣ Insert into database
-    conn = get_connection()
-    try:
-        with conn.cursor() as cur:
-            cur.executemany("""
-                INSERT INTO "Articles" 
-                (id, content, "publishedAt", sentiment, "sentimentScore", "startupId", title, url)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-            """, batch)
-        conn.commit()
-        logging.info(f"✅ Inserted {len(batch)} new articles for {startup_name}")
-    except Exception as e:
-        logging.error(f"❌ Failed to insert articles for {startup_name}: {e}")
-        conn.rollback()
-    finally:
-        conn.close()
-        logging.info(f"Closed DB connection for {startup_name}")
+    # flushed across startups by the shared writer; `on_stored` fires once committed, `on_failed` if not.
+    # Chunks of a streamed startup go through a sink that keeps them in order.
+    claim, on_stored, on_failed = job.get("near_dup_claim"), job.get("on_stored"), job.get("on_failed")
+
+    def stored():
+        # only stored stories suppress later copies
+        commit_near_dup_claim(claim)
+        if on_stored:
+            on_stored()
+
+    def failed(error):
+        release_near_dup_claim(claim)
+        if on_failed:
+            on_failed(error)
+
+    add = job.get("sink") or get_article_writer().add
+    add(batch, on_flush=stored, on_failed=failed)
+    logging.info("Queued %s new articles for %s", len(batch), job['startup_name'])
+    return job
+
+
+PIPELINE_STEPS = (fetch_step, relevance_step, dedup_step, prep_step, score_step, write_step)
+
+
+def step_name(step):
+    """Short step name ("fetch" for fetch_step); used for spans and run-journal checkpoints."""
+    return step.__name__[:-len("_step")]
+
+
+def run_step(step, job):
+    """Run one step under a `step.<name>` span; the job's "timings" collect per-startup seconds."""
+    with span(f"step.{step_name(step)}", job.setdefault("timings", {})):
+        return step(job)
+
+
+def release_job(job):
+    """The job left the pipeline without queuing rows: drop its near-dup claim."""
+    release_near_dup_claim(job.get("near_dup_claim"))
+    job["near_dup_claim"] = None
+
+
+class ArticleChunker:
+    """
+    Regroups fetched pages into chunks of `size` articles. A chunk is only
+    released once more articles follow it, so whatever `close` returns is the
+    last chunk, and a startup that never released one fits in a single chunk.
+    """
+
+    def __init__(self, size=STREAM_CHUNK_ARTICLES):
+        self.size = max(1, size)
+        self.released = 0
+        self._buffer = []
+
+    def add(self, articles):
+        """Buffer a page; returns the chunks it completed."""
+        self._buffer.extend(articles)
+        chunks = []
+        while len(self._buffer) > self.size:
+            chunks.append(self._buffer[:self.size])
+            self._buffer = self._buffer[self.size:]
+        self.released += len(chunks)
+        return chunks
+
+    def close(self):
+        rest, self._buffer = self._buffer, []
+        return rest
+
+
+def article_chunks(pages, size=STREAM_CHUNK_ARTICLES):
+    """Chunks of at most `size` articles from an iterable of pages, in page order."""
+    chunker = ArticleChunker(size)
+    for page in pages:
+        yield from chunker.add(page)
+    rest = chunker.close()
+    if rest:
+        yield rest
+
+
+# =========================================================
+# CORE PIPELINE FUNCTION
+# =========================================================
+def process_and_store_articles(startup_id, startup_name, helping_words, days, articles=None, since=None):
+    """
+    Fetches articles for a startup (1-day or 30-day range, or from `since`),
+    removes duplicates, scores sentiments, truncates content,
+    and inserts data into the Articles table.
+    Pages are processed in chunks of STREAM_CHUNK_ARTICLES as they arrive
+    (oldest first), so memory stays bounded and the first rows are queued
+    before pagination ends.
+    `articles` skips the fetch when they were already fetched by a packed query.
+    """
+    if articles is None:
+        window = f"since {since}" if since else f"{days}-day"
+        logging.info("📰 Starting %s article processing for %s", window, startup_name)
+        pages = fetch_article_pages(startup_name, helping_words, days, since)
+    else:
+        pages = [articles]
+    chunks = 0
+    for chunk in article_chunks(pages):
+        chunks += 1
+        job = new_job(startup_id, startup_name, helping_words, days, chunk, since)
+        for step in PIPELINE_STEPS:
+            if run_step(step, job) is None:
+                release_job(job)
+                break
+    if not chunks:
+        logging.info("No articles found for %s", startup_name)
 
 
 # =========================================================
 # WRAPPERS (for easy pipeline calls)
 # =========================================================
-def process_and_store_initial_articles(startup_id, startup_name, helping_words):
+def process_and_store_initial_articles(startup_id, startup_name, helping_words, articles=None):
     """
     Handles 30-day article fetching for startups that do NOT yet exist in the Articles table.
     """
     try:
-        process_and_store_articles(startup_id, startup_name, helping_words, days=30)
+        process_and_store_articles(startup_id, startup_name, helping_words, days=30, articles=articles)
     except Exception as e:
-        logging.error(f"[INITIAL] Pipeline failed for {startup_name}: {e}")
+        logging.error("[INITIAL] Pipeline failed for %s: %s", startup_name, e)
 
 
-def process_and_store_daily_articles(startup_id, startup_name, helping_words):
+def process_and_store_daily_articles(startup_id, startup_name, helping_words, articles=None, since=None):
     """
-    Handles 1-day article fetching for startups that already exist in the Articles table.
+    Handles incremental article fetching for startups that already exist in the Articles table:
+    from their newest stored article when `since` is given, otherwise the last day.
     """
     try:
-        process_and_store_articles(startup_id, startup_name, helping_words, days=1)
+        process_and_store_articles(startup_id, startup_name, helping_words, days=1, articles=articles, since=since)
     except Exception as e:
-        logging.error(f"[DAILY] Pipeline failed for {startup_name}: {e}")
+        logging.error("[DAILY] Pipeline failed for %s: %s", startup_name, e)
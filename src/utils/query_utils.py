@@ -0,0 +1,128 @@
+# src/utils/query_utils.py
+# NewsAPI query planner: packs several startups' search terms into one
+# OR-query (up to NewsAPI's `q` length limit) and routes each returned
+# article back to the startup(s) whose name or keywords it mentions. A pack
+# whose results run past NEWS_API_MAX_RESULTS is split into one query per
+# startup, so packing never costs coverage.
+import re
+import threading
+from src.constants import NEWS_API_MAX_RESULTS, QUERY_MAX_LENGTH, QUERY_PACK_MAX_STARTUPS
+from src.logger import logging
+from src.utils.newsapi_utils import (
+    TooManyResults,
+    build_query,
+    fetch_article_pages,
+    fetch_query_pages,
+    get_newsapi_stats,
+    parse_keywords,
+)
+
+_PACK_STATS = {"startups": 0, "packs": 0, "split_packs": 0, "split_startups": 0, "articles": 0, "attributed": 0, "unattributed": 0}
+_PACK_STATS_LOCK = threading.Lock()
+
+
+def startup_terms(startup_name, helping_words):
+    """Quoted OR-terms for one startup. `"X" startup`-style variants are implied by `"X"`."""
+    terms = [f'"{startup_name}"']
+    terms.extend(f'"{word}"' for word in parse_keywords(helping_words))
+    return list(dict.fromkeys(terms))
+
+
+def plan_query_packs(startups, max_length=QUERY_MAX_LENGTH, max_startups=QUERY_PACK_MAX_STARTUPS):
+    """
+    Greedily pack (id, name, helping_words) tuples into combined queries.
+    Terms shared between startups (e.g. "fintech") appear once per pack.
+    Returns [{"query": str, "startups": [(id, name, helping_words), ...]}].
+    """
+    packs = []
+    current, current_terms = [], []
+    for startup in startups:
+        _, name, helping_words = startup
+        terms = startup_terms(name, helping_words)
+        merged = list(dict.fromkeys(current_terms + terms))
+        if current and (len(" OR ".join(merged)) > max_length or len(current) >= max_startups):
+            packs.append({"query": " OR ".join(current_terms), "startups": current})
+            current, merged = [], terms
+        current.append(startup)
+        current_terms = merged
+    if current:
+        packs.append({"query": " OR ".join(current_terms), "startups": current})
+
+    for pack in packs:
+        if len(pack["startups"]) == 1:
+            # a lone startup keeps its original query
+            _, name, helping_words = pack["startups"][0]
+            pack["query"] = build_query(name, helping_words)
+
+    with _PACK_STATS_LOCK:
+        _PACK_STATS["startups"] += len(startups)
+        _PACK_STATS["packs"] += len(packs)
+    logging.info("Planned %s NewsAPI queries for %s startups", len(packs), len(startups))
+    return packs
+
+
+def _matcher(startup_name, helping_words):
+    phrases = [startup_name] + parse_keywords(helping_words)
+    alternation = "|".join(re.escape(p) for p in sorted(set(phrases), key=len, reverse=True))
+    return re.compile(rf"(?<!\w)(?:{alternation})(?!\w)", re.IGNORECASE)
+
+
+def attribute_articles(articles, startups):
+    """Route articles to every startup whose name or keywords appear in them."""
+    matchers = [(startup[0], _matcher(startup[1], startup[2])) for startup in startups]
+    routed = {startup[0]: [] for startup in startups}
+    unattributed = 0
+    for article in articles:
+        text = " ".join(filter(None, (article.get("title"), article.get("description"), article.get("content"))))
+        hits = [sid for sid, pattern in matchers if pattern.search(text)]
+        for sid in hits:
+            routed[sid].append(article)
+        if not hits:
+            unattributed += 1
+
+    with _PACK_STATS_LOCK:
+        _PACK_STATS["articles"] += len(articles)
+        _PACK_STATS["attributed"] += len(articles) - unattributed
+        _PACK_STATS["unattributed"] += unattributed
+    return routed
+
+
+def fetch_pack_pages(pack, days, since=None):
+    """
+    Stream one packed query: yields {startup_id: [articles]} per page as pages
+    arrive (oldest first). `since` should be the oldest watermark in the pack;
+    callers trim each startup to its own. When the packed query matches more
+    than NEWS_API_MAX_RESULTS, each startup is queried on its own instead
+    (from its own watermark in `pack["watermarks"]`, if any).
+    """
+    label = ", ".join(name for _, name, _ in pack["startups"])
+    if len(pack["startups"]) == 1:
+        for page in fetch_query_pages(pack["query"], days, label, since):
+            yield {pack["startups"][0][0]: page}
+        return
+    try:
+        # raises before the first page when the results would be cut off
+        for page in fetch_query_pages(pack["query"], days, label, since, require_complete=True):
+            yield attribute_articles(page, pack["startups"])
+        return
+    except TooManyResults as e:
+        logging.info("Packed query for %s matched %s results (limit %s); querying each startup on its own",
+                     label, e.total, NEWS_API_MAX_RESULTS)
+        with _PACK_STATS_LOCK:
+            _PACK_STATS["split_packs"] += 1
+            _PACK_STATS["split_startups"] += len(pack["startups"])
+    watermarks = pack.get("watermarks", {})
+    for sid, name, helping_words in pack["startups"]:
+        for page in fetch_article_pages(name, helping_words, days, watermarks.get(sid, since)):
+            yield {sid: page}
+
+
+def get_query_pack_stats():
+    """Packing summary for the run, including NewsAPI requests made and saved."""
+    with _PACK_STATS_LOCK:
+        stats = dict(_PACK_STATS)
+    # Without packing every startup costs at least one request; a split pack
+    # costs one per startup plus its refused packed query.
+    stats["requests"] = get_newsapi_stats()["requests"]
+    stats["requests_saved"] = max(0, stats["startups"] - stats["packs"] - stats["split_startups"])
+    return stats
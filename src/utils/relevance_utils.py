@@ -0,0 +1,166 @@
+# src/utils/relevance_utils.py
+# Relevance prefilter between fetch and URL dedup, so only a startup an article
+# mentions claims its URL, and well before FinBERT. Queries OR in every helping
+# keyword, so many fetched articles never mention the startup ("fintech"
+# for CRED). A startup's name, aliases derived from it and its keywords are
+# compiled into one Aho-Corasick automaton; an article scores the weighted
+# sum of the distinct terms found in its title, description and content.
+# Below RELEVANCE_DROP_SCORE it is dropped before scoring and storage;
+# below RELEVANCE_KEEP_SCORE it is kept and stored with relevanceWeight
+# RELEVANCE_DOWNWEIGHT. sentimentScore always stays FinBERT's own score, so
+# readers weight at read time and the daily rollups match older rows.
+import re
+import threading
+from collections import deque
+from functools import lru_cache
+from src.constants import (
+    RELEVANCE_ENABLED,
+    RELEVANCE_KEEP_SCORE,
+    RELEVANCE_DROP_SCORE,
+    RELEVANCE_DOWNWEIGHT,
+    RELEVANCE_KEYWORD_WEIGHT,
+)
+from src.logger import logging
+from src.utils.newsapi_utils import parse_keywords
+from src.utils.text_utils import merge_text
+
+# a term in the headline counts double
+FIELD_WEIGHTS = {"title": 2.0, "description": 1.0, "content": 1.0}
+MIN_TERM_LENGTH = 3
+
+_LEGAL_SUFFIX = re.compile(
+    r"[\s,]+(?:private limited|pvt\.? ltd\.?|ltd\.?|limited|inc\.?|llp|technologies|technology|labs)$", re.IGNORECASE
+)
+_DOMAIN_SUFFIX = re.compile(r"\.(?:com|in|ai|io|co)$", re.IGNORECASE)
+_CAMEL_BOUNDARY = re.compile(r"(?<=[a-z])(?=[A-Z])")
+_SPACES = re.compile(r"\s+")
+
+_STATS = {"checked": 0, "kept": 0, "downweighted": 0, "dropped": 0, "inference_texts_saved": 0}
+_STATS_LOCK = threading.Lock()
+
+
+class TermMatcher:
+    """Aho-Corasick automaton over lowercase terms; `find` reports whole-word matches in one pass."""
+
+    def __init__(self, terms):
+        # terms: {term: weight}
+        self._goto, self._fail, self._out = [{}], [0], [[]]
+        for term, weight in terms.items():
+            state = 0
+            for ch in term:
+                if ch not in self._goto[state]:
+                    self._goto[state][ch] = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = self._goto[state][ch]
+            self._out[state].append((term, weight))
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, child in self._goto[state].items():
+                queue.append(child)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(ch, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def find(self, text):
+        """{term: weight} for every term that occurs in `text` as whole words."""
+        text = _SPACES.sub(" ", text.lower())
+        goto, fail, out = self._goto, self._fail, self._out
+        found = {}
+        state = 0
+        end = len(text)
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for term, weight in out[state]:
+                start = i - len(term) + 1
+                if (start == 0 or not text[start - 1].isalnum()) and (i + 1 == end or not text[i + 1].isalnum()):
+                    found[term] = weight
+        return found
+
+
+def _normalize(term):
+    return _SPACES.sub(" ", term.lower()).strip()
+
+
+def name_aliases(startup_name):
+    """The name plus common spellings: without legal suffixes or a domain, split or joined CamelCase."""
+    base = _DOMAIN_SUFFIX.sub("", _LEGAL_SUFFIX.sub("", startup_name.strip()))
+    aliases = {startup_name, base, _CAMEL_BOUNDARY.sub(" ", base)}
+    if " " in base:
+        aliases.add(base.replace(" ", ""))
+    return {_normalize(alias) for alias in aliases if len(alias.strip()) >= MIN_TERM_LENGTH}
+
+
+@lru_cache(maxsize=1024)
+def _compiled_matcher(startup_name, keywords):
+    terms = {_normalize(k): RELEVANCE_KEYWORD_WEIGHT for k in keywords if len(k.strip()) >= MIN_TERM_LENGTH}
+    # a keyword that is also a spelling of the name counts as the name
+    terms.update({alias: 1.0 for alias in name_aliases(startup_name)})
+    return TermMatcher(terms)
+
+
+def startup_matcher(startup_name, helping_words):
+    return _compiled_matcher(startup_name, tuple(parse_keywords(helping_words)))
+
+
+def relevance_score(matcher, article):
+    """Sum over distinct matched terms of term weight x the weight of the best field it appears in."""
+    best = {}
+    for field, field_weight in FIELD_WEIGHTS.items():
+        text = article.get(field)
+        if not text:
+            continue
+        for term, weight in matcher.find(text).items():
+            best[term] = max(best.get(term, 0.0), weight * field_weight)
+    return sum(best.values())
+
+
+def filter_relevant(articles, startup_name, helping_words):
+    """
+    Drop articles scoring below RELEVANCE_DROP_SCORE; tag the ones below
+    RELEVANCE_KEEP_SCORE with a "relevance_weight", stored as "relevanceWeight".
+    """
+    if not RELEVANCE_ENABLED or not articles:
+        return articles
+
+    matcher = startup_matcher(startup_name, helping_words)
+    kept, downweighted, saved = [], 0, 0
+    for article in articles:
+        score = relevance_score(matcher, article)
+        if score < RELEVANCE_DROP_SCORE:
+            # would prep have sent it to FinBERT (and on to the writer)?
+            if len(merge_text(article.get("description"), article.get("content"))) >= 30:
+                saved += 1
+            continue
+        if score < RELEVANCE_KEEP_SCORE:
+            article["relevance_weight"] = RELEVANCE_DOWNWEIGHT
+            downweighted += 1
+        kept.append(article)
+
+    dropped = len(articles) - len(kept)
+    with _STATS_LOCK:
+        _STATS["checked"] += len(articles)
+        _STATS["kept"] += len(kept) - downweighted
+        _STATS["downweighted"] += downweighted
+        _STATS["dropped"] += dropped
+        _STATS["inference_texts_saved"] += saved
+    if dropped or downweighted:
+        logging.info("Relevance filter for %s: dropped %s, down-weighted %s of %s articles",
+                     startup_name, dropped, downweighted, len(articles))
+    return kept
+
+
+def get_relevance_stats():
+    """Filter counts; dropped articles never reach FinBERT or the writer."""
+    with _STATS_LOCK:
+        stats = dict(_STATS)
+    # everything prep would have kept is a saved inference text and a saved insert
+    stats["inserts_saved"] = stats["inference_texts_saved"]
+    return stats
@@ -0,0 +1,102 @@
+# src/utils/rollup_utils.py
+# Daily per-startup sentiment rollups ("StartupSentimentDaily"). The bulk
+# writer upserts deltas for the rows it inserts in the same statement, so a
+# startup's trend is read from O(days) rollup rows instead of aggregating
+# raw Articles. `rebuild_sentiment_rollups` recomputes them from Articles.
+#
+#   python -m src.utils.rollup_utils [startup_id ...]
+import sys
+from src.logger import logging
+from src.utils.db_utils import run_with_connection
+
+ROLLUP_TABLE = "StartupSentimentDaily"
+
+# Aggregates a set of Articles-shaped rows ({source}) into per-day rollup rows
+_ROLLUP_SELECT = """
+    SELECT "startupId", "publishedAt"::date,
+           COUNT(*),
+           COUNT(*) FILTER (WHERE sentiment = 'positive'),
+           COUNT(*) FILTER (WHERE sentiment = 'neutral'),
+           COUNT(*) FILTER (WHERE sentiment = 'negative'),
+           COALESCE(SUM("sentimentScore"), 0)
+    FROM {source}
+    {where}
+    GROUP BY 1, 2
+"""
+_ROLLUP_COLUMNS = '"startupId", day, "articleCount", "positiveCount", "neutralCount", "negativeCount", "scoreSum"'
+
+# Fills an empty rollup table from every stored article (migration 004)
+ROLLUP_BACKFILL_SQL = f"""
+    INSERT INTO "{ROLLUP_TABLE}" ({_ROLLUP_COLUMNS})
+    {_ROLLUP_SELECT.format(source='"Articles"', where="")}
+    ON CONFLICT DO NOTHING
+"""
+
+# Appended to the writer's INSERT ... RETURNING as a data-modifying CTE
+ROLLUP_DELTA_SQL = f"""
+    INSERT INTO "{ROLLUP_TABLE}" AS r ({_ROLLUP_COLUMNS})
+    {_ROLLUP_SELECT.format(source="inserted", where="")}
+    ON CONFLICT ("startupId", day) DO UPDATE SET
+        "articleCount" = r."articleCount" + EXCLUDED."articleCount",
+        "positiveCount" = r."positiveCount" + EXCLUDED."positiveCount",
+        "neutralCount" = r."neutralCount" + EXCLUDED."neutralCount",
+        "negativeCount" = r."negativeCount" + EXCLUDED."negativeCount",
+        "scoreSum" = r."scoreSum" + EXCLUDED."scoreSum",
+        "updatedAt" = CURRENT_TIMESTAMP
+"""
+
+
+def rollup_table_exists(conn):
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass(%s) IS NOT NULL", (f'"{ROLLUP_TABLE}"',))
+        return cur.fetchone()[0]
+
+
+def rebuild_sentiment_rollups(startup_ids=None):
+    """
+    Recompute rollups from Articles in bulk (all startups, or just `startup_ids`).
+    The table lock makes concurrent writers wait, so no delta is lost or counted twice.
+    """
+    def rebuild(conn):
+        with conn.cursor() as cur:
+            cur.execute(f'LOCK TABLE "{ROLLUP_TABLE}" IN EXCLUSIVE MODE')
+            if startup_ids:
+                # ids arrive as text; matched through "Startups" so a UUID "startupId" keeps its index
+                where = 'WHERE "startupId" IN (SELECT id FROM "Startups" WHERE id::text = ANY(%s))'
+                params = (list(startup_ids),)
+                cur.execute(f'DELETE FROM "{ROLLUP_TABLE}" {where}', params)
+            else:
+                cur.execute(f'DELETE FROM "{ROLLUP_TABLE}"')
+                where, params = "", None
+            cur.execute(
+                f'INSERT INTO "{ROLLUP_TABLE}" ({_ROLLUP_COLUMNS}) '
+                + _ROLLUP_SELECT.format(source='"Articles"', where=where),
+                params,
+            )
+            rows = cur.rowcount
+        conn.commit()
+        return rows
+
+    rows = run_with_connection(rebuild)
+    scope = f"{len(startup_ids)} startups" if startup_ids else "all startups"
+    logging.info("Rebuilt %s daily sentiment rollup rows for %s", rows, scope)
+    return rows
+
+
+def fetch_sentiment_trend(startup_id, days=30):
+    """Daily rollups for one startup, oldest first: (day, articles, pos, neu, neg, mean score)."""
+    def query(conn):
+        with conn.cursor() as cur:
+            cur.execute(f"""
+                SELECT day, "articleCount", "positiveCount", "neutralCount", "negativeCount", "scoreMean"
+                FROM "{ROLLUP_TABLE}"
+                WHERE "startupId" = %s AND day >= CURRENT_DATE - %s
+                ORDER BY day
+            """, (startup_id, days))
+            return cur.fetchall()
+
+    return run_with_connection(query)
+
+
+if __name__ == "__main__":
+    rebuild_sentiment_rollups(sys.argv[1:] or None)
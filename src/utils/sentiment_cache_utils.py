@@ -0,0 +1,155 @@
+# src/utils/sentiment_cache_utils.py
+# On-disk sentiment cache keyed by a normalized hash of the merged article
+# text plus the model identity. Syndicated copies of a story (and articles
+# matched by several startups) are scored by FinBERT only once.
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from src.constants import SENTIMENT_CACHE_PATH, SENTIMENT_CACHE_MAX_ENTRIES, SENTIMENT_MODEL_REVISION
+from src.logger import logging
+from src.utils.inference_utils import score_texts
+from src.utils.sentiment_utils import MODEL_ID, get_model_version, resolve_backend
+
+_WHITESPACE = re.compile(r"\s+")
+_LOOKUP_CHUNK = 500
+
+_CONN = None
+_MODEL_KEY = None
+_LOCK = threading.Lock()
+_STATS = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+def normalize_text(text):
+    return _WHITESPACE.sub(" ", (text or "").lower()).strip()
+
+
+def cache_key(text, model_key):
+    return hashlib.sha256(f"{model_key}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+def _model_key():
+    """Model identity for cache keys, or None while the model commit is unknown."""
+    backend = resolve_backend()
+    if backend == "stub":
+        # no weights involved, so no Hub lookup either
+        return f"{MODEL_ID}@stub|stub"
+    version = get_model_version()
+    return f"{MODEL_ID}@{version}|{backend}" if version else None
+
+
+def _open_cache():
+    """Open (once) the SQLite cache, dropping entries written by another model version."""
+    global _CONN, _MODEL_KEY
+    if _CONN is not None:
+        return _CONN
+    os.makedirs(os.path.dirname(SENTIMENT_CACHE_PATH) or ".", exist_ok=True)
+    conn = sqlite3.connect(SENTIMENT_CACHE_PATH, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS scores (
+            key TEXT PRIMARY KEY,
+            sentiment TEXT NOT NULL,
+            score REAL NOT NULL,
+            last_used REAL NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS scores_last_used ON scores (last_used)")
+
+    model_key = _model_key()
+    row = conn.execute("SELECT value FROM meta WHERE key = 'model'").fetchone()
+    if model_key is None:
+        # unknown is not a new version: keep the entries rather than wipe them on a network blip
+        backend = resolve_backend()
+        if row is not None and row[0].startswith(f"{MODEL_ID}@") and row[0].endswith(f"|{backend}"):
+            model_key = row[0]
+        else:
+            model_key = f"{MODEL_ID}@{SENTIMENT_MODEL_REVISION}|{backend}"
+        logging.warning("Model commit unknown; sentiment cache keyed as %s", model_key)
+    if row is None or row[0] != model_key:
+        dropped = conn.execute("DELETE FROM scores").rowcount
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('model', ?)", (model_key,))
+        if row is not None:
+            logging.info("Sentiment cache invalidated (%s -> %s); dropped %s entries", row[0], model_key, dropped)
+    conn.commit()
+    _CONN, _MODEL_KEY = conn, model_key
+    return conn
+
+
+def _lookup(conn, keys):
+    found = {}
+    for i in range(0, len(keys), _LOOKUP_CHUNK):
+        chunk = keys[i:i + _LOOKUP_CHUNK]
+        placeholders = ",".join("?" * len(chunk))
+        rows = conn.execute(f"SELECT key, sentiment, score FROM scores WHERE key IN ({placeholders})", chunk)
+        found.update({key: (sentiment, score) for key, sentiment, score in rows})
+    if found:
+        now = time.time()
+        conn.executemany("UPDATE scores SET last_used = ? WHERE key = ?", [(now, key) for key in found])
+    return found
+
+
+def _store(conn, entries):
+    now = time.time()
+    conn.executemany(
+        "INSERT OR REPLACE INTO scores (key, sentiment, score, last_used) VALUES (?, ?, ?, ?)",
+        [(key, sentiment, score, now) for key, (sentiment, score) in entries.items()],
+    )
+    total = conn.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+    if total > SENTIMENT_CACHE_MAX_ENTRIES:
+        # evict down to 90% so we don't trim on every insert
+        excess = total - int(SENTIMENT_CACHE_MAX_ENTRIES * 0.9)
+        conn.execute(
+            "DELETE FROM scores WHERE key IN (SELECT key FROM scores ORDER BY last_used LIMIT ?)",
+            (excess,),
+        )
+        _STATS["evictions"] += excess
+
+
+def cached_score_texts(texts):
+    """
+    Drop-in replacement for `score_texts`: returns [(label, score), ...]
+    in input order, sending only cache misses to the model.
+    """
+    if not texts:
+        return []
+    if SENTIMENT_CACHE_MAX_ENTRIES <= 0:
+        return score_texts(texts)
+
+    with _LOCK:
+        conn = _open_cache()
+        keys = [cache_key(text, _MODEL_KEY) for text in texts]
+        found = _lookup(conn, list(set(keys)))
+        conn.commit()
+
+    # score each distinct missing text once
+    missing = {}
+    for key, text in zip(keys, texts):
+        if key not in found and key not in missing:
+            missing[key] = text
+    if missing:
+        scored = dict(zip(missing, score_texts(list(missing.values()))))
+        with _LOCK:
+            _store(conn, scored)
+            conn.commit()
+        found.update(scored)
+
+    with _LOCK:
+        _STATS["hits"] += len(texts) - len(missing)
+        _STATS["misses"] += len(missing)
+    return [found[key] for key in keys]
+
+
+def get_sentiment_cache_stats():
+    """Hit/miss counters for the run summary."""
+    with _LOCK:
+        stats = dict(_STATS)
+        if _CONN is not None:
+            stats["entries"] = _CONN.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+            stats["model"] = _MODEL_KEY
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0
+    return stats
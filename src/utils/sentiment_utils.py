@@ -1,33 +1,286 @@
 # src/utils/sentiment_utils.py
-import torch
-import torch.nn.functional as F
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
-from src.constants import hf_token
+# torch/transformers and the model itself are loaded lazily on first
+# inference, so importing src.utils stays cheap for non-inference callers.
+import hashlib
+import json
+import os
+import re
+import threading
+from src.constants import (
+    hf_token,
+    SENTIMENT_MAX_LENGTH,
+    SENTIMENT_TOKEN_BUDGET,
+    SENTIMENT_BACKEND,
+    SENTIMENT_MODEL_REVISION,
+    SENTIMENT_MODEL_VERSION_PATH,
+    INFERENCE_THREADS,
+)
 from src.logger import logging
+from src.utils.trace_utils import span
 
 MODEL_ID = "Soumil24/finbert-custom"
 
-logging.info(f"Loading FinBERT model from Hugging Face: {MODEL_ID}")
-tokenizer = AutoTokenizer.from_pretrained(MODEL_ID, use_auth_token=hf_token)
-model = AutoModelForSequenceClassification.from_pretrained(MODEL_ID, use_auth_token=hf_token)
-model.eval()
-device = "cuda" if torch.cuda.is_available() else "cpu"
-model.to(device)
-logging.info(f"FinBERT model loaded successfully on {device.upper()}")
+tokenizer = None
+model = None
+device = None
+_MODEL_LOCK = threading.Lock()
+_MODEL_VERSION = None
+_MODEL_VERSION_RESOLVED = False
+_COMMIT_SHA = re.compile(r"[0-9a-f]{40}")
 
+LABELS = ["negative", "neutral", "positive"]
+WEIGHTS = {"negative": -1, "neutral": 0, "positive": 1}
 
-def sentiment_score_batch(texts):
+_BATCH_STATS = {"texts": 0, "batches": 0, "real_tokens": 0, "padded_tokens": 0}
+_BATCH_STATS_LOCK = threading.Lock()
+
+
+def load_tokenizer():
+    """Load the transformers tokenizer once (thread-safe)."""
+    global tokenizer
+    if tokenizer is not None:
+        return tokenizer
+    with _MODEL_LOCK:
+        if tokenizer is None:
+            from transformers import AutoTokenizer
+
+            tokenizer = AutoTokenizer.from_pretrained(
+                MODEL_ID, revision=SENTIMENT_MODEL_REVISION, use_auth_token=hf_token
+            )
+    return tokenizer
+
+
+def load_model():
+    """Load tokenizer and model once (thread-safe); returns (tokenizer, model, device)."""
+    global model, device
+    if model is not None:
+        return tokenizer, model, device
+    load_tokenizer()
+    with _MODEL_LOCK:
+        if model is None:
+            import torch
+            from transformers import AutoModelForSequenceClassification
+
+            logging.info("Loading FinBERT model from Hugging Face: %s", MODEL_ID)
+            loaded_model = AutoModelForSequenceClassification.from_pretrained(
+                MODEL_ID, revision=SENTIMENT_MODEL_REVISION, use_auth_token=hf_token
+            )
+            loaded_model.eval()
+            if INFERENCE_THREADS > 0:
+                torch.set_num_threads(INFERENCE_THREADS)
+            device = "cuda" if torch.cuda.is_available() else "cpu"
+            loaded_model.to(device)
+            model = loaded_model
+            logging.info("FinBERT model loaded successfully on %s (%s threads)", device.upper(), torch.get_num_threads())
+    return tokenizer, model, device
+
+
+def _stored_model_version():
+    try:
+        with open(SENTIMENT_MODEL_VERSION_PATH) as f:
+            stored = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if stored.get("model") == MODEL_ID and stored.get("revision") == SENTIMENT_MODEL_REVISION:
+        return stored.get("sha")
+    return None
+
+
+def _store_model_version(sha):
+    try:
+        os.makedirs(os.path.dirname(SENTIMENT_MODEL_VERSION_PATH) or ".", exist_ok=True)
+        tmp_path = SENTIMENT_MODEL_VERSION_PATH + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"model": MODEL_ID, "revision": SENTIMENT_MODEL_REVISION, "sha": sha}, f)
+        os.replace(tmp_path, SENTIMENT_MODEL_VERSION_PATH)
+    except OSError as e:
+        logging.warning("Could not persist model commit to %s: %s", SENTIMENT_MODEL_VERSION_PATH, e)
+
+
+def get_model_version():
+    """
+    Commit SHA of the weights in use (MODEL_ID at SENTIMENT_MODEL_REVISION),
+    resolved without loading the model, or None if it cannot be known. A
+    pinned SHA is used as is; a branch or tag is looked up on the Hub once
+    per process and persisted, so an offline run reuses the last SHA
+    instead of reporting a different version.
+    """
+    global _MODEL_VERSION, _MODEL_VERSION_RESOLVED
+    if _MODEL_VERSION_RESOLVED:
+        return _MODEL_VERSION
+    with _MODEL_LOCK:
+        if _MODEL_VERSION_RESOLVED:
+            return _MODEL_VERSION
+        if _COMMIT_SHA.fullmatch(SENTIMENT_MODEL_REVISION):
+            version = SENTIMENT_MODEL_REVISION
+        else:
+            version = None
+            try:
+                from huggingface_hub import model_info
+                version = model_info(MODEL_ID, revision=SENTIMENT_MODEL_REVISION, token=hf_token).sha
+            except Exception as e:
+                logging.warning("Could not resolve model commit for %s@%s: %s", MODEL_ID, SENTIMENT_MODEL_REVISION, e)
+            if version:
+                _store_model_version(version)
+            else:
+                version = _stored_model_version()
+                if version:
+                    logging.info("Using last resolved model commit %s", version)
+        _MODEL_VERSION, _MODEL_VERSION_RESOLVED = version, True
+    return _MODEL_VERSION
+
+
+def onnx_revision():
+    # the revision name only when no commit was ever resolved (first run offline)
+    return get_model_version() or SENTIMENT_MODEL_REVISION
+
+
+def is_model_loaded():
+    return model is not None
+
+
+def warmup_model(backend=None):
+    """Explicitly load what the backend needs (model or ONNX session) and run one dummy inference."""
+    sentiment_score_batch(["FinBERT warm-up."], backend=backend)
+    logging.info("FinBERT warm-up complete")
+
+
+def _token_buckets(order, lengths, token_budget):
+    """Split length-sorted indices into batches whose padded size fits the budget."""
+    bucket = []
+    for i in order:
+        # lengths are ascending, so the newest text sets the padded width
+        if bucket and (len(bucket) + 1) * lengths[i] > token_budget:
+            yield bucket
+            bucket = []
+        bucket.append(i)
+    if bucket:
+        yield bucket
+
+
+def _record_batch(n_texts, real_tokens, padded_tokens):
+    waste = 1 - real_tokens / padded_tokens if padded_tokens else 0
+    logging.debug("Sentiment batch: %s texts, %s tokens, padding waste %.1f%%", n_texts, padded_tokens, waste * 100)
+    with _BATCH_STATS_LOCK:
+        _BATCH_STATS["texts"] += n_texts
+        _BATCH_STATS["batches"] += 1
+        _BATCH_STATS["real_tokens"] += real_tokens
+        _BATCH_STATS["padded_tokens"] += padded_tokens
+
+
+def get_batching_stats():
+    """Cumulative token/padding counters, for tuning SENTIMENT_TOKEN_BUDGET."""
+    with _BATCH_STATS_LOCK:
+        stats = dict(_BATCH_STATS)
+    padded = stats["padded_tokens"]
+    stats["padding_waste"] = round(1 - stats["real_tokens"] / padded, 4) if padded else 0
+    stats["token_budget"] = SENTIMENT_TOKEN_BUDGET
+    return stats
+
+
+def resolve_backend(backend=None):
+    """Pick the inference backend, falling back to torch if ONNX Runtime is unavailable."""
+    from src.utils.onnx_utils import ONNX_BACKENDS
+
+    backend = backend or SENTIMENT_BACKEND
+    if backend in ("torch", "stub"):
+        return backend
+    if backend not in ONNX_BACKENDS:
+        raise ValueError(f"Unknown sentiment backend: {backend}")
+    try:
+        import onnxruntime  # noqa: F401
+    except ImportError:
+        logging.warning("onnxruntime not installed; '%s' backend falling back to torch", backend)
+        return "torch"
+    return backend
+
+
+def _predict_probs(tokenizer, features, backend):
+    """Pad one bucket and return class probabilities as a numpy array."""
+    if backend == "torch":
+        import torch
+        import torch.nn.functional as F
+
+        inputs = tokenizer.pad(features, return_tensors="pt").to(device)
+        with torch.no_grad():
+            outputs = model(**inputs)
+            probs = F.softmax(outputs.logits, dim=-1).cpu().numpy()
+        return probs, inputs["input_ids"].numel()
+
+    import numpy as np
+    from src.utils.onnx_utils import get_onnx_session, onnx_logits
+
+    session = get_onnx_session(MODEL_ID, onnx_revision(), load_model, quantize=backend == "onnx-int8")
+    inputs = tokenizer.pad(features, return_tensors="np")
+    logits = onnx_logits(session, inputs)
+    exp = np.exp(logits - logits.max(axis=-1, keepdims=True))
+    return exp / exp.sum(axis=-1, keepdims=True), inputs["input_ids"].size
+
+
+def _backend_tokenizer(backend):
+    """The torch backend loads the model; ONNX ones only a tokenizer (torch is just needed to export)."""
+    if backend == "torch":
+        return load_model()[0]
+    from src.utils.onnx_utils import get_onnx_tokenizer
+
+    return get_onnx_tokenizer(MODEL_ID, onnx_revision(), load_model, SENTIMENT_MAX_LENGTH) or load_tokenizer()
+
+
+def _stub_score(text):
+    """Deterministic stand-in for FinBERT (the "stub" backend): no model, no network."""
+    digest = hashlib.sha256(text.encode("utf-8")).digest()
+    label = LABELS[digest[0] % len(LABELS)]
+    return label, round(WEIGHTS[label] * (0.5 + digest[1] / 510), 4)
+
+
+def sentiment_score_batch(texts, token_budget=SENTIMENT_TOKEN_BUDGET, backend=None):
+    """
+    Scores texts in length-sorted buckets capped by a total-token budget,
+    so short headlines are never padded out to the longest article.
+    Results are returned in the original order.
+    """
     if not texts:
         return []
-    inputs = tokenizer(texts, return_tensors="pt", truncation=True, padding=True, max_length=256).to(device)
-    with torch.no_grad():
-        outputs = model(**inputs)
-        probs = F.softmax(outputs.logits, dim=-1).cpu().numpy()
-    labels = ["negative", "neutral", "positive"]
-    weights = {"negative": -1, "neutral": 0, "positive": 1}
-    results = []
-    for prob in probs:
-        sentiment = labels[int(prob.argmax())]
-        score = float(sum(prob[i] * weights[labels[i]] for i in range(len(prob))))
-        results.append((sentiment, score))
+    backend = resolve_backend(backend)
+    if backend == "stub":
+        return [_stub_score(text) for text in texts]
+    tokenizer = _backend_tokenizer(backend)
+    with span("inference.tokenize"):
+        encodings = tokenizer(texts, truncation=True, max_length=SENTIMENT_MAX_LENGTH)
+    lengths = [len(ids) for ids in encodings["input_ids"]]
+    order = sorted(range(len(texts)), key=lengths.__getitem__)
+
+    results = [None] * len(texts)
+    for bucket in _token_buckets(order, lengths, token_budget):
+        features = [{key: encodings[key][i] for key in encodings.keys()} for i in bucket]
+        with span(f"inference.{backend}"):
+            probs, padded_tokens = _predict_probs(tokenizer, features, backend)
+        _record_batch(len(bucket), sum(lengths[i] for i in bucket), padded_tokens)
+
+        for i, prob in zip(bucket, probs):
+            sentiment = LABELS[int(prob.argmax())]
+            score = float(sum(prob[j] * WEIGHTS[LABELS[j]] for j in range(len(prob))))
+            results[i] = (sentiment, score)
     return results
+
+
+def compare_backends(texts, backend="onnx-int8", reference="torch"):
+    """
+    Parity check between two backends on the same texts: label agreement
+    and absolute drift of the weighted sentiment score.
+    """
+    if not texts:
+        return {}
+    expected = sentiment_score_batch(texts, backend=reference)
+    actual = sentiment_score_batch(texts, backend=backend)
+    drift = [abs(a[1] - e[1]) for a, e in zip(actual, expected)]
+    report = {
+        "reference": reference,
+        "backend": resolve_backend(backend),
+        "texts": len(texts),
+        "label_agreement": round(sum(a[0] == e[0] for a, e in zip(actual, expected)) / len(texts), 4),
+        "mean_score_drift": round(sum(drift) / len(drift), 6),
+        "max_score_drift": round(max(drift), 6),
+    }
+    logging.info("Backend parity: %s", report)
+    return report
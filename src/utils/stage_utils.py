@@ -0,0 +1,137 @@
+# src/utils/stage_utils.py
+# Minimal streaming stage graph: a linear chain of stages, each with its own
+# worker threads, connected by bounded queues (a full queue blocks the
+# upstream stage, which is the backpressure). Every stage records
+# throughput and queue-depth stats for the run summary.
+import queue
+import threading
+import time
+from src.logger import logging
+
+_DONE = object()
+
+
+def latency_percentiles(sorted_sec):
+    """p50/p90/p99/max in milliseconds from an ascending list of durations in seconds."""
+    if not sorted_sec:
+        return {}
+
+    def pick(q):
+        return round(sorted_sec[min(len(sorted_sec) - 1, int(q * len(sorted_sec)))] * 1000, 2)
+
+    return {"p50": pick(0.5), "p90": pick(0.9), "p99": pick(0.99), "max": round(sorted_sec[-1] * 1000, 2)}
+
+
+class Stage:
+    """
+    One step of the graph. `func(item)` returns an iterable of items for the
+    next stage (empty to drop the item); exceptions go to the graph's `on_error`.
+    A generator streams: each item moves on as soon as it is yielded, and the
+    stage pauses while the next queue is full.
+    """
+
+    def __init__(self, name, func, workers=1, queue_size=32):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.queue = queue.Queue(maxsize=max(1, queue_size))
+        self._lock = threading.Lock()
+        self._depth_samples = 0
+        self._depth_total = 0
+        self._latencies = []
+        self.stats = {
+            "workers": self.workers,
+            "items_in": 0,
+            "items_out": 0,
+            "errors": 0,
+            "busy_sec": 0.0,
+            "max_queue_depth": 0,
+        }
+
+    def put(self, item):
+        self.queue.put(item)
+        depth = self.queue.qsize()
+        with self._lock:
+            self._depth_samples += 1
+            self._depth_total += depth
+            if depth > self.stats["max_queue_depth"]:
+                self.stats["max_queue_depth"] = depth
+
+    def report(self, wall_sec):
+        with self._lock:
+            stats = dict(self.stats)
+            samples, total = self._depth_samples, self._depth_total
+            latencies = sorted(self._latencies)
+        stats["busy_sec"] = round(stats["busy_sec"], 3)
+        stats["avg_queue_depth"] = round(total / samples, 2) if samples else 0
+        stats["items_per_sec"] = round(stats["items_in"] / wall_sec, 2) if wall_sec else 0
+        stats["utilization"] = round(stats["busy_sec"] / (wall_sec * self.workers), 3) if wall_sec else 0
+        stats["latency_ms"] = latency_percentiles(latencies)
+        return stats
+
+
+class StageGraph:
+    """Runs items through `stages` in order; returns a per-stage report."""
+
+    def __init__(self, stages, on_error=None):
+        self.stages = stages
+        self.on_error = on_error
+
+    def _worker(self, index):
+        stage = self.stages[index]
+        downstream = self.stages[index + 1] if index + 1 < len(self.stages) else None
+        while True:
+            item = stage.queue.get()
+            if item is _DONE:
+                return
+            start = time.perf_counter()
+            produced, blocked = 0, 0.0
+            try:
+                for output in stage.func(item) or ():
+                    produced += 1
+                    if downstream is not None:
+                        put_start = time.perf_counter()
+                        downstream.put(output)
+                        blocked += time.perf_counter() - put_start
+            except Exception as e:
+                with stage._lock:
+                    stage.stats["errors"] += 1
+                if self.on_error:
+                    self.on_error(stage.name, item, e)
+                else:
+                    logging.error("Stage '%s' failed: %s", stage.name, e)
+            # time spent waiting on a full downstream queue is backpressure, not work
+            elapsed = time.perf_counter() - start - blocked
+            with stage._lock:
+                stage.stats["items_in"] += 1
+                stage.stats["items_out"] += produced
+                stage.stats["busy_sec"] += elapsed
+                stage._latencies.append(elapsed)
+
+    def run(self, items):
+        start = time.perf_counter()
+        threads = []
+        for index, stage in enumerate(self.stages):
+            stage_threads = [
+                threading.Thread(target=self._worker, args=(index,), name=f"stage-{stage.name}-{n}", daemon=True)
+                for n in range(stage.workers)
+            ]
+            for thread in stage_threads:
+                thread.start()
+            threads.append(stage_threads)
+
+        for item in items:
+            self.stages[0].put(item)
+
+        # drain stage by stage: once a stage's workers exit, nothing more reaches the next one
+        for stage, stage_threads in zip(self.stages, threads):
+            for _ in stage_threads:
+                stage.queue.put(_DONE)
+            for thread in stage_threads:
+                thread.join()
+
+        wall_sec = time.perf_counter() - start
+        report = {stage.name: stage.report(wall_sec) for stage in self.stages}
+        logging.info("Stage graph finished in %.2fs: %s", wall_sec,
+                     ", ".join(f"{name}={r['items_in']}" for name, r in report.items()))
+        return report
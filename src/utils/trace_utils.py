@@ -0,0 +1,174 @@
+# src/utils/trace_utils.py
+# Lightweight span timing. `span(name)` feeds a per-name histogram (and,
+# optionally, a per-startup timings dict); with TRACING_ENABLED off it hands
+# back a shared no-op context, so instrumented code pays one function call.
+# Histograms go into the run summary and, if METRICS_TEXTFILE_PATH is set,
+# into a Prometheus textfile for the node exporter's textfile collector.
+import os
+import threading
+import time
+from src.constants import TRACING_ENABLED
+from src.logger import logging
+
+# Upper bounds in seconds; wide enough for a single SELECT up to a 30-page fetch
+SPAN_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+METRIC_PREFIX = "startup_news"
+
+
+class Histogram:
+    def __init__(self, buckets=SPAN_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        i = 0
+        while i < len(self.buckets) and value > self.buckets[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th observation (max for the +Inf bucket)."""
+        if not self.count:
+            return 0.0
+        rank, seen = q * self.count, 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "total_sec": round(self.total, 4),
+            "mean_ms": round(self.total / self.count * 1000, 2) if self.count else 0,
+            "p50_ms": round(self.quantile(0.5) * 1000, 2),
+            "p90_ms": round(self.quantile(0.9) * 1000, 2),
+            "p99_ms": round(self.quantile(0.99) * 1000, 2),
+            "max_ms": round(self.max * 1000, 2),
+        }
+
+
+_HISTOGRAMS = {}
+_TRACE_LOCK = threading.Lock()
+
+
+def _observe(name, elapsed):
+    with _TRACE_LOCK:
+        histogram = _HISTOGRAMS.get(name)
+        if histogram is None:
+            histogram = _HISTOGRAMS[name] = Histogram()
+        histogram.observe(elapsed)
+
+
+class _Span:
+    __slots__ = ("name", "timings", "start")
+
+    def __init__(self, name, timings):
+        self.name = name
+        self.timings = timings
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        _observe(self.name, elapsed)
+        if self.timings is not None:
+            self.timings[self.name] = self.timings.get(self.name, 0.0) + elapsed
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def span(name, timings=None):
+    """Time a block under `name`; `timings` (a dict) also accumulates seconds per name."""
+    if not TRACING_ENABLED:
+        return _NOOP_SPAN
+    return _Span(name, timings)
+
+
+def reset_traces():
+    with _TRACE_LOCK:
+        _HISTOGRAMS.clear()
+
+
+def get_trace_stats():
+    with _TRACE_LOCK:
+        return {name: histogram.snapshot() for name, histogram in sorted(_HISTOGRAMS.items())}
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def write_metrics_textfile(path, summary):
+    """
+    Dump span histograms and headline run numbers in Prometheus text format.
+    Written to a temp file and renamed so the collector never reads a partial file.
+    """
+    lines = [
+        f"# HELP {METRIC_PREFIX}_span_seconds Time spent per pipeline span in the last run.",
+        f"# TYPE {METRIC_PREFIX}_span_seconds histogram",
+    ]
+    with _TRACE_LOCK:
+        histograms = sorted(_HISTOGRAMS.items())
+    for name, histogram in histograms:
+        cumulative = 0
+        for bound, n in zip(histogram.buckets, histogram.counts):
+            cumulative += n
+            lines.append(f'{METRIC_PREFIX}_span_seconds_bucket{{span="{_label(name)}",le="{bound}"}} {cumulative}')
+        lines.append(f'{METRIC_PREFIX}_span_seconds_bucket{{span="{_label(name)}",le="+Inf"}} {histogram.count}')
+        lines.append(f'{METRIC_PREFIX}_span_seconds_sum{{span="{_label(name)}"}} {histogram.total:.6f}')
+        lines.append(f'{METRIC_PREFIX}_span_seconds_count{{span="{_label(name)}"}} {histogram.count}')
+
+    results = summary.get("results", [])
+    statuses = {}
+    for result in results:
+        statuses[result["status"]] = statuses.get(result["status"], 0) + 1
+    lines += [
+        f"# HELP {METRIC_PREFIX}_last_run_timestamp_seconds Unix time the last pipeline run finished.",
+        f"# TYPE {METRIC_PREFIX}_last_run_timestamp_seconds gauge",
+        f"{METRIC_PREFIX}_last_run_timestamp_seconds {time.time():.0f}",
+        f"# HELP {METRIC_PREFIX}_last_run_duration_seconds Wall time of the last pipeline run.",
+        f"# TYPE {METRIC_PREFIX}_last_run_duration_seconds gauge",
+        f"{METRIC_PREFIX}_last_run_duration_seconds {summary.get('total_time_sec', 0)}",
+        f"# HELP {METRIC_PREFIX}_last_run_startups Startups processed in the last run by status.",
+        f"# TYPE {METRIC_PREFIX}_last_run_startups gauge",
+    ]
+    lines += [f'{METRIC_PREFIX}_last_run_startups{{status="{_label(s)}"}} {n}' for s, n in sorted(statuses.items())]
+    writer = summary.get("article_writer", {})
+    lines += [
+        f"# HELP {METRIC_PREFIX}_last_run_articles_inserted Articles inserted by the last run.",
+        f"# TYPE {METRIC_PREFIX}_last_run_articles_inserted gauge",
+        f"{METRIC_PREFIX}_last_run_articles_inserted {writer.get('rows_inserted', 0)}",
+        f"# HELP {METRIC_PREFIX}_last_run_newsapi_requests NewsAPI requests made by the last run.",
+        f"# TYPE {METRIC_PREFIX}_last_run_newsapi_requests gauge",
+        f"{METRIC_PREFIX}_last_run_newsapi_requests {summary.get('newsapi', {}).get('requests', 0)}",
+    ]
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp_path, path)
+    logging.info("Metrics written to %s", path)
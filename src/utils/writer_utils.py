@@ -0,0 +1,228 @@
+# src/utils/writer_utils.py
+# Buffered bulk writer for the Articles table. Rows from every startup are
+# collected and flushed with COPY into a session temp table followed by a
+# single INSERT ... SELECT ... ON CONFLICT DO NOTHING, so DB-side dedup is
+# authoritative even when two workers race on the same URL.
+import atexit
+import io
+import threading
+import time
+from src.constants import WRITER_FLUSH_ROWS, WRITER_FLUSH_SECONDS
+from src.logger import logging
+from src.utils.db_utils import run_with_connection
+from src.utils.rollup_utils import ROLLUP_DELTA_SQL, rollup_table_exists
+from src.utils.trace_utils import span
+
+ARTICLE_COLUMNS = ("id", "content", "publishedAt", "sentiment", "sentimentScore", "startupId", "title", "url",
+                   "relevanceWeight")
+# added by migration 007; left out (and off every row) until it exists
+RELEVANCE_COLUMN = "relevanceWeight"
+
+
+def _copy_value(value):
+    """Encode one value for COPY's text format (None -> \\N)."""
+    if value is None:
+        return "\\N"
+    return (str(value).replace("\\", "\\\\").replace("\t", "\\t")
+            .replace("\n", "\\n").replace("\r", "\\r"))
+
+
+def articles_column_exists(conn, column):
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT EXISTS (SELECT 1 FROM pg_attribute
+                           WHERE attrelid = to_regclass('"Articles"') AND attname = %s AND NOT attisdropped)
+        """, (column,))
+        return cur.fetchone()[0]
+
+
+def copy_buffer(rows):
+    """Tab-separated COPY text-format buffer for a list of row tuples."""
+    buf = io.StringIO()
+    for row in rows:
+        buf.write("\t".join(_copy_value(v) for v in row))
+        buf.write("\n")
+    buf.seek(0)
+    return buf
+
+
+class ArticleWriter:
+    """Thread-safe buffer of Articles rows with size and time flush thresholds."""
+
+    def __init__(self, max_rows=WRITER_FLUSH_ROWS, max_delay=WRITER_FLUSH_SECONDS):
+        self.max_rows = max(1, max_rows)
+        self.max_delay = max_delay
+        self._rows = []
+        self._callbacks = []
+        self._oldest = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._timer = None
+        if max_delay > 0:
+            # max_delay <= 0: no timer, rows are flushed by size and on close only
+            self._timer = threading.Thread(target=self._flush_on_timer, name="article-writer", daemon=True)
+            self._timer.start()
+        self._rollups = None  # resolved on first write: is the rollup table migrated?
+        self._columns = None  # resolved on first write: ARTICLE_COLUMNS the table has
+        self.stats = {"rows_queued": 0, "rows_inserted": 0, "rows_skipped": 0, "rows_failed": 0, "flushes": 0}
+
+    def add(self, rows, on_flush=None, on_failed=None):
+        """
+        Queue rows (tuples in ARTICLE_COLUMNS order); flushes when the buffer is full,
+        or right away once the writer is closing. `on_flush()` is called once the
+        flush containing these rows has committed, `on_failed(error)` if that flush
+        failed and the rows were dropped.
+        """
+        if not rows:
+            return
+        with self._lock:
+            if not self._rows:
+                self._oldest = time.monotonic()
+            self._rows.extend(rows)
+            if on_flush or on_failed:
+                self._callbacks.append((on_flush, on_failed))
+            self.stats["rows_queued"] += len(rows)
+            full = len(self._rows) >= self.max_rows or self._stop.is_set()
+        if full:
+            self.flush()
+
+    def flush(self):
+        """Write everything buffered so far; returns the number of rows inserted."""
+        with self._flush_lock:
+            with self._lock:
+                rows, self._rows, self._oldest = self._rows, [], None
+                callbacks, self._callbacks = self._callbacks, []
+            if not rows:
+                return 0
+            error = None
+            try:
+                inserted = run_with_connection(lambda conn: self._write(conn, rows))
+            except Exception as e:
+                logging.error("❌ Bulk insert of %s articles failed: %s", len(rows), e)
+                error, inserted = e, 0
+                with self._lock:
+                    self.stats["rows_failed"] += len(rows)
+            else:
+                with self._lock:
+                    self.stats["flushes"] += 1
+                    self.stats["rows_inserted"] += inserted
+                    self.stats["rows_skipped"] += len(rows) - inserted
+                logging.info("✅ Flushed %s articles: %s inserted, %s already stored",
+                             len(rows), inserted, len(rows) - inserted)
+        # outside the flush lock: a callback may queue (and flush) the next rows
+        if error is not None:
+            # the rows are gone: their startups must not be recorded as stored
+            self._run_callbacks([on_failed for _, on_failed in callbacks], error)
+        else:
+            self._run_callbacks([on_flush for on_flush, _ in callbacks])
+        return inserted
+
+    @staticmethod
+    def _run_callbacks(callbacks, *args):
+        for callback in callbacks:
+            if callback is None:
+                continue
+            try:
+                callback(*args)
+            except Exception as e:
+                logging.warning("Flush callback failed: %s", e)
+
+    def _write(self, conn, rows):
+        if self._columns is None:
+            self._columns = ARTICLE_COLUMNS
+            if not articles_column_exists(conn, RELEVANCE_COLUMN):
+                logging.warning("Articles.%s missing; run migrations to store relevance weights", RELEVANCE_COLUMN)
+                self._columns = ARTICLE_COLUMNS[:-1]
+        if len(self._columns) < len(ARTICLE_COLUMNS):
+            rows = [row[:len(self._columns)] for row in rows]
+        column_list = ", ".join(f'"{c}"' for c in self._columns)
+        with span("db.write"), conn.cursor() as cur:
+            cur.execute("""
+                CREATE TEMP TABLE IF NOT EXISTS articles_staging
+                (LIKE "Articles" INCLUDING DEFAULTS) ON COMMIT DELETE ROWS
+            """)
+            cur.copy_expert(f"COPY articles_staging ({column_list}) FROM STDIN", copy_buffer(rows))
+            # NOT EXISTS keeps this correct before the unique url index exists;
+            # ON CONFLICT resolves races with concurrent writers once it does.
+            insert_sql = f"""
+                INSERT INTO "Articles" ({column_list})
+                SELECT DISTINCT ON (s.url) {", ".join(f's."{c}"' for c in self._columns)}
+                FROM articles_staging s
+                WHERE NOT EXISTS (SELECT 1 FROM "Articles" a WHERE a.url = s.url)
+                ORDER BY s.url
+                ON CONFLICT DO NOTHING
+            """
+            if self._rollups is None:
+                self._rollups = rollup_table_exists(conn)
+                if not self._rollups:
+                    logging.warning("StartupSentimentDaily missing; run migrations to maintain sentiment rollups")
+            if self._rollups:
+                # daily rollup deltas for exactly the rows inserted, in the same statement
+                cur.execute(f"""
+                    WITH inserted AS (
+                        {insert_sql}
+                        RETURNING "startupId", "publishedAt", sentiment, "sentimentScore"
+                    ), rolled AS (
+                        {ROLLUP_DELTA_SQL}
+                    )
+                    SELECT COUNT(*) FROM inserted
+                """)
+                inserted = cur.fetchone()[0]
+            else:
+                cur.execute(insert_sql)
+                inserted = cur.rowcount
+        conn.commit()
+        return inserted
+
+    def _flush_on_timer(self):
+        while not self._stop.wait(min(1.0, self.max_delay)):
+            with self._lock:
+                due = self._oldest is not None and time.monotonic() - self._oldest >= self.max_delay
+            if due:
+                self.flush()
+
+    def close(self):
+        """Stop the timer and flush until nothing is buffered; returns the stats."""
+        self._stop.set()
+        if self._timer is not None:
+            # a timer flush in progress finishes first, callbacks included
+            self._timer.join()
+        while True:
+            self.flush()
+            # flush callbacks may have queued more rows
+            with self._lock:
+                if not self._rows:
+                    return dict(self.stats)
+
+
+_WRITER = None
+_WRITER_LOCK = threading.Lock()
+
+
+def get_article_writer():
+    """Return the process-wide writer, creating it on first use."""
+    global _WRITER
+    with _WRITER_LOCK:
+        if _WRITER is None:
+            _WRITER = ArticleWriter()
+        return _WRITER
+
+
+def close_article_writer():
+    """Flush and stop the shared writer; returns its stats for the run summary."""
+    global _WRITER
+    with _WRITER_LOCK:
+        writer = _WRITER
+    if writer is None:
+        return {}
+    # stays the shared writer while it drains: flush callbacks that queue more
+    # rows through get_article_writer() must reach this writer, not a new one
+    stats = writer.close()
+    with _WRITER_LOCK:
+        if _WRITER is writer:
+            _WRITER = None
+    return stats
+
+
+atexit.register(close_article_writer)
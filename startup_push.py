@@ -1,32 +1,15 @@
-import json
-from src.database import db_connection
-
-# Get connection and cursor
-conn = db_connection()
-cur = conn.cursor()
-
-with open("startups_id.json", "r") as f:
-    data = json.load(f)
-
-
-stp = [(
-    startup.get("id"),
-    startup.get("description"),
-    startup.get("keywords"),
-    startup.get("name"),
-    startup.get("sector")) for startup in data]
-
-cur.executemany("""
-    INSERT INTO "Startups" (id, description, "findingKeywords", name, sector)
-    VALUES (%s, %s, %s, %s, %s)
-""",stp )
-
-
-# Save changes
-conn.commit()
-
-# Close
-cur.close()
-conn.close()
-
-print("Startups inserted successfully!")
+import sys
+from src.utils import apply_migrations, load_catalog, close_pool
+
+# Upserts the startup catalog (JSON array or JSONL); safe to re-run.
+#   python startup_push.py [startups_id.json]
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else "startups_id.json"
+    apply_migrations()
+    try:
+        stats = load_catalog(path)
+    finally:
+        close_pool()
+
+    print(f"Startups loaded: {stats['inserted']} inserted, {stats['updated']} updated, "
+          f"{stats['unchanged']} unchanged, {stats['skipped']} skipped")
@@ -0,0 +1,9 @@
+# tests/conftest.py
+# src.constants reads the environment at import time and newsapi_utils refuses
+# to import without a key, so give the tests a dummy one before anything loads.
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("NEWS_API", "test-key")
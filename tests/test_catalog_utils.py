@@ -0,0 +1,54 @@
+# tests/test_catalog_utils.py
+import json
+
+import pytest
+
+from src.utils import catalog_utils
+from src.utils.catalog_utils import catalog_row, content_hash, iter_catalog
+
+RECORDS = [
+    {"id": "1", "name": "CRED", "description": "Credit card payments, \"rewards\" and [brackets]",
+     "keywords": ["fintech", " credit card "], "sector": "Fintech"},
+    {"id": "2", "name": "Zepto", "description": None, "keywords": [], "sector": "Quick commerce"},
+    {"id": "3", "name": "Swiggy", "description": "Food delivery", "keywords": ["food"], "sector": None},
+]
+
+
+@pytest.mark.parametrize("chunk", [1, 7, 64 * 1024])
+def test_json_array_is_streamed_across_chunk_boundaries(tmp_path, monkeypatch, chunk):
+    monkeypatch.setattr(catalog_utils, "_READ_CHUNK", chunk)
+    path = tmp_path / "catalog.json"
+    path.write_text("\n  " + json.dumps(RECORDS, indent=2) + "\n", encoding="utf-8")
+    assert list(iter_catalog(path)) == RECORDS
+
+
+def test_jsonl_and_empty_files(tmp_path):
+    jsonl = tmp_path / "catalog.jsonl"
+    jsonl.write_text("\n".join(json.dumps(r) for r in RECORDS) + "\n\n", encoding="utf-8")
+    assert list(iter_catalog(jsonl)) == RECORDS
+    empty = tmp_path / "empty.json"
+    empty.write_text("  \n", encoding="utf-8")
+    assert list(iter_catalog(empty)) == []
+
+
+def test_non_array_json_is_rejected(tmp_path):
+    path = tmp_path / "catalog.json"
+    path.write_text('{"id": "1"}', encoding="utf-8")
+    with open(path, encoding="utf-8") as f, pytest.raises(ValueError):
+        list(catalog_utils._iter_json_array(f))
+
+
+def test_truncated_array_raises(tmp_path):
+    path = tmp_path / "catalog.json"
+    path.write_text(json.dumps(RECORDS)[:-20], encoding="utf-8")
+    with pytest.raises(ValueError):
+        list(iter_catalog(path))
+
+
+def test_catalog_row_normalizes_keywords_and_hashes_content():
+    row = catalog_row(RECORDS[0])
+    assert row[:3] == ("1", "CRED", RECORDS[0]["description"])
+    assert row[3] == '{"fintech","credit card"}'
+    assert row[5] == content_hash("CRED", RECORDS[0]["description"], ["fintech", "credit card"], "Fintech")
+    assert catalog_row({"id": "4", "name": "  "}) is None
+    assert catalog_row({"name": "No id"}) is None
@@ -0,0 +1,92 @@
+# tests/test_concurrency_utils.py
+import asyncio
+import threading
+
+from src.utils.concurrency_utils import _MIN_WINDOW, AimdLimit
+
+
+def fill(limit, outcome="ok", latency=0.01):
+    """One saturated window: take every slot, then release them all with `outcome`."""
+    calls = max(_MIN_WINDOW, limit.limit)
+    released = 0
+    while released < calls:
+        taken = 0
+        while limit.try_acquire():
+            taken += 1
+        for _ in range(taken):
+            limit.release(latency, outcome)
+        released += taken
+
+
+def test_starts_at_half_the_ceiling_within_bounds():
+    assert AimdLimit("t", 16).limit == 8
+    assert AimdLimit("t", 16, floor=10).limit == 10
+    assert AimdLimit("t", 16, adaptive=False).limit == 16
+
+
+def test_saturated_healthy_window_adds_one():
+    limit = AimdLimit("t", 16, initial=4)
+    fill(limit)
+    assert limit.limit == 5
+    assert limit.history[-1][1:] == [5, "increase"]
+
+
+def test_throttled_window_halves_down_to_the_floor():
+    limit = AimdLimit("t", 16, floor=3, initial=8)
+    fill(limit, outcome="throttled")
+    assert limit.limit == 4
+    fill(limit, outcome="throttled")
+    assert limit.limit == 3
+    assert limit.snapshot()["decreases"] == 2
+
+
+def test_latency_spike_only_counts_when_saturated():
+    limit = AimdLimit("t", 16, initial=8)
+    fill(limit, latency=0.01)
+    fill(limit, latency=0.5)
+    assert limit.history[-1][2] == "latency"
+
+
+def test_unsaturated_window_keeps_the_limit():
+    limit = AimdLimit("t", 16, initial=8)
+    for _ in range(_MIN_WINDOW * 2):
+        with limit.slot():
+            pass
+    assert limit.limit == 8
+
+
+def test_non_adaptive_limit_never_moves():
+    limit = AimdLimit("t", 4, adaptive=False)
+    fill(limit, outcome="throttled")
+    assert limit.limit == 4
+
+
+def test_blocked_acquire_resumes_on_release():
+    limit = AimdLimit("t", 1, adaptive=False)
+    limit.acquire()
+    acquired = threading.Event()
+    waiter = threading.Thread(target=lambda: (limit.acquire(), acquired.set()))
+    waiter.start()
+    assert not acquired.wait(0.05)
+    limit.release()
+    assert acquired.wait(1)
+    waiter.join()
+    assert limit.snapshot()["waits"] == 1
+
+
+def test_async_slot_waits_without_blocking_the_loop():
+    limit = AimdLimit("t", 1, adaptive=False)
+    order = []
+
+    async def job(name):
+        async with limit.slot():
+            order.append(f"{name}+")
+            await asyncio.sleep(0.01)
+            order.append(f"{name}-")
+
+    async def main():
+        await asyncio.gather(job("a"), job("b"))
+
+    asyncio.run(main())
+    assert order == ["a+", "a-", "b+", "b-"]
+    assert limit.in_flight == 0
@@ -0,0 +1,31 @@
+# tests/test_imports.py
+# Entry points that never score (main.py with nothing new, scheduler.py,
+# catalog syncs) must not pay for torch/transformers or the model at import.
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# seconds for `import src.pipeline` in a fresh interpreter (see "Running Tests" in the README)
+IMPORT_BUDGET_SEC = 1.0
+
+
+def import_pipeline(code):
+    # a fresh interpreter keeps other tests' imports out of the measurement
+    env = {**os.environ, "NEWS_API": os.environ.get("NEWS_API", "test-key")}
+    return subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True)
+
+
+def test_importing_the_pipeline_does_not_load_torch():
+    # torch is only needed once a FinBERT backend loads
+    result = import_pipeline(
+        "import sys, src.pipeline; sys.exit('torch' in sys.modules or 'transformers' in sys.modules)")
+    assert result.returncode == 0, result.stderr[-2000:]
+
+
+def test_importing_the_pipeline_stays_within_budget():
+    result = import_pipeline(
+        "import time; start = time.perf_counter(); import src.pipeline; print(time.perf_counter() - start)")
+    assert result.returncode == 0, result.stderr[-2000:]
+    elapsed = float(result.stdout.strip().splitlines()[-1])
+    assert elapsed < IMPORT_BUDGET_SEC, f"import src.pipeline took {elapsed:.2f}s"
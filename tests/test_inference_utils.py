@@ -0,0 +1,109 @@
+# tests/test_inference_utils.py
+import threading
+
+import pytest
+
+from src.utils import inference_utils
+from src.utils.inference_utils import InferenceScheduler
+
+
+class StubScorer:
+    """sentiment_score_batch stand-in: (text, len) per text; can hold its first batch until released."""
+
+    def __init__(self, hold_first=False, fail=False):
+        self.batches = []
+        self.fail = fail
+        self.started = threading.Event()
+        self.release = threading.Event()
+        if not hold_first:
+            self.release.set()
+
+    def __call__(self, texts):
+        self.batches.append(list(texts))
+        self.started.set()
+        self.release.wait(5)
+        if self.fail:
+            raise ValueError("model exploded")
+        return [(text, float(len(text))) for text in texts]
+
+
+@pytest.fixture
+def scorer(monkeypatch):
+    def install(**kwargs):
+        stub = StubScorer(**kwargs)
+        monkeypatch.setattr(inference_utils, "sentiment_score_batch", stub)
+        return stub
+    return install
+
+
+def test_queued_texts_coalesce_up_to_the_batch_size(scorer):
+    stub = scorer(hold_first=True)
+    scheduler = InferenceScheduler(batch_size=4, max_wait_ms=0)
+    first = scheduler.submit(["a"])
+    assert stub.started.wait(5)
+    # queued while the model is busy with the first batch
+    rest = scheduler.submit([f"t{i}" for i in range(10)])
+    stub.release.set()
+    assert [f.result(5) for f in first + rest] == [(t, float(len(t))) for t in ["a"] + [f"t{i}" for i in range(10)]]
+    scheduler.shutdown()
+    assert [len(b) for b in stub.batches] == [1, 4, 4, 2]
+    assert scheduler.get_stats()["full_batches"] == 2
+
+
+def test_a_partial_batch_is_flushed_after_max_wait(scorer):
+    stub = scorer()
+    scheduler = InferenceScheduler(batch_size=100, max_wait_ms=20)
+    futures = scheduler.submit(["a", "bb", "ccc"])
+    assert [f.result(5) for f in futures] == [("a", 1.0), ("bb", 2.0), ("ccc", 3.0)]
+    assert stub.batches == [["a", "bb", "ccc"]]
+    scheduler.shutdown()
+
+
+def test_results_go_back_to_the_callers_that_submitted_them(scorer):
+    scorer()
+    scheduler = InferenceScheduler(batch_size=8, max_wait_ms=5)
+    results = {}
+
+    def worker(n):
+        texts = [f"w{n}-{i}" * (i + 1) for i in range(5)]
+        results[n] = (texts, scheduler.score(texts))
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    scheduler.shutdown()
+    for texts, scored in results.values():
+        assert scored == [(text, float(len(text))) for text in texts]
+
+
+def test_a_failed_batch_fails_every_waiting_caller(scorer):
+    stub = scorer(hold_first=True, fail=True)
+    scheduler = InferenceScheduler(batch_size=8, max_wait_ms=50)
+    # two callers in the same batch window
+    first, second = scheduler.submit(["a", "b"]), scheduler.submit(["c"])
+    stub.release.set()
+    for future in first + second:
+        with pytest.raises(ValueError, match="model exploded"):
+            future.result(5)
+    with pytest.raises(ValueError):
+        scheduler.score(["d"])
+    scheduler.shutdown()
+
+
+def test_shutdown_drains_pending_work_then_refuses_more(scorer):
+    stub = scorer(hold_first=True)
+    scheduler = InferenceScheduler(batch_size=2, max_wait_ms=0)
+    first = scheduler.submit(["a"])
+    assert stub.started.wait(5)
+    pending = scheduler.submit(["b", "c", "d"])
+    stopper = threading.Thread(target=scheduler.shutdown)
+    stopper.start()
+    stub.release.set()
+    stopper.join(5)
+    assert not stopper.is_alive()
+    assert all(f.done() for f in first + pending)
+    assert [f.result() for f in pending] == [("b", 1.0), ("c", 1.0), ("d", 1.0)]
+    with pytest.raises(RuntimeError):
+        scheduler.submit(["e"])
@@ -0,0 +1,40 @@
+# tests/test_journal_utils.py
+import pytest
+
+from src.utils import journal_utils
+
+
+@pytest.fixture
+def journal(tmp_path, monkeypatch):
+    monkeypatch.setattr(journal_utils, "RUN_JOURNAL_PATH", str(tmp_path / "journal.sqlite3"))
+    monkeypatch.setattr(journal_utils, "_CONN", None)
+    monkeypatch.setattr(journal_utils, "_RUN_ID", None)
+    yield journal_utils
+    if journal_utils._CONN is not None:
+        journal_utils._CONN.close()
+
+
+def run(journal, startup_id, complete):
+    journal.start_journal_run()
+    journal.checkpoint_job({"startup_id": startup_id, "articles": []}, "fetch", "daily")
+    if complete:
+        journal.finish_journal_run()
+
+
+def test_fresh_run_prunes_completed_runs_only(journal):
+    run(journal, "done-before", complete=True)
+    run(journal, "interrupted", complete=False)
+    run(journal, "current", complete=False)
+
+    runs = journal._CONN.execute("SELECT finished IS NULL FROM runs ORDER BY id").fetchall()
+    assert runs == [(1,), (1,)]
+    resumed = journal.start_journal_run(resume=True)
+    assert set(resumed["checkpoints"]) == {"current"}
+
+
+def test_interrupted_runs_are_capped(journal):
+    for i in range(journal.KEEP_INTERRUPTED_RUNS + 2):
+        run(journal, f"startup-{i}", complete=False)
+    kept = journal._CONN.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+    # the cap applies before each new run is added
+    assert kept == journal.KEEP_INTERRUPTED_RUNS + 1
@@ -0,0 +1,81 @@
+# tests/test_key_utils.py
+import os
+import subprocess
+import sys
+import threading
+
+from src.utils.key_utils import ApiKeyManager
+
+
+class MemoryLedger:
+    """KeyUsageLedger stand-in: same reserve/release contract, kept in a dict."""
+
+    def __init__(self):
+        self.requests = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, kid, day, amount, quota):
+        with self._lock:
+            used = self.requests.get((kid, day), 0)
+            granted = max(0, min(amount, quota - used))
+            self.requests[(kid, day)] = used + granted
+            return granted, used + granted
+
+    def release(self, day, unused):
+        with self._lock:
+            for kid, n in unused.items():
+                self.requests[(kid, day)] -= n
+
+
+def manager(ledger, quota=7, block=3):
+    return ApiKeyManager(["key-a", "key-b"], state_path=None, daily_quota=quota, ledger=ledger, reserve_block=block)
+
+
+def drain(keys):
+    chosen = []
+    while (key := keys.choose()) is not None:
+        chosen.append(key)
+    return chosen
+
+
+def test_runners_sharing_a_ledger_stay_within_the_daily_quota():
+    ledger = MemoryLedger()
+    first, second = manager(ledger), manager(ledger)
+    used = drain(first) + drain(second)
+    assert len(used) == 2 * 7
+    assert sorted(ledger.requests.values()) == [7, 7]
+
+
+def test_close_hands_unused_reservations_back():
+    ledger = MemoryLedger()
+    keys = manager(ledger)
+    keys.choose()
+    keys.choose()
+    assert sum(ledger.requests.values()) > 2
+    keys.close()
+    assert sum(ledger.requests.values()) == 2
+
+
+def test_ledger_failure_falls_back_to_local_counting():
+    class BrokenLedger(MemoryLedger):
+        def reserve(self, *args):
+            raise RuntimeError("database unavailable")
+
+    keys = manager(BrokenLedger(), quota=2)
+    assert len(drain(keys)) == 4
+    assert keys.ledger is None
+
+
+def ledger_default(**env):
+    environ = {k: v for k, v in os.environ.items() if k not in ("PIPELINE_RUN_ID", "NEWS_API_KEY_LEDGER")}
+    result = subprocess.run(
+        [sys.executable, "-c", "from src.constants import NEWS_API_KEY_LEDGER; print(NEWS_API_KEY_LEDGER)"],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        env={**environ, **env}, capture_output=True, text=True)
+    return result.stdout.strip()
+
+
+def test_only_sharded_runs_default_to_the_postgres_ledger():
+    assert ledger_default() == "file"
+    assert ledger_default(PIPELINE_RUN_ID="nightly-42") == "postgres"
+    assert ledger_default(PIPELINE_RUN_ID="nightly-42", NEWS_API_KEY_LEDGER="file") == "file"
@@ -0,0 +1,33 @@
+# tests/test_lease_utils.py
+from src.utils.lease_utils import _merge, merge_summaries
+
+
+def test_counters_add_and_levels_take_the_max():
+    merged = _merge(
+        {"requests": 3, "busy_sec": 1.25, "latency_ms": {"p99": 80.0}, "limit": 4},
+        {"requests": 5, "busy_sec": 0.5, "latency_ms": {"p99": 120.0}, "limit": 2},
+    )
+    assert merged == {"requests": 8, "busy_sec": 1.75, "latency_ms": {"p99": 120.0}, "limit": 4}
+
+
+def test_lists_concatenate_and_one_sided_keys_survive():
+    merged = _merge({"results": [1], "only_a": "x"}, {"results": [2, 3], "only_b": True})
+    assert merged == {"results": [1, 2, 3], "only_a": "x", "only_b": True}
+
+
+def test_rates_are_recomputed_from_summed_counters():
+    merged = merge_summaries([
+        {"sentiment_cache": {"hits": 90, "misses": 10, "hit_rate": 0.9},
+         "inference": {"texts": 100, "batches": 10, "avg_batch_size": 10.0},
+         "traces": {"step.fetch": {"count": 1, "total_sec": 1.0, "mean_ms": 1000.0}}},
+        {"sentiment_cache": {"hits": 0, "misses": 100, "hit_rate": 0.0},
+         "inference": {"texts": 10, "batches": 10, "avg_batch_size": 1.0},
+         "traces": {"step.fetch": {"count": 3, "total_sec": 0.2, "mean_ms": 66.67}}},
+    ])
+    assert merged["sentiment_cache"]["hit_rate"] == 0.45
+    assert merged["inference"]["avg_batch_size"] == 5.5
+    assert merged["traces"]["step.fetch"]["mean_ms"] == 300.0
+
+
+def test_booleans_are_not_summed():
+    assert _merge({"adaptive": True}, {"adaptive": True}) == {"adaptive": True}
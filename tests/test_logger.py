@@ -0,0 +1,48 @@
+# tests/test_logger.py
+import logging
+import queue
+import sys
+import threading
+import time
+
+from src.logger import NonBlockingQueueHandler, get_log_stats
+
+
+def record(level, msg, *args, exc_info=None):
+    return logging.LogRecord("test", level, __file__, 1, msg, args, exc_info)
+
+
+def test_prepare_merges_message_args_and_traceback():
+    handler = NonBlockingQueueHandler(queue.Queue())
+    items = ["a"]
+    handler.handle(record(logging.INFO, "items: %s", items))
+    items.append("b")  # a later change must not reach the log line
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        handler.handle(record(logging.ERROR, "failed %s", "x", exc_info=sys.exc_info()))
+
+    first, second = handler.queue.get_nowait(), handler.queue.get_nowait()
+    assert (first.getMessage(), first.args) == ("items: ['a']", None)
+    assert second.getMessage().startswith("failed x\nTraceback")
+    assert "ValueError: boom" in second.getMessage()
+    assert second.exc_info is None
+
+
+def test_full_queue_drops_info_at_once_but_lets_warnings_wait():
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=1))
+    before = get_log_stats()
+    handler.handle(record(logging.INFO, "fills the queue"))
+
+    start = time.monotonic()
+    handler.handle(record(logging.INFO, "dropped"))
+    assert time.monotonic() - start < 0.1
+
+    # the listener frees a slot while the warning waits
+    threading.Timer(0.05, handler.queue.get_nowait).start()
+    handler.handle(record(logging.WARNING, "kept"))
+    assert handler.queue.get(timeout=1).getMessage() == "kept"
+
+    after = get_log_stats()
+    assert after["dropped_queue_full"] - before["dropped_queue_full"] == 1
+    assert after["warnings_waited"] - before["warnings_waited"] == 1
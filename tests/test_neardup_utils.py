@@ -0,0 +1,44 @@
+# tests/test_neardup_utils.py
+import pytest
+
+from src.utils.neardup_utils import canonicalize_url, simhash
+
+BODY = ("CRED has raised a fresh round of funding from existing investors as the credit card "
+        "payments company expands into lending and travel, according to people familiar with the matter.")
+
+
+@pytest.mark.parametrize("variant, canonical", [
+    ("https://www.example.com/news/cred-funding/", "https://example.com/news/cred-funding"),
+    ("http://example.com/news/cred-funding?utm_source=twitter&utm_medium=social",
+     "https://example.com/news/cred-funding"),
+    ("https://amp.example.com/news/cred-funding/amp", "https://example.com/news/cred-funding"),
+    ("https://m.example.com/news/cred-funding.amp.html?fbclid=abc", "https://example.com/news/cred-funding.html"),
+])
+def test_canonicalize_url_folds_tracking_amp_and_mirror_variants(variant, canonical):
+    assert canonicalize_url(variant) == canonical
+
+
+def test_canonicalize_url_keeps_meaningful_query_in_stable_order():
+    assert canonicalize_url("https://example.com/story?id=2&page=1&ref=home") == \
+        canonicalize_url("https://example.com/story?page=1&id=2")
+    assert canonicalize_url("https://example.com/story?id=2") != canonicalize_url("https://example.com/story?id=3")
+    assert canonicalize_url("") == ""
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+def test_simhash_is_stable_and_close_for_near_copies():
+    copy = BODY.replace("according to people familiar with the matter.", "sources said. [+1200 chars]")
+    other = ("Swiggy shares fell after the food delivery company reported a wider quarterly loss "
+             "as competition in quick commerce intensified across major Indian cities this year.")
+    assert simhash(BODY) == simhash(BODY.upper())
+    assert hamming(simhash(BODY), simhash(copy)) < hamming(simhash(BODY), simhash(other))
+    assert hamming(simhash(BODY), simhash(other)) > 6
+    assert 0 <= simhash(BODY) < 1 << 64
+
+
+def test_simhash_skips_short_texts():
+    assert simhash("CRED raises funding") is None
+    assert simhash("") is None
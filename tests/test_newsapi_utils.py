@@ -0,0 +1,50 @@
+# tests/test_newsapi_utils.py
+import asyncio
+
+import pytest
+
+from src.utils import newsapi_utils
+from src.utils.newsapi_utils import TokenBucket
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(newsapi_utils.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_token_bucket_bursts_to_capacity_then_refills_at_rate(clock):
+    bucket = TokenBucket(rate=2.0, capacity=3)
+    for _ in range(3):
+        assert bucket.wait_time() == 0.0
+        bucket.tokens -= 1
+    assert bucket.wait_time() == pytest.approx(0.5)
+    clock[0] += 0.25
+    assert bucket.wait_time() == pytest.approx(0.25)
+    clock[0] += 10
+    bucket.wait_time()
+    assert bucket.tokens == 3
+
+
+def test_token_bucket_capacity_is_at_least_one():
+    assert TokenBucket(rate=1.0, capacity=0.2).capacity == 1.0
+
+
+def test_token_bucket_acquire_waits_for_a_token(monkeypatch):
+    bucket = TokenBucket(rate=1000.0, capacity=1)
+    slept = []
+    real_sleep = asyncio.sleep
+
+    async def sleep(delay):
+        slept.append(delay)
+        await real_sleep(delay)
+
+    monkeypatch.setattr(newsapi_utils.asyncio, "sleep", sleep)
+
+    async def take(n):
+        for _ in range(n):
+            await bucket.acquire()
+
+    asyncio.run(take(3))
+    assert slept and all(0 < delay <= 0.001 for delay in slept)
@@ -0,0 +1,70 @@
+# tests/test_pipeline.py
+import pytest
+
+import src.pipeline as pipeline
+from src.pipeline import ChunkStream, RunTracker
+from src.utils import writer_utils
+from src.utils.writer_utils import ArticleWriter, close_article_writer
+
+
+class RecordingWriter(ArticleWriter):
+    """ArticleWriter whose flushes land in a list instead of Postgres."""
+
+    def __init__(self, *args, **kwargs):
+        self.batches = []
+        super().__init__(*args, **kwargs)
+
+    def _write(self, conn, rows):
+        self.batches.append(list(rows))
+        return len(rows)
+
+
+@pytest.fixture
+def finished(monkeypatch):
+    monkeypatch.setattr(writer_utils, "run_with_connection", lambda fn: fn(None))
+    calls = []
+    monkeypatch.setattr(pipeline, "finish_startup", lambda sid, phase, status="done": calls.append((sid, status)))
+    return calls
+
+
+def streamed(tracker, writer, chunk_order, chunks=3):
+    tracker.start(("s1", "Startup One", []), "missing")
+    stream = ChunkStream("s1", "missing", tracker, writer)
+    for chunk in chunk_order:
+        job = stream.job(chunk, "Startup One", [], 30, [], None)
+        job["sink"]([(chunk, n) for n in range(2)])
+        stream.settle(chunk)
+    stream.fetch_done(chunks)
+    return stream
+
+
+def test_chunks_reach_the_writer_oldest_first(finished):
+    writer = RecordingWriter(max_rows=1, max_delay=0)
+    tracker = RunTracker(writer)
+    stream = streamed(tracker, writer, [2, 1])
+    # chunk 0 has not left the graph yet: nothing may be written
+    assert writer.batches == []
+    assert tracker.results == []
+
+    stream._hold(0, [(0, 0), (0, 1)])
+    stream.settle(0)
+    assert [row for batch in writer.batches for row in batch] == [(c, n) for c in range(3) for n in range(2)]
+    assert finished == [("s1", "done")]
+    writer.close()
+
+
+def test_every_streamed_batch_lands_on_the_run_writer_when_it_closes(finished, monkeypatch):
+    writer = RecordingWriter(max_rows=100, max_delay=0)
+    monkeypatch.setattr(writer_utils, "_WRITER", writer)
+    tracker = RunTracker(writer)
+    streamed(tracker, writer, [0, 1, 2])
+    assert writer.batches == []
+
+    # the later batches are queued from flush callbacks while the writer drains
+    stats = close_article_writer()
+    stored = [row for batch in writer.batches for row in batch]
+    assert stored == [(chunk, n) for chunk in range(3) for n in range(2)]
+    assert stats["rows_inserted"] == 6
+    assert writer_utils._WRITER is None
+    assert [r["status"] for r in tracker.results] == ["success"]
+    assert finished == [("s1", "done")]
@@ -0,0 +1,66 @@
+# tests/test_pipeline_utils.py
+import pytest
+
+from src.utils import cache_utils
+from src.utils.pipeline_utils import PIPELINE_STEPS, dedup_step, new_job, relevance_step, write_step
+from src.utils.writer_utils import ARTICLE_COLUMNS
+from src.utils.query_utils import attribute_articles
+
+
+@pytest.fixture
+def no_stored_urls(monkeypatch):
+    monkeypatch.setattr(cache_utils, "fetch_existing_urls_among", lambda urls: set())
+    cache_utils.reset_url_cache()
+    yield
+    cache_utils.reset_url_cache()
+
+
+def run_until_dedup(job):
+    steps = PIPELINE_STEPS[1:PIPELINE_STEPS.index(dedup_step) + 1]
+    assert relevance_step in steps
+    for step in steps:
+        job = step(job)
+        if job is None:
+            return None
+    return job
+
+
+def test_relevance_runs_before_url_claims():
+    assert PIPELINE_STEPS.index(relevance_step) < PIPELINE_STEPS.index(dedup_step)
+
+
+def test_packed_startups_sharing_a_url_keep_it_for_the_named_startup(no_stored_urls):
+    article = {
+        "title": "CRED raises a new funding round",
+        "description": "CRED, the credit card payments app, raised funding from investors.",
+        "content": "The fintech market keeps growing as CRED expands into lending.",
+        "url": "https://news.example/cred-funding",
+        "publishedAt": "2026-10-01T10:00:00Z",
+    }
+    # "fintech" puts the article in both startups' packed results
+    startups = [("zepto", "Zepto", ["fintech"]), ("cred", "CRED", ["fintech"])]
+    routed = attribute_articles([article], startups)
+    assert routed == {"zepto": [article], "cred": [article]}
+
+    # the keyword-only startup gets there first and must not claim the URL
+    zepto = run_until_dedup(new_job("zepto", "Zepto", ["fintech"], 1, articles=routed["zepto"]))
+    cred = run_until_dedup(new_job("cred", "CRED", ["fintech"], 1, articles=routed["cred"]))
+
+    assert zepto is None
+    assert [a["url"] for a in cred["articles"]] == [article["url"]]
+
+
+def test_down_weighting_is_stored_apart_from_the_sentiment_score():
+    articles = [{"url": "https://news.example/a", "title": "A", "publishedAt": "2026-10-01T10:00:00Z"},
+                {"url": "https://news.example/b", "title": "B", "publishedAt": "2026-10-01T11:00:00Z",
+                 "relevance_weight": 0.5}]
+    job = new_job("cred", "CRED", [], 1, articles=articles)
+    job.update({"results": [("positive", 0.8), ("negative", -0.6)], "contents": ["text a", "text b"]})
+    queued = []
+    job["sink"] = lambda rows, on_flush=None, on_failed=None: queued.extend(rows)
+    write_step(job)
+
+    rows = [dict(zip(ARTICLE_COLUMNS, row)) for row in queued]
+    # FinBERT's score is stored as is, so the rollups stay comparable with older rows
+    assert [r["sentimentScore"] for r in rows] == [0.8, -0.6]
+    assert [r["relevanceWeight"] for r in rows] == [1.0, 0.5]
@@ -0,0 +1,110 @@
+# tests/test_query_utils.py
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from src.constants import NEWS_API_MAX_RESULTS
+from src.pipeline import RunTracker, plan_items
+from src.utils import query_utils
+from src.utils.newsapi_utils import PAGE_SIZE, NewsFetchEngine, TooManyResults, build_query
+from src.utils.query_utils import attribute_articles, fetch_pack_pages, plan_query_packs
+
+STARTUPS = [
+    ("1", "CRED", ["fintech", "credit card"]),
+    ("2", "PhonePe", ["fintech", "UPI"]),
+    ("3", "Zepto", ["quick commerce"]),
+]
+
+
+def test_packs_share_terms_once():
+    packs = plan_query_packs(STARTUPS, max_length=500, max_startups=8)
+    assert len(packs) == 1
+    assert packs[0]["startups"] == STARTUPS
+    assert packs[0]["query"].split(" OR ") == [
+        '"CRED"', '"fintech"', '"credit card"', '"PhonePe"', '"UPI"', '"Zepto"', '"quick commerce"',
+    ]
+
+
+def test_packs_respect_length_and_size_limits():
+    by_size = plan_query_packs(STARTUPS, max_length=500, max_startups=2)
+    assert [len(p["startups"]) for p in by_size] == [2, 1]
+    by_length = plan_query_packs(STARTUPS, max_length=60, max_startups=8)
+    assert all(len(p["query"]) <= 60 for p in by_length if len(p["startups"]) > 1)
+    assert [s for p in by_length for s in p["startups"]] == STARTUPS
+
+
+def test_lone_startup_keeps_its_original_query():
+    packs = plan_query_packs(STARTUPS[2:], max_length=500, max_startups=8)
+    assert packs[0]["query"] == build_query("Zepto", ["quick commerce"])
+
+
+def test_attribute_articles_routes_to_every_mentioned_startup():
+    both = {"title": "CRED and PhonePe in fintech push", "description": None, "content": ""}
+    cred = {"title": "Credit card rewards", "description": "CRED's new credit card", "content": ""}
+    none = {"title": "Markets close higher", "description": "Sensex gains", "content": ""}
+    routed = attribute_articles([both, cred, none], STARTUPS)
+    assert routed["1"] == [both, cred]
+    assert routed["2"] == [both]
+    assert routed["3"] == []
+
+
+def test_over_limit_pack_is_queried_per_startup(monkeypatch):
+    pack = {"query": "packed", "startups": STARTUPS[:2], "watermarks": {"1": "w1", "2": "w2"}}
+    calls = []
+
+    def packed_pages(query, days, label, since=None, require_complete=False):
+        calls.append(("pack", query, require_complete))
+        raise TooManyResults(NEWS_API_MAX_RESULTS + 50)
+        yield
+
+    def own_pages(name, helping_words, days, since=None):
+        calls.append(("own", name, since))
+        yield [{"title": f"{name} news"}]
+
+    monkeypatch.setattr(query_utils, "fetch_query_pages", packed_pages)
+    monkeypatch.setattr(query_utils, "fetch_article_pages", own_pages)
+    pages = list(fetch_pack_pages(pack, 1, since="w1"))
+
+    assert pages == [{"1": [{"title": "CRED news"}]}, {"2": [{"title": "PhonePe news"}]}]
+    assert calls == [("pack", "packed", True), ("own", "CRED", "w1"), ("own", "PhonePe", "w2")]
+
+
+class StubEngine:
+    """Serves page 1 of a query reporting `total` results."""
+
+    def __init__(self, total, published="2026-10-01T10:00:00Z"):
+        self.total = total
+        self.published = published
+        self.pages = []
+
+    async def _get_page(self, params, label):
+        self.pages.append(params["page"])
+        articles = [{"url": f"u{i}", "publishedAt": self.published} for i in range(PAGE_SIZE)]
+        return {"totalResults": self.total, "articles": articles}
+
+
+def collect(engine, **kwargs):
+    async def run():
+        pages = NewsFetchEngine.query_pages_async(engine, "q", "from", "to", "label", **kwargs)
+        return [page async for page in pages]
+    return asyncio.run(run())
+
+
+def test_query_past_the_result_limit_refuses_to_truncate_when_asked():
+    with pytest.raises(TooManyResults):
+        collect(StubEngine(NEWS_API_MAX_RESULTS + 1), require_complete=True)
+    # a query within the limit, or whose page 1 already reaches the watermark, is complete
+    assert collect(StubEngine(min(NEWS_API_MAX_RESULTS, PAGE_SIZE)), require_complete=True)
+    cutoff = datetime(2026, 10, 2)
+    assert collect(StubEngine(NEWS_API_MAX_RESULTS + 1), require_complete=True, cutoff=cutoff) == [[]]
+
+
+def test_backfill_startups_are_not_packed():
+    backfill = [{"id": sid, "name": name, "helping_words": words, "mode": "backfill"} for sid, name, words in STARTUPS]
+    incremental = [{**s, "mode": "incremental", "last_published_at": datetime(2026, 10, 1)} for s in backfill]
+    counts = {"backfill": 0, "incremental": 0}
+    items = plan_items(backfill, RunTracker(), counts)
+    assert [len(item["startups"]) for item in items] == [1, 1, 1]
+    items = plan_items(incremental, RunTracker(), counts)
+    assert [len(item["startups"]) for item in items] == [3]
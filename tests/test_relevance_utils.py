@@ -0,0 +1,43 @@
+# tests/test_relevance_utils.py
+import pytest
+
+from src.utils.relevance_utils import (
+    RELEVANCE_DOWNWEIGHT,
+    TermMatcher,
+    filter_relevant,
+    name_aliases,
+)
+
+
+def test_term_matcher_finds_whole_words_only():
+    matcher = TermMatcher({"cred": 1.0, "fintech": 0.2})
+    assert matcher.find("CRED  launches a fintech card") == {"cred": 1.0, "fintech": 0.2}
+    assert matcher.find("credit and fintechs") == {}
+
+
+def test_term_matcher_reports_overlapping_terms():
+    matcher = TermMatcher({"pay": 1.0, "phonepe pay": 1.0, "phone": 0.5})
+    assert matcher.find("PhonePe Pay rolls out") == {"phonepe pay": 1.0, "pay": 1.0}
+    assert matcher.find("phone pay") == {"phone": 0.5, "pay": 1.0}
+
+
+def test_name_aliases_drop_suffixes_and_split_camel_case():
+    assert {"phonepe", "phone pe"} <= name_aliases("PhonePe Pvt Ltd")
+    assert "zepto" in name_aliases("Zepto.com")
+    assert "urbancompany" in name_aliases("Urban Company")
+
+
+def article(title, content="", description=""):
+    return {"title": title, "description": description, "content": content, "url": f"https://x.test/{title}"}
+
+
+@pytest.mark.parametrize("item, kept, weight", [
+    (article("CRED raises funding"), True, None),
+    (article("Funding news", content="CRED expands its card business."), True, None),
+    (article("Funding news", content="The fintech market and payments app sector grew."), True, RELEVANCE_DOWNWEIGHT),
+    (article("Funding news", content="The fintech market keeps growing this quarter."), False, None),
+])
+def test_filter_relevant_keeps_drops_and_downweights(item, kept, weight):
+    result = filter_relevant([item], "CRED", ["fintech", "payments app"])
+    assert (result == [item]) is kept
+    assert item.get("relevance_weight") == weight
@@ -0,0 +1,94 @@
+# tests/test_rollup_utils.py
+# Needs a scratch Postgres database, like benchmark.py: set TEST_DB_URI to one
+# (its Articles and Startups are truncated). Skipped otherwise.
+import os
+import threading
+import uuid
+
+import pytest
+
+TEST_DB_URI = os.getenv("TEST_DB_URI")
+pytestmark = pytest.mark.skipif(not TEST_DB_URI, reason="TEST_DB_URI not set (scratch Postgres database)")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROLLUP_QUERY = """
+    SELECT "startupId"::text, day, "articleCount", "positiveCount", "neutralCount", "negativeCount",
+           round("scoreSum"::numeric, 9)
+    FROM "StartupSentimentDaily" ORDER BY 1, 2
+"""
+
+
+@pytest.fixture
+def db(monkeypatch):
+    psycopg2 = pytest.importorskip("psycopg2")
+    from src.benchmark import load_startups, seed_database
+    from src.utils import db_utils
+    from src.utils.migration_utils import apply_migrations
+
+    startups = load_startups(3, path=os.path.join(ROOT, "startups_id.json"))
+    seed_database(TEST_DB_URI, startups)
+    apply_migrations(TEST_DB_URI)
+    conn = psycopg2.connect(TEST_DB_URI)
+    with conn, conn.cursor() as cur:
+        cur.execute('DELETE FROM "StartupSentimentDaily"')
+    monkeypatch.setattr(db_utils, "DB_URL", TEST_DB_URI)
+    db_utils.init_pool()
+    yield conn, [s[0] for s in startups]
+    db_utils.close_pool()
+    conn.close()
+
+
+def rollups(conn):
+    with conn, conn.cursor() as cur:
+        cur.execute(ROLLUP_QUERY)
+        return cur.fetchall()
+
+
+def article(startup_id, n, sentiment, score, day=1):
+    # same url for the same n: later copies are duplicates, whatever else differs
+    return (str(uuid.uuid4()), f"content {n}", f"2026-10-{day:02d} {n % 24:02d}:00:00", sentiment, score,
+            startup_id, f"title {n}", f"https://rollup.test/{startup_id}/{n}", 1.0)
+
+
+def test_writer_deltas_match_a_full_rebuild(db):
+    from src.utils.rollup_utils import rebuild_sentiment_rollups
+    from src.utils.writer_utils import ArticleWriter
+
+    conn, ids = db
+    labels = [("positive", 0.75), ("neutral", 0.0), ("negative", -0.5)]
+    first = [article(ids[n % 3], n, *labels[n % 3], day=1 + n % 2) for n in range(12)]
+    # overlaps the first batch (already stored) and repeats urls within itself
+    overlapping = ([article(ids[n % 3], n, "positive", 0.9) for n in range(6, 18)]
+                   + [article(ids[n % 3], n, "negative", -0.9) for n in range(14, 18)])
+
+    writer = ArticleWriter(max_rows=1000, max_delay=0)
+    writer.add(first)
+    writer.flush()
+    writer.add(overlapping)
+    writer.flush()
+
+    # writers racing on the same new urls: the losers' rows hit ON CONFLICT DO NOTHING
+    racing = [ArticleWriter(max_rows=1000, max_delay=0) for _ in range(4)]
+    for n, racer in enumerate(racing):
+        racer.add([article(ids[k % 3], k, *labels[(k + n) % 3], day=3) for k in range(100, 130)])
+    barrier = threading.Barrier(len(racing))
+
+    def flush(racer):
+        barrier.wait()
+        racer.flush()
+
+    threads = [threading.Thread(target=flush, args=(racer,)) for racer in racing]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    inserted = sum(w.close()["rows_inserted"] for w in [writer] + racing)
+    with conn, conn.cursor() as cur:
+        cur.execute('SELECT COUNT(*) FROM "Articles"')
+        assert cur.fetchone()[0] == inserted == 18 + 30
+
+    incremental = rollups(conn)
+    assert sum(row[2] for row in incremental) == inserted
+    rebuild_sentiment_rollups()
+    assert rollups(conn) == incremental
@@ -0,0 +1,101 @@
+# tests/test_sentiment_cache_utils.py
+import pytest
+
+from src.utils import sentiment_cache_utils as cache
+from src.utils.sentiment_cache_utils import cache_key, cached_score_texts, get_sentiment_cache_stats
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        self.now += 1
+        return self.now
+
+
+@pytest.fixture
+def model(monkeypatch, tmp_path):
+    """A fresh cache in tmp_path; `model` holds the commit and backend the next open sees."""
+    identity = {"version": "commit-1", "backend": "torch"}
+    scored = []
+
+    def score_texts(texts):
+        scored.append(list(texts))
+        return [("positive", float(len(text))) for text in texts]
+
+    monkeypatch.setattr(cache, "SENTIMENT_CACHE_PATH", str(tmp_path / "cache.sqlite3"))
+    monkeypatch.setattr(cache, "SENTIMENT_CACHE_MAX_ENTRIES", 1000)
+    monkeypatch.setattr(cache, "score_texts", score_texts)
+    monkeypatch.setattr(cache, "get_model_version", lambda: identity["version"])
+    monkeypatch.setattr(cache, "resolve_backend", lambda: identity["backend"])
+    monkeypatch.setattr(cache, "time", Clock())
+    monkeypatch.setattr(cache, "_STATS", {"hits": 0, "misses": 0, "evictions": 0})
+    monkeypatch.setattr(cache, "_CONN", None)
+    monkeypatch.setattr(cache, "_MODEL_KEY", None)
+    identity["scored"] = scored
+    yield identity
+    reopen()
+
+
+def reopen():
+    """Close the cache so the next call opens it again (as a new run would)."""
+    if cache._CONN is not None:
+        cache._CONN.close()
+    cache._CONN = cache._MODEL_KEY = None
+
+
+def test_cache_key_normalizes_case_and_whitespace():
+    assert cache_key("  Hello\n\tWORLD ", "m") == cache_key("hello world", "m")
+    assert cache_key("hello world", "m") != cache_key("hello world", "other-model")
+    assert cache_key("hello world", "m") != cache_key("hello there", "m")
+
+
+def test_hits_and_misses_are_counted_per_text(model):
+    assert cached_score_texts(["Alpha beta", "gamma", "gamma"]) == [
+        ("positive", 10.0), ("positive", 5.0), ("positive", 5.0)]
+    # a text repeated within one call is scored once
+    assert model["scored"] == [["Alpha beta", "gamma"]]
+
+    assert cached_score_texts(["alpha   BETA", "gamma", "delta"])[0] == ("positive", 10.0)
+    assert model["scored"][-1] == ["delta"]
+    stats = get_sentiment_cache_stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (3, 3, 3)
+    assert stats["model"] == "Soumil24/finbert-custom@commit-1|torch"
+
+
+def test_least_recently_used_entries_are_evicted_at_the_cap(model, monkeypatch):
+    monkeypatch.setattr(cache, "SENTIMENT_CACHE_MAX_ENTRIES", 10)
+    texts = [f"text {n}" for n in range(10)]
+    cached_score_texts(texts)
+    # touch the oldest three so they become the most recently used
+    cached_score_texts(texts[:3])
+    cached_score_texts(["text 10"])
+
+    # 11 entries: trimmed to 90% of the cap, dropping the two least recently used
+    assert get_sentiment_cache_stats()["evictions"] == 2
+    model["scored"].clear()
+    cached_score_texts(texts[:3] + texts[5:])
+    assert model["scored"] == []
+    cached_score_texts(texts[3:5])
+    assert model["scored"] == [texts[3:5]]
+
+
+@pytest.mark.parametrize("change", [{"version": "commit-2"}, {"backend": "onnx"}])
+def test_a_new_model_commit_or_backend_invalidates_the_cache(model, change):
+    cached_score_texts(["alpha", "beta"])
+    reopen()
+    model.update(change)
+    cached_score_texts(["alpha", "beta"])
+    assert model["scored"] == [["alpha", "beta"], ["alpha", "beta"]]
+    assert get_sentiment_cache_stats()["entries"] == 2
+
+
+def test_an_unknown_model_commit_keeps_the_entries(model):
+    cached_score_texts(["alpha"])
+    reopen()
+    # e.g. the Hub lookup failed: not a reason to drop every cached score
+    model["version"] = None
+    cached_score_texts(["alpha"])
+    assert model["scored"] == [["alpha"]]
+    assert get_sentiment_cache_stats()["model"] == "Soumil24/finbert-custom@commit-1|torch"
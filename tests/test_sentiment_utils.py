@@ -0,0 +1,57 @@
+# tests/test_sentiment_utils.py
+import pytest
+
+from src.utils import sentiment_utils
+from src.utils.sentiment_utils import LABELS, _token_buckets, sentiment_score_batch
+
+
+def buckets_for(lengths, budget):
+    order = sorted(range(len(lengths)), key=lengths.__getitem__)
+    return order, list(_token_buckets(order, lengths, budget))
+
+
+def test_buckets_follow_length_order_and_fit_the_budget():
+    lengths = [5, 50, 7, 3, 50, 20, 12, 9]
+    order, buckets = buckets_for(lengths, 60)
+    assert [i for bucket in buckets for i in bucket] == order
+    for bucket in buckets:
+        # padded to the longest (last) text in the bucket
+        assert len(bucket) * max(lengths[i] for i in bucket) <= 60
+    # each bucket is as full as the budget allows
+    for bucket, following in zip(buckets, buckets[1:]):
+        assert (len(bucket) + 1) * lengths[following[0]] > 60
+
+
+def test_a_text_longer_than_the_budget_gets_a_bucket_of_its_own():
+    _, buckets = buckets_for([4, 100, 4], 16)
+    assert buckets == [[0, 2], [1]]
+
+
+class FakeTokenizer:
+    """One token per word; no vocabulary or model download."""
+
+    def __call__(self, texts, truncation=True, max_length=None):
+        return {"input_ids": [list(range(len(text.split()))) for text in texts]}
+
+
+def test_scores_come_back_in_input_order(monkeypatch):
+    np = pytest.importorskip("numpy")
+    padded = []
+
+    def predict(tokenizer, features, backend):
+        width = max(len(f["input_ids"]) for f in features)
+        padded.append(len(features) * width)
+        # positive for an even word count, negative for an odd one
+        probs = [[0.0, 0.0, 1.0] if len(f["input_ids"]) % 2 == 0 else [1.0, 0.0, 0.0] for f in features]
+        return np.array(probs), len(features) * width
+
+    monkeypatch.setattr(sentiment_utils, "resolve_backend", lambda backend=None: "torch")
+    monkeypatch.setattr(sentiment_utils, "_backend_tokenizer", lambda backend: FakeTokenizer())
+    monkeypatch.setattr(sentiment_utils, "_predict_probs", predict)
+
+    texts = ["a b c d e f g h", "a", "a b", "a b c d e", "a b c", "a b c d e f"]
+    results = sentiment_score_batch(texts, token_budget=10)
+    expected = [LABELS[2] if len(t.split()) % 2 == 0 else LABELS[0] for t in texts]
+    assert [label for label, _ in results] == expected
+    assert [score for _, score in results] == [1.0 if label == "positive" else -1.0 for label in expected]
+    assert len(padded) > 1 and all(size <= 10 for size in padded)
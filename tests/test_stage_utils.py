@@ -0,0 +1,107 @@
+# tests/test_stage_utils.py
+import threading
+import time
+
+from src.utils.stage_utils import Stage, StageGraph, latency_percentiles
+
+
+def test_latency_percentiles_in_milliseconds():
+    assert latency_percentiles([]) == {}
+    assert latency_percentiles([0.001 * n for n in range(1, 101)]) == {"p50": 51.0, "p90": 91.0, "p99": 100.0,
+                                                                       "max": 100.0}
+
+
+def test_a_full_queue_holds_the_upstream_stage_back():
+    release = threading.Event()
+    produced = []
+
+    def produce(item):
+        produced.append(item)
+        yield item
+
+    def consume(item):
+        release.wait(5)
+        return ()
+
+    graph = StageGraph([Stage("produce", produce, 1, 4), Stage("consume", consume, 1, 2)])
+    runner = threading.Thread(target=graph.run, args=(range(20),))
+    runner.start()
+    time.sleep(0.2)
+    # one item in the blocked consumer, two queued for it, one held by the producer
+    assert len(produced) <= 1 + 2 + 1
+    release.set()
+    runner.join(5)
+    assert len(produced) == 20
+    assert graph.stages[1].stats["max_queue_depth"] <= 2
+    assert graph.stages[1].stats["items_in"] == 20
+
+
+def test_a_failing_item_goes_to_on_error_and_the_rest_move_on():
+    errors, seen = [], []
+
+    def parse(item):
+        if item == 3:
+            raise ValueError("bad item")
+        return (item * 10,)
+
+    def partial(item):
+        # a generator that fails half-way: what it yielded before still moves on
+        yield item
+        if item == 40:
+            raise RuntimeError("broke after yielding")
+
+    graph = StageGraph([
+        Stage("parse", parse, 2),
+        Stage("partial", partial, 2),
+        Stage("sink", lambda item: seen.append(item) or (), 1),
+    ], on_error=lambda stage, item, error: errors.append((stage, item, str(error))))
+    report = graph.run(range(6))
+
+    assert sorted(seen) == [0, 10, 20, 40, 50]
+    assert sorted(errors) == [("parse", 3, "bad item"), ("partial", 40, "broke after yielding")]
+    assert report["parse"]["errors"] == 1 and report["parse"]["items_out"] == 5
+    assert report["partial"]["errors"] == 1 and report["sink"]["items_in"] == 5
+
+
+def test_errors_without_on_error_are_logged_and_skipped():
+    seen = []
+    graph = StageGraph([
+        Stage("boom", lambda item: 1 / item and (item,), 1),
+        Stage("sink", lambda item: seen.append(item) or (), 1),
+    ])
+    report = graph.run([0, 1, 2])
+    assert sorted(seen) == [1, 2]
+    assert report["boom"]["errors"] == 1
+
+
+def test_run_returns_once_every_stage_has_drained_in_order():
+    events = []
+    lock = threading.Lock()
+
+    def slow_fetch(item):
+        # several workers, so the last items reach the next stage late
+        time.sleep(0.02 * (item % 3))
+        for n in range(2):
+            yield (item, n)
+
+    def record(name):
+        def run(item):
+            with lock:
+                events.append((name, item))
+            return (item,)
+        return run
+
+    graph = StageGraph([
+        Stage("fetch", slow_fetch, 3, 1),
+        Stage("score", record("score"), 2, 1),
+        Stage("write", record("write"), 1, 1),
+    ])
+    report = graph.run(range(9))
+
+    # nothing produced upstream is lost when the graph shuts down, and every
+    # item reached the last stage before run() returned
+    expected = sorted((item, n) for item in range(9) for n in range(2))
+    assert sorted(item for name, item in events if name == "write") == expected
+    assert sorted(item for name, item in events if name == "score") == expected
+    assert [report[name]["items_in"] for name in ("fetch", "score", "write")] == [9, 18, 18]
+    assert not [t for t in threading.enumerate() if t.name.startswith("stage-")]
@@ -0,0 +1,124 @@
+# tests/test_writer_utils.py
+import threading
+import time
+
+import pytest
+
+from src.utils import writer_utils
+from src.utils.writer_utils import ArticleWriter, close_article_writer, copy_buffer, get_article_writer
+
+
+class RecordingWriter(ArticleWriter):
+    """ArticleWriter whose flushes land in a list instead of Postgres."""
+
+    def __init__(self, *args, fail=False, **kwargs):
+        self.batches = []
+        self.fail = fail
+        super().__init__(*args, **kwargs)
+
+    def _write(self, conn, rows):
+        if self.fail:
+            raise RuntimeError("db down")
+        self.batches.append(list(rows))
+        return len(rows)
+
+
+@pytest.fixture(autouse=True)
+def no_db(monkeypatch):
+    monkeypatch.setattr(writer_utils, "run_with_connection", lambda fn: fn(None))
+
+
+def rows(*ids):
+    return [(i,) for i in ids]
+
+
+def test_copy_buffer_escapes_text_format():
+    assert copy_buffer([("a\tb", None, "x\ny\\")]).read() == "a\\tb\t\\N\tx\\ny\\\\\n"
+
+
+def test_flushes_when_the_buffer_is_full():
+    writer = RecordingWriter(max_rows=3, max_delay=0)
+    writer.add(rows(1, 2))
+    assert writer.batches == []
+    writer.add(rows(3))
+    assert writer.batches == [rows(1, 2, 3)]
+    assert writer.close()["rows_inserted"] == 3
+
+
+def test_flushes_the_oldest_rows_after_max_delay():
+    writer = RecordingWriter(max_rows=100, max_delay=0.05)
+    flushed = threading.Event()
+    writer.add(rows(1), on_flush=flushed.set)
+    assert flushed.wait(2)
+    assert writer.batches == [rows(1)]
+    writer.close()
+
+
+def test_zero_delay_means_no_timer():
+    writer = RecordingWriter(max_rows=100, max_delay=0)
+    assert writer._timer is None
+    writer.add(rows(1))
+    time.sleep(0.05)
+    assert writer.batches == []
+    writer.close()
+    assert writer.batches == [rows(1)]
+
+
+def test_callbacks_run_in_queue_order_after_the_commit():
+    writer = RecordingWriter(max_rows=100, max_delay=0)
+    seen = []
+    for n in range(3):
+        writer.add(rows(n), on_flush=lambda n=n: seen.append((n, len(writer.batches))))
+    writer.flush()
+    assert seen == [(0, 1), (1, 1), (2, 1)]
+    writer.close()
+
+
+def test_failed_flush_reports_every_startup_and_counts_the_rows():
+    writer = RecordingWriter(max_rows=100, max_delay=0, fail=True)
+    stored, failed = [], []
+    writer.add(rows(1, 2), on_flush=lambda: stored.append("a"), on_failed=failed.append)
+    writer.add(rows(3), on_flush=lambda: stored.append("b"), on_failed=failed.append)
+    assert writer.flush() == 0
+    assert stored == []
+    assert [str(e) for e in failed] == ["db down", "db down"]
+    assert writer.close()["rows_failed"] == 3
+
+
+def test_a_failing_callback_does_not_stop_the_others():
+    writer = RecordingWriter(max_rows=100, max_delay=0)
+    seen = []
+    writer.add(rows(1), on_flush=lambda: 1 / 0)
+    writer.add(rows(2), on_flush=lambda: seen.append(2))
+    writer.flush()
+    assert seen == [2]
+    writer.close()
+
+
+def test_close_drains_rows_queued_by_flush_callbacks(monkeypatch):
+    writer = RecordingWriter(max_rows=100, max_delay=0)
+    monkeypatch.setattr(writer_utils, "_WRITER", writer)
+    stored = []
+
+    def chain(n):
+        # like a streamed startup: the next batch is queued once the previous one committed
+        def on_flush():
+            stored.append(n)
+            if n < 3:
+                get_article_writer().add(rows(n + 1), on_flush=chain(n + 1))
+        return on_flush
+
+    writer.add(rows(0), on_flush=chain(0))
+    stats = close_article_writer()
+    assert stored == [0, 1, 2, 3]
+    assert stats["rows_inserted"] == 4
+    assert writer.batches == [rows(n) for n in range(4)]
+    # the shared writer is gone only after it drained; nothing was left on another one
+    assert writer_utils._WRITER is None
+
+
+def test_rows_added_after_close_are_flushed_right_away():
+    writer = RecordingWriter(max_rows=100, max_delay=0.05)
+    writer.close()
+    writer.add(rows(1))
+    assert writer.batches == [rows(1)]